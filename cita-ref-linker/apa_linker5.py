@@ -1,275 +1,247 @@
-import re
 import time
 import sys
 import os  # <--- NEW: Needed for folder creation
-from docx import Document
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
+import glob
+import argparse
 
-# --- ANIMATION UTILS ---
-def print_progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=40, fill='█'):
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
-    filled_length = int(length * iteration // total)
-    bar = fill * filled_length + '-' * (length - filled_length)
-    sys.stdout.write(f'\r{prefix} |{bar}| {percent}% {suffix}')
-    sys.stdout.flush()
-    if iteration == total: 
-        print()
+# The linker itself lives in the cita_ref_linker package; this script is its
+# command line (interactive and --batch). The library API is re-exported here.
+from cita_ref_linker import (DEFAULT_COMPRESS_LEVEL, LinkResult, ProgressReporter, format_validation_report,
+                             link_bytes, link_document, write_validation_report)
 
-def fake_thinking_time():
-    time.sleep(0.002) 
-
-# --- XML HELPER FUNCTIONS ---
-def add_bookmark(p, bookmark_name, bookmark_id):
-    start = OxmlElement('w:bookmarkStart')
-    start.set(qn('w:id'), str(bookmark_id))
-    start.set(qn('w:name'), bookmark_name)
-    p._p.insert(0, start)
-    end = OxmlElement('w:bookmarkEnd')
-    end.set(qn('w:id'), str(bookmark_id))
-    p._p.append(end)
-
-def create_hyperlink_run(paragraph, text, bookmark_name, font_name="Calibri", font_size=None):
-    hyperlink = OxmlElement('w:hyperlink')
-    hyperlink.set(qn('w:anchor'), bookmark_name)
-    hyperlink.set(qn('w:history'), '1')
-
-    r = OxmlElement('w:r')
-    rPr = OxmlElement('w:rPr')
-    
-    color = OxmlElement('w:color')
-    color.set(qn('w:val'), '0000FF')
-    underline = OxmlElement('w:u')
-    underline.set(qn('w:val'), 'single')
-    rPr.append(color)
-    rPr.append(underline)
-
-    # Force Font Preservation (Default to Calibri)
-    actual_font = font_name if font_name else "Calibri"
-    rFonts = OxmlElement('w:rFonts')
-    rFonts.set(qn('w:ascii'), actual_font)
-    rFonts.set(qn('w:hAnsi'), actual_font)
-    rPr.append(rFonts)
-
-    if font_size:
-        sz = OxmlElement('w:sz')
-        sz.set(qn('w:val'), str(int(font_size.pt * 2)))
-        rPr.append(sz)
-
-    r.append(rPr)
-    t = OxmlElement('w:t')
-    t.text = text
-    r.append(t)
-    hyperlink.append(r)
-    paragraph._p.append(hyperlink)
-
-def clean_author_name(raw_text):
-    first_word = raw_text.split()[0] 
-    return re.sub(r"[^\w\-\']", "", first_word)
+__all__ = ["DEFAULT_COMPRESS_LEVEL", "LinkResult", "ProgressReporter", "format_validation_report",
+           "link_bytes", "link_document", "write_validation_report"]
 
 # --------------------------------------------------------
-# MAIN EXECUTION
+# OUTPUT FOLDERS
 # --------------------------------------------------------
 
-print("\n" + "="*50)
-print("      AUTO-LINKER v5.0 (INTERACTIVE)      ")
-print("="*50 + "\n")
-
-# --- NEW: INTERACTIVE INPUT ---
-while True:
-    input_filename = input("Enter the filename (e.g. data/file.docx): ").strip()
-    # Remove quotes if user dragged and dropped file
-    input_filename = input_filename.replace('"', '').replace("'", "")
-    
-    if os.path.exists(input_filename):
-        break
+def prepare_output_folder(output_folder, verbose=True):
+    # Create the folder if it doesn't exist
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+        if verbose: print(f"[*] Created output folder: {output_folder}/")
     else:
-        print(f"[!] File not found: {input_filename}")
-        print("    Please try again.\n")
-
-# --- NEW: FOLDER SETUP ---
-# Extract "kusniawati_et_al.2025" from "kusniawati_et_al.2025.docx"
-base_name = os.path.splitext(os.path.basename(input_filename))[0]
-output_folder = base_name  # The folder name will be the file name
-
-# Create the folder if it doesn't exist
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-    print(f"[*] Created output folder: {output_folder}/")
-else:
-    print(f"[*] Using existing folder: {output_folder}/")
-
-print(f"[*] Loading {input_filename}...")
-doc = Document(input_filename)
-
-all_paragraphs = list(doc.paragraphs)
-total_paras = len(all_paragraphs)
-
-ref_map = {}
-linked_references = set()
-missing_citations = []
-unique_id_counter = 0
-in_refs_section = False
-
-ref_list_pattern = r"^([\w\-\']+).*?\(?(\d{4})\)?"
-
-# --- PHASE 1: MAPPING ---
-print("\n[*] Phase 1: Mapping References")
-
-for i, p in enumerate(all_paragraphs):
-    print_progress_bar(i + 1, total_paras, prefix='Scanning:', suffix='Done', length=30)
-    fake_thinking_time()
-
-    if "References" in p.text and len(p.text) < 50:
-        in_refs_section = True
-        continue
-    
-    if in_refs_section:
-        match = re.search(ref_list_pattern, p.text.strip())
-        if match:
-            surname = match.group(1)
-            year = match.group(2)
-            key = f"{clean_author_name(surname)}_{year}"
-            
-            safe_key = re.sub(r"[^A-Za-z0-9]", "", key) 
-            bookmark_name = f"REF_{safe_key}_{unique_id_counter}"
-            
-            add_bookmark(p, bookmark_name, unique_id_counter)
-            ref_map[key] = bookmark_name
-            unique_id_counter += 1
-
-print(f"    > Mapped {len(ref_map)} references.")
-
-# --- PHASE 2: LINKING ---
-print("\n[*] Phase 2: Linking Citations")
+        if verbose: print(f"[*] Using existing folder: {output_folder}/")
+
+def link_file(input_filename, output_root=".", verbose=True, quiet=False, progress_interval_ms=100,
+              folder_name=None, **options):
+    """CLI layout: links one .docx into <output_root>/<base>/ and returns a summary dict.
+
+    The folder gets <base>_linked.docx, validation_report.txt and metrics.json.
+    `folder_name` replaces <base> as the folder (see output_folders).
+    `verbose` controls the status messages; `quiet` (or a non-verbose run)
+    turns the progress bars off so both phases are purely CPU-bound.
+    `options` are passed on to link_document.
+    """
+    # Extract "kusniawati_et_al.2025" from "kusniawati_et_al.2025.docx"
+    base_name = os.path.splitext(os.path.basename(input_filename))[0]
+    # The folder name will be the file name
+    output_folder = os.path.normpath(os.path.join(output_root, folder_name or base_name))
+    prepare_output_folder(output_folder, verbose)
+
+    result = link_document(
+        input_filename,
+        os.path.join(output_folder, f"{base_name}_linked.docx"),
+        report_path=os.path.join(output_folder, "validation_report.txt"),
+        metrics_path=os.path.join(output_folder, "metrics.json"),
+        verbose=verbose, quiet=quiet, progress_interval_ms=progress_interval_ms, **options)
+
+    return {
+        "input": input_filename,
+        "output_folder": output_folder,
+        "references": len(result.ref_map),
+        "linked": len(result.linked_references),
+        "broken": len(result.missing_citations),
+        "ambiguous": len(result.ambiguous_citations),
+        "unused": len(result.unused_references),
+        "seconds": result.seconds,
+        "metrics": result.metrics,
+    }
 
-citation_pattern = re.compile(
-    r"(?P<paren>\([^\)]+\))|" 
-    r"(?P<narrative>[A-Z][\w\-\']+(?:\s+(?:&|and)\s+[A-Z][\w\-\']+)?(?:\s+et\s+al\.?)?\s*\(\d{4}\))"
-)
-
-for i, p in enumerate(all_paragraphs):
-    print_progress_bar(i + 1, total_paras, prefix='Linking :', suffix='Done', length=30)
-    fake_thinking_time()
-
-    if "References" in p.text and len(p.text) < 50:
-        break
-
-    text = p.text
-    if "(" not in text: 
-        continue
-
-    matches = list(citation_pattern.finditer(text))
-    if not matches:
-        continue
-
-    original_font_name = None
-    original_font_size = None
-    
-    if p.runs:
-        for run in p.runs:
-            if run.font.name:
-                original_font_name = run.font.name
-                break 
-        original_font_size = p.runs[0].font.size
-
-    if not original_font_name:
-        original_font_name = "Calibri"
+# --------------------------------------------------------
+# BATCH MODE
+# --------------------------------------------------------
 
-    p.text = "" 
-    cursor = 0
-    
-    for match in matches:
-        full_text = match.group(0)
-        start_index = match.start()
-        
-        if start_index > cursor:
-            run = p.add_run(text[cursor:start_index])
-            run.font.name = original_font_name
-            if original_font_size: run.font.size = original_font_size
-        
-        # LINKING LOGIC
-        if match.group('narrative'):
-            parts = full_text.split('(')
-            name_part = parts[0].strip()
-            year_part = parts[1].replace(')', '').strip()
-            key = f"{clean_author_name(name_part)}_{year_part}"
-            
-            if key in ref_map:
-                linked_references.add(key)
-                create_hyperlink_run(p, full_text, ref_map[key], original_font_name, original_font_size)
+def collect_inputs(target):
+    """Expands a directory or glob into the list of .docx files to link."""
+    if os.path.isdir(target):
+        candidates = glob.glob(os.path.join(target, "*.docx"))
+    else:
+        candidates = glob.glob(target)
+    # Skip Word lock files ("~$draft.docx") and anything that isn't a .docx
+    return sorted(c for c in candidates
+                  if c.lower().endswith(".docx") and not os.path.basename(c).startswith("~$"))
+
+def output_folders(inputs):
+    """Output folder name of each input: its base name, or its relative path when base names repeat.
+
+    A glob such as "a/*/*.docx" can match "a/x/draft.docx" and
+    "a/y/draft.docx"; their results would overwrite each other in
+    <out>/draft/, so the whole batch is laid out as <out>/x/draft/ and
+    <out>/y/draft/ instead (paths relative to the inputs' common folder).
+    """
+    bases = [os.path.splitext(os.path.basename(f))[0] for f in inputs]
+    if len({os.path.normcase(base).casefold() for base in bases}) == len(bases):
+        return dict(zip(inputs, bases))
+    common = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in inputs])
+    return {f: os.path.splitext(os.path.relpath(os.path.abspath(f), common))[0] for f in inputs}
+
+def _batch_worker(input_filename, output_root, folder_name, options):
+    try:
+        return link_file(input_filename, output_root, verbose=False, folder_name=folder_name, **options)
+    except Exception as e:
+        return {"input": input_filename, "error": f"{type(e).__name__}: {e}"}
+
+def run_batch(target, output_root=".", workers=None, quiet=False, progress_interval_ms=100, **options):
+    """Links every .docx matched by `target`; `options` are passed on to link_file."""
+    inputs = collect_inputs(target)
+    if not inputs:
+        print(f"[!] No .docx files found for: {target}")
+        return []
+    folders = output_folders(inputs)
+    options["progress_interval_ms"] = progress_interval_ms
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = workers or os.cpu_count() or 1
+    print(f"[*] Linking {len(inputs)} documents with {workers} worker(s)...")
+
+    started = time.perf_counter()
+    results = []
+    progress = ProgressReporter(len(inputs), prefix='Batch   :', interval_ms=progress_interval_ms, quiet=quiet)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_batch_worker, f, output_root, folders[f], options) for f in inputs]
+        for done, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            progress.update(done)
+    progress.finish()
+    total_seconds = time.perf_counter() - started
+
+    results.sort(key=lambda r: r["input"])
+    write_batch_summary(results, total_seconds, workers, output_root)
+    return results
+
+def write_batch_summary(results, total_seconds, workers, output_root):
+    os.makedirs(output_root, exist_ok=True)
+    summary_path = os.path.join(output_root, "batch_summary.txt")
+    failed = [r for r in results if "error" in r]
+    busy_seconds = sum(r["seconds"] for r in results if "error" not in r)
+
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(f"BATCH SUMMARY ({len(results)} documents, {workers} workers)\n")
+        f.write("="*50 + "\n\n")
+        for r in results:
+            if "error" in r:
+                f.write(f" [!] {r['input']}\n     FAILED: {r['error']}\n")
             else:
-                missing_citations.append(full_text)
-                run = p.add_run(full_text)
-                run.font.name = original_font_name
-                if original_font_size: run.font.size = original_font_size
-
-        elif match.group('paren'):
-            content = full_text[1:-1]
-            run = p.add_run("(")
-            run.font.name = original_font_name
-            if original_font_size: run.font.size = original_font_size
-            
-            sub_cites = content.split(";")
-            for k, cite in enumerate(sub_cites):
-                cite = cite.strip()
-                sub_match = re.search(r"(.*),\s.*?(\d{4})", cite)
-                
-                if sub_match:
-                    raw_author = sub_match.group(1)
-                    year = sub_match.group(2)
-                    key = f"{clean_author_name(raw_author)}_{year}"
-                    
-                    if key in ref_map:
-                        linked_references.add(key)
-                        create_hyperlink_run(p, cite, ref_map[key], original_font_name, original_font_size)
-                    else:
-                        missing_citations.append(cite)
-                        run = p.add_run(cite)
-                        run.font.name = original_font_name
-                        if original_font_size: run.font.size = original_font_size
-                else:
-                    run = p.add_run(cite)
-                    run.font.name = original_font_name
-                    if original_font_size: run.font.size = original_font_size
-                
-                if k < len(sub_cites) - 1:
-                    run = p.add_run("; ")
-                    run.font.name = original_font_name
-                    if original_font_size: run.font.size = original_font_size
-            
-            run = p.add_run(")")
-            run.font.name = original_font_name
-            if original_font_size: run.font.size = original_font_size
-
-        cursor = match.end()
-
-    if cursor < len(text):
-        run = p.add_run(text[cursor:])
-        run.font.name = original_font_name
-        if original_font_size: run.font.size = original_font_size
-
-# --- NEW: SAVE TO FOLDER ---
-output_doc_path = os.path.join(output_folder, f"{base_name}_linked.docx")
-print(f"\n[*] Saving Document to: {output_doc_path}")
-doc.save(output_doc_path)
+                f.write(f" [+] {r['input']}  ({r['seconds']:.2f}s)\n")
+                f.write(f"     refs={r['references']} linked={r['linked']} "
+                        f"broken={r['broken']} ambiguous={r['ambiguous']} unused={r['unused']} -> {r['output_folder']}/\n")
+        f.write(f"\nFAILED: {len(failed)}\n")
+        f.write(f"WALL TIME: {total_seconds:.2f}s (sum of per-file time: {busy_seconds:.2f}s)\n")
+        if total_seconds > 0:
+            f.write(f"THROUGHPUT: {len(results) / total_seconds:.2f} documents/s\n")
 
-# --- NEW: REPORT TO FOLDER ---
-output_report_path = os.path.join(output_folder, "validation_report.txt")
-print(f"[*] Generating Report to: {output_report_path}")
+    print(f"[*] Batch summary written to: {summary_path}")
 
-all_ref_keys = set(ref_map.keys())
-unused_references = all_ref_keys - linked_references
-
-with open(output_report_path, "w", encoding="utf-8") as f:
-    f.write(f"VALIDATION REPORT FOR: {input_filename}\n")
-    f.write("="*50 + "\n\n")
-    f.write(f"BROKEN CITATIONS ({len(missing_citations)}):\n")
-    for c in sorted(list(set(missing_citations))): f.write(f" [x] {c}\n")
-    
-    f.write(f"\nUNUSED REFERENCES ({len(unused_references)}):\n")
-    for r in sorted(list(unused_references)): f.write(f" [?] {r}\n")
+# --------------------------------------------------------
+# MAIN EXECUTION
+# --------------------------------------------------------
 
-print("\n" + "="*40)
-print(f" JOB DONE! CHECK FOLDER: {output_folder}/ ")
-print("="*40 + "\n")
\ No newline at end of file
+def ask_for_filename():
+    while True:
+        input_filename = input("Enter the filename (e.g. data/file.docx): ").strip()
+        # Remove quotes if user dragged and dropped file
+        input_filename = input_filename.replace('"', '').replace("'", "")
+        
+        if os.path.exists(input_filename):
+            return input_filename
+        else:
+            print(f"[!] File not found: {input_filename}")
+            print("    Please try again.\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Links APA citations to their reference entries.")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB",
+                        help="link every .docx in a directory (or matching a glob) without prompting")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes for --batch (default: CPU count)")
+    parser.add_argument("--out", default=".",
+                        help="root folder for the per-document output folders (default: current folder)")
+    parser.add_argument("--engine", choices=("docx", "stream"), default="docx",
+                        help="'docx' loads python-docx objects; 'stream' iterparses document.xml "
+                             "with constant memory (default: docx)")
+    parser.add_argument("--full-save", action="store_true",
+                        help="save through python-docx instead of copying untouched parts raw")
+    parser.add_argument("--compress-level", type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL,
+                        metavar="0-9", help="deflate level for rewritten parts, 0 = store "
+                                            f"(default: {DEFAULT_COMPRESS_LEVEL})")
+    parser.add_argument("--in-place", action="store_true",
+                        help="split and wrap only the runs a citation covers instead of rebuilding "
+                             "each cited paragraph (keeps italics, superscripts and fonts)")
+    parser.add_argument("--link-style", action="store_true",
+                        help="format links with a 'Cited Reference' character style added to the "
+                             "document instead of direct blue/underline formatting on each link")
+    parser.add_argument("--ref-heading", action="append", default=[], metavar="TEXT",
+                        help="extra title of the reference section, besides the built-in ones "
+                             "(References, Bibliography, Daftar Pustaka, ...); may be repeated")
+    parser.add_argument("--bibliography", metavar="FILE",
+                        help="a .bib, .ris or CSL-JSON (.json) library to check the reference list against: "
+                             "its entries also resolve citations the list lacks")
+    parser.add_argument("--bibliography-only", action="store_true",
+                        help="check citations against --bibliography instead of the document's "
+                             "reference list (nothing is linked)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="no progress bars (the bars are also hidden when stdout is not a terminal)")
+    parser.add_argument("--progress-interval", type=int, default=100, metavar="MS",
+                        help="minimum milliseconds between progress bar redraws (default: 100)")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="per-paragraph plan cache (SQLite file, created if missing): "
+                             "re-runs on a revised manuscript only re-plan the changed paragraphs")
+    parser.add_argument("--result-cache", metavar="DIR",
+                        help="whole-document result cache: a file linked before with the same "
+                             "options is copied from DIR instead of being processed again")
+    parser.add_argument("--result-cache-size", type=int, default=None, metavar="MB",
+                        help="size limit of --result-cache; least recently used entries go first "
+                             "(default: 1024)")
+    args = parser.parse_args()
+    if args.bibliography_only and not args.bibliography:
+        parser.error("--bibliography-only needs --bibliography FILE")
+    bibliography = None
+    if args.bibliography:
+        from cita_ref_linker.bibliography import Bibliography
+        # Loaded once, whatever the number of documents
+        try:
+            bibliography = Bibliography.load(args.bibliography, args.bibliography_only)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"[*] Loaded {len(bibliography)} entries from {bibliography.name}")
+    result_cache = None
+    if args.result_cache:
+        from cita_ref_linker.result_cache import DEFAULT_MAX_MB, ResultCache
+        size_mb = DEFAULT_MAX_MB if args.result_cache_size is None else args.result_cache_size
+        result_cache = ResultCache(args.result_cache, size_mb * 1024 * 1024)
+    options = {"engine": args.engine, "fast_save": not args.full_save,
+               "compresslevel": args.compress_level, "cache": args.cache, "result_cache": result_cache,
+               "in_place": args.in_place, "link_style": args.link_style,
+               "ref_headings": tuple(args.ref_heading), "bibliography": bibliography}
+
+    if args.batch:
+        results = run_batch(args.batch, args.out, args.workers, args.quiet, args.progress_interval, **options)
+        sys.exit(1 if not results or any("error" in r for r in results) else 0)
+
+    print("\n" + "="*50)
+    print("      AUTO-LINKER v5.0 (INTERACTIVE)      ")
+    print("="*50 + "\n")
+
+    input_filename = ask_for_filename()
+    summary = link_file(input_filename, args.out, quiet=args.quiet,
+                        progress_interval_ms=args.progress_interval, **options)
+
+    print("\n" + "="*40)
+    print(f" JOB DONE! CHECK FOLDER: {summary['output_folder']}/ ")
+    print("="*40 + "\n")
+
+if __name__ == "__main__":
+    main()
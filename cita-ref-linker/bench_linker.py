@@ -0,0 +1,237 @@
+import io
+import os
+import sys
+import json
+import zlib
+import struct
+import random
+import argparse
+import tempfile
+
+from cita_ref_linker import link_document
+
+# --------------------------------------------------------
+# LINKER BENCHMARK
+# Generates synthetic APA manuscripts (.docx) of any size and times the
+# linker phases on them: load, Phase 1, Phase 2 and save, with throughput
+# and peak RSS. Each run links in a fresh worker process so the RSS figure
+# belongs to that document alone.
+# Usage: python bench_linker.py [--pages 10 100 1000] [--engine docx stream]
+# --------------------------------------------------------
+
+PARAGRAPHS_PER_PAGE = 4
+
+# --- SYNTHETIC MANUSCRIPT ---
+SYLLABLES = ["ma", "ri", "wi", "ja", "ya", "nur", "ha", "ti", "sa", "fi", "ka", "lo", "ber",
+             "ton", "ek", "ste", "zu", "ly", "an", "gra", "ov", "ch", "pra", "de", "ko"]
+PROSE = ("the results indicate that students hold persistent misconceptions about cell "
+         "biology which textbooks often reinforce through simplified diagrams and "
+         "ambiguous wording so teachers need explicit strategies to address them").split()
+
+def make_surname(rng, taken):
+    while True:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if name not in taken:
+            taken.add(name)
+            return name
+
+def make_references(rng, count):
+    """[(surname, year)] sorted like an APA reference list."""
+    taken = set()
+    return sorted((make_surname(rng, taken), str(rng.randint(1990, 2025))) for _ in range(count))
+
+def reference_entry(rng, surname, year):
+    coauthor = rng.choice(["", f", & {rng.choice(SYLLABLES).capitalize()}, B."])
+    title = " ".join(rng.sample(PROSE, 8)).capitalize()
+    return (f"{surname}, A.{coauthor} ({year}). {title}. Journal of Science Education, "
+            f"{rng.randint(1, 40)}({rng.randint(1, 4)}), {rng.randint(1, 300)}-{rng.randint(301, 600)}.")
+
+def make_citation(rng, references, broken_rate):
+    """Returns (citation text, number of author-year citations in it)."""
+    def pick():
+        if rng.random() < broken_rate:
+            return "Unlisted", str(rng.randint(1990, 2025))
+        return rng.choice(references)
+
+    (a, year_a), (b, year_b) = pick(), pick()
+    form = rng.randrange(5)
+    if form == 0:
+        return f"{a} ({year_a})", 1
+    if form == 1:
+        return f"{a} et al. ({year_a})", 1
+    if form == 2:
+        return f"({a}, {year_a})", 1
+    if form == 3:
+        return f"({a} & {b}, {year_a}, p. {rng.randint(1, 300)})", 1
+    return f"({a}, {year_a}; {b}, {year_b})", 2
+
+def split_runs(text, runs, rng):
+    """Cuts `text` into up to `runs` pieces at random points, like Word's rsid runs."""
+    if runs <= 1 or len(text) < runs:
+        return [text]
+    cuts = sorted(rng.sample(range(1, len(text)), runs - 1))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+def noise_png(kilobytes, rng):
+    """An RGB PNG of random pixels (incompressible, like photos) of roughly `kilobytes`."""
+    side = max(8, int((kilobytes * 1024 / 3) ** 0.5))
+    rows = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows, 1))
+            + chunk(b"IEND", b""))
+
+def generate_manuscript(path, paragraphs, citations=3, references=100, runs=4, table_every=0,
+                        image_every=0, image_kb=64, broken_rate=0.05, seed=2025):
+    """Writes a synthetic manuscript to `path` and returns what it contains.
+
+    Body paragraphs carry `citations` citations each, spread over `runs` runs;
+    a table (every `table_every` paragraphs) and an image (every
+    `image_every` paragraphs) are mixed in, then a "References" list of
+    `references` entries. `broken_rate` of the citations name no reference.
+    """
+    from docx import Document
+    from docx.shared import Inches
+
+    rng = random.Random(seed)
+    reference_list = make_references(rng, references)
+    doc = Document()
+    doc.add_paragraph("Synthetic Manuscript for Linker Benchmarks")
+
+    total_citations = 0
+    for i in range(1, paragraphs + 1):
+        pieces = []
+        for _ in range(citations):
+            pieces.append(" ".join(rng.sample(PROSE, rng.randint(10, 20))).capitalize())
+            citation, count = make_citation(rng, reference_list, broken_rate)
+            pieces.append(citation + ".")
+            total_citations += count
+        p = doc.add_paragraph()
+        for piece in split_runs(" ".join(pieces), runs, rng):
+            run = p.add_run(piece)
+            run.font.name = "Times New Roman"
+
+        if table_every and i % table_every == 0:
+            table = doc.add_table(rows=4, cols=3)
+            for cell in table._cells:
+                cell.text = " ".join(rng.sample(PROSE, 3))
+        if image_every and i % image_every == 0:
+            # A new image each time: python-docx stores identical images only once
+            image = noise_png(image_kb, rng)
+            doc.add_paragraph().add_run().add_picture(io.BytesIO(image), width=Inches(3))
+
+    doc.add_paragraph("References")
+    for surname, year in reference_list:
+        doc.add_paragraph(reference_entry(rng, surname, year))
+    doc.save(path)
+    return {"paragraphs": paragraphs, "citations": total_citations, "references": references}
+
+# --- MEASUREMENT ---
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where `resource` is missing)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def _bench_worker(path, engine):
+    with tempfile.TemporaryDirectory() as tmp:
+        result = link_document(path, os.path.join(tmp, "linked.docx"), engine=engine)
+    return result.metrics, peak_rss_mb()
+
+def run_case(path, engine):
+    """Links `path` in a fresh process; returns (metrics dict, peak RSS MB)."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_bench_worker, path, engine).result()
+
+def summarize(case, engine, metrics, rss_mb):
+    phases = metrics["phases"]
+
+    def seconds(*names):
+        return sum(phases.get(name, {}).get("wall_s", 0.0) for name in names)
+
+    total = metrics["total"]["wall_s"]
+    phase2 = seconds("phase2_linking")
+    return {
+        **case,
+        "engine": engine,
+        "input_mb": round(metrics["input_bytes"] / 1e6, 2),
+        "load_s": round(seconds("load", "text_index"), 3),
+        "phase1_s": round(seconds("phase1_mapping"), 3),
+        "phase2_s": round(phase2, 3),
+        "save_s": round(seconds("save"), 3),
+        "total_s": round(total, 3),
+        "paragraphs_per_s": round(case["paragraphs"] / total) if total else None,
+        "citations_per_s": round(case["citations"] / phase2) if phase2 else None,
+        "peak_rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+        "hyperlinks": metrics["counters"]["hyperlinks_created"],
+    }
+
+def print_table(rows):
+    columns = [("pages", 6), ("engine", 7), ("input_mb", 9), ("load_s", 8), ("phase1_s", 9),
+               ("phase2_s", 9), ("save_s", 8), ("total_s", 8), ("paragraphs_per_s", 17),
+               ("citations_per_s", 16), ("peak_rss_mb", 12)]
+    print("".join(f"{name:>{width}}" for name, width in columns))
+    for row in rows:
+        print("".join(f"{'-' if row[name] is None else row[name]:>{width}}" for name, width in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic manuscript benchmark for the linker phases.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000],
+                        help=f"manuscript sizes ({PARAGRAPHS_PER_PAGE} body paragraphs per page)")
+    parser.add_argument("--citations", type=int, default=3, help="citations per paragraph")
+    parser.add_argument("--references", type=int, default=None,
+                        help="reference-list size (default: 2 per page, at least 30)")
+    parser.add_argument("--runs", type=int, default=4, help="runs each paragraph is split into")
+    parser.add_argument("--table-every", type=int, default=20, help="a table every N paragraphs (0 = none)")
+    parser.add_argument("--image-every", type=int, default=40, help="an image every N paragraphs (0 = none)")
+    parser.add_argument("--image-kb", type=int, default=64, help="size of each image")
+    parser.add_argument("--broken", type=float, default=0.05, help="share of citations with no reference")
+    parser.add_argument("--engine", nargs="+", choices=["docx", "stream"], default=["docx", "stream"])
+    parser.add_argument("--seed", type=int, default=2025)
+    parser.add_argument("--keep", metavar="DIR", help="keep the generated manuscripts in DIR")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="linker_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    rows = []
+    try:
+        for pages in args.pages:
+            paragraphs = pages * PARAGRAPHS_PER_PAGE
+            references = args.references or max(30, 2 * pages)
+            path = os.path.join(workdir, f"synthetic_{pages}p.docx")
+            print(f"[*] Generating {pages} pages ({paragraphs} paragraphs, {references} references)...")
+            case = generate_manuscript(path, paragraphs, args.citations, references, args.runs,
+                                       args.table_every, args.image_every, args.image_kb,
+                                       args.broken, args.seed)
+            case["pages"] = pages
+            for engine in args.engine:
+                metrics, rss_mb = run_case(path, engine)
+                rows.append(summarize(case, engine, metrics, rss_mb))
+                print(f"    > {engine}: {rows[-1]['total_s']}s")
+    finally:
+        if not args.keep:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+            f.write("\n")
+        print(f"\n[*] Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import re
+import sys
+import time
+import random
+import argparse
+
+from cita_ref_linker.citation_tokenizer import _group_parts, tokenize_citations
+from cita_ref_linker.planner import find_known_citations, plan_citations
+from cita_ref_linker.reference_index import ReferenceIndex
+
+# --------------------------------------------------------
+# TOKENIZER BENCHMARK
+# Times tokenize_citations() and plan_citations() against the regexes they
+# replaced, first on their own (finding the citations and splitting the
+# groups) and then as whole Phase 2 plans. Both use the same compiled
+# citation_pattern, so what is timed is what the typed tokens add: building
+# a token per citation, which costs most on back-to-back citations (the
+# default here, --prose 0) and is made up for by the sub-citation parsing
+# once prose separates them. A plan_citations() plan also resolves author
+# lists, "et al.", same-year suffixes and ambiguity through the
+# ReferenceIndex and runs the surname scan, which the regex path never had;
+# the scan's share is timed on its own. Every run starts from empty caches.
+# tests/test_tokenizer.py checks that both paths make the same plans.
+# Usage: python bench_tokenizer.py [--paragraphs N] [--citations N] [--prose N]
+# --------------------------------------------------------
+
+# --- THE REGEX PATH (apa_linker5 before citation_tokenizer.py) ---
+citation_pattern = re.compile(
+    r"(?P<paren>\([^\)]+\))|"
+    r"(?P<narrative>[A-Z][\w\-\']+(?:\s+(?:&|and)\s+[A-Z][\w\-\']+)?(?:\s+et\s+al\.?)?\s*\(\d{4}\))"
+)
+
+sub_citation_pattern = re.compile(r"(.*),\s.*?(\d{4})")
+
+def clean_author_name(raw_text):
+    first_word = raw_text.split()[0]
+    return re.sub(r"[^\w\-\']", "", first_word)
+
+def regex_plan_citations(text, ref_map):
+    if "(" not in text:
+        return None
+    matches = list(citation_pattern.finditer(text))
+    if not matches:
+        return None
+    regex_matches = len(matches)
+    segments = []
+    cursor = 0
+    for match in matches:
+        full_text = match.group(0)
+        if match.start() > cursor:
+            segments.append((text[cursor:match.start()], None, False))
+        if match.group('narrative'):
+            parts = full_text.split('(')
+            key = f"{clean_author_name(parts[0].strip())}_{parts[1].replace(')', '').strip()}"
+            segments.append((full_text, key if key in ref_map else None, True))
+        else:
+            # Separators and spacing come from the text, as in plan_citations()
+            at = match.start()
+            piece_start = at + 1
+            for raw in full_text[1:-1].split(";"):
+                cite = raw.strip()
+                cite_start = piece_start + len(raw) - len(raw.lstrip())
+                if cite_start > at:
+                    segments.append((text[at:cite_start], None, False))
+                sub_match = sub_citation_pattern.search(cite)
+                if sub_match and sub_match.group(1).split():
+                    regex_matches += 1
+                    key = f"{clean_author_name(sub_match.group(1))}_{sub_match.group(2)}"
+                    segments.append((cite, key if key in ref_map else None, True))
+                else:
+                    segments.append((cite, None, False))
+                at = cite_start + len(cite)
+                piece_start += len(raw) + 1
+            segments.append((text[at:match.end()], None, False))
+        cursor = match.end()
+    if cursor < len(text):
+        segments.append((text[cursor:], None, False))
+    return segments, regex_matches
+
+def regex_tokens(text):
+    """The matching half of regex_plan_citations(): what tokenize_citations() replaces."""
+    tokens = []
+    for match in citation_pattern.finditer(text):
+        if match.group("paren"):
+            tokens.append([sub_citation_pattern.search(raw.strip()) for raw in match.group(0)[1:-1].split(";")])
+        else:
+            tokens.append(match)
+    return tokens
+
+# --- SYNTHETIC TEXT ---
+SURNAMES = ["Dikmenli", "Aini", "Zulyusri", "Nurhayati", "Wijayanti", "Pratiwi", "Machová",
+            "Oztas", "Safitri", "O'Brien", "Smith-Jones", "Fajri", "Roviati", "Anugrah"]
+PROSE = ("students showed a significant improvement in conceptual understanding "
+         "after the intervention, which is consistent with earlier findings").split()
+
+def random_citation(rng):
+    year = str(rng.randint(1990, 2025))
+    a, b, c = rng.sample(SURNAMES, 3)
+    return rng.choice([
+        f"{a} ({year})",
+        f"{a} & {b} ({year})",
+        f"{a} et al. ({year})",
+        f"({a}, {year})",
+        f"({a} & {b}, {year}; {c}, {year}a)",
+        f"({a}, {b}, & {c}, {year}, p. {rng.randint(1, 300)})",
+        f"({a} et al., {year}; {b}, {year}; {c}, {year})",
+        "(see Table 2)",
+    ])
+
+def prose(rng, count):
+    """`count` words of filler, with the odd capitalised sentence start."""
+    return [word.capitalize() if rng.random() < 0.1 else word
+            for word in (rng.choice(PROSE) for _ in range(count))]
+
+def dense_paragraph(rng, citations, prose_words):
+    words = []
+    for _ in range(citations):
+        words.extend(prose(rng, prose_words))
+        words.append(random_citation(rng))
+    words.extend(prose(rng, 4))
+    return " ".join(words) + "."
+
+def fuzz_paragraph(rng, length=60):
+    """Random mix of the characters the two paths are sensitive to."""
+    alphabet = "(); ,.&\n\tAaZz19-'" + "".join(SURNAMES[:3])
+    pieces = [rng.choice(["and", "et al.", "2010", "(2021)", " ", ", "]) if rng.random() < 0.3
+              else rng.choice(alphabet) for _ in range(length)]
+    return "".join(pieces)
+
+def reference_index():
+    """Index of every SURNAMES entry from 1990 to 2025, in steps of three years."""
+    index = ReferenceIndex()
+    for name in SURNAMES:
+        for year in range(1990, 2026, 3):
+            index.add(f"{name}, A. ({year}). Title.").bookmark = f"REF_{len(index)}"
+    return index
+
+def best_of(fn, paragraphs, *args):
+    # Every run is a first pass: nothing parsed or resolved by an earlier run is reused
+    _group_parts.cache_clear()
+    args = [reference_index() if isinstance(arg, ReferenceIndex) else arg for arg in args]
+    started = time.perf_counter()
+    for text in paragraphs:
+        fn(text, *args)
+    return time.perf_counter() - started
+
+def race(paragraphs, repeat, regex, tokenizer):
+    """Best times of two (fn, args) pairs, alternated so that machine noise hits both alike."""
+    regex_s = tokenizer_s = float("inf")
+    for _ in range(repeat):
+        regex_s = min(regex_s, best_of(regex[0], paragraphs, *regex[1:]))
+        tokenizer_s = min(tokenizer_s, best_of(tokenizer[0], paragraphs, *tokenizer[1:]))
+    return regex_s, tokenizer_s
+
+def scan_time(paragraphs, index, repeat):
+    """Best time of the surname scan alone, on paragraphs the tokenizer has been over."""
+    tokens = [tokenize_citations(text) for text in paragraphs]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text, found in zip(paragraphs, tokens):
+            find_known_citations(text, found, index)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def print_race(title, count, regex_s, tokenizer_s):
+    print(f"    {title}")
+    print(f"      regex     : {regex_s * 1000:8.1f} ms  ({count / regex_s:,.0f} paragraphs/s)")
+    print(f"      tokenizer : {tokenizer_s * 1000:8.1f} ms  ({count / tokenizer_s:,.0f} paragraphs/s)")
+    print(f"      speed-up  : {regex_s / tokenizer_s:.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Citation tokenizer vs regex benchmark.")
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--citations", type=int, default=8, help="citations per paragraph")
+    parser.add_argument("--prose", type=int, default=0, help="words of prose before each citation")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = reference_index()
+    ref_map = index.ref_map
+    paragraphs = [dense_paragraph(rng, args.citations, args.prose) for _ in range(args.paragraphs)]
+
+    for text in paragraphs:
+        if plan_citations(text, index) != regex_plan_citations(text, ref_map):
+            print(f"[!] Plans differ for: {text!r}")
+            sys.exit(1)
+
+    chars = sum(len(t) for t in paragraphs)
+    print(f"[*] {args.paragraphs} paragraphs, {args.citations} citations each "
+          f"({args.prose} words apart), {chars} chars")
+    print_race("finding citations", args.paragraphs,
+               *race(paragraphs, args.repeat, (regex_tokens,), (tokenize_citations,)))
+    print_race("planning", args.paragraphs,
+               *race(paragraphs, args.repeat, (regex_plan_citations, ref_map), (plan_citations, index)))
+    print(f"      of which surname scan : {scan_time(paragraphs, index, args.repeat) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
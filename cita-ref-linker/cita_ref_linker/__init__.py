@@ -0,0 +1,15 @@
+"""Links APA citations in .docx files to their reference entries.
+
+link_document() / link_bytes() are the library API; apa_linker5.py next to
+this package is the command line. python-docx and lxml are imported where
+they are used, so importing the package stays cheap.
+"""
+
+from .api import (LinkResult, format_validation_report, link_bytes, link_document,
+                  write_validation_report)
+from .docx_zip import DEFAULT_COMPRESS_LEVEL
+from .metrics import LinkMetrics
+from .progress import ProgressReporter
+
+__all__ = ["DEFAULT_COMPRESS_LEVEL", "LinkMetrics", "LinkResult", "ProgressReporter",
+           "format_validation_report", "link_bytes", "link_document", "write_validation_report"]
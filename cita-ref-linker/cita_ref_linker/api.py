@@ -0,0 +1,231 @@
+import io
+import os
+import time
+from dataclasses import dataclass, field
+
+from .docx_linker import link_docx
+from .docx_zip import DEFAULT_COMPRESS_LEVEL
+from .metrics import LinkMetrics
+from .suggestions import suggest_for
+
+# --------------------------------------------------------
+# LIBRARY API
+# --------------------------------------------------------
+
+@dataclass
+class LinkResult:
+    """What one linking run found, returned as plain data."""
+    input: str
+    output: object                # path or file object the linked .docx was written to
+    ref_map: dict                 # "Surname_Year" -> bookmark name
+    linked_references: set        # ref_map keys cited at least once
+    missing_citations: list       # citation texts with no matching reference, in document order
+    ambiguous_citations: dict = field(default_factory=dict)   # citation text -> ref_map keys it could mean
+    duplicate_references: list = field(default_factory=list)  # groups of ref_map keys for the same work
+    suggestions: dict = field(default_factory=dict)           # broken citation text -> closest ref_map keys
+    bibliography_only: list = None   # cited keys the bibliography file has but the reference list lacks
+    document_only: list = None       # ref_map keys the bibliography file lacks (both None without a file)
+    unlinked_fields: list = field(default_factory=list)       # texts of field paragraphs left unlinked
+    metrics: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def unused_references(self):
+        return set(self.ref_map) - self.linked_references
+
+def write_validation_report(path, result):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(_report_lines(result))
+
+# --- SOURCES AND TARGETS: paths, bytes or binary file objects ---
+def open_source(src):
+    """Returns something zipfile and python-docx can read: a path or a seekable binary stream."""
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return io.BytesIO(src)
+    if hasattr(src, "read") and not (hasattr(src, "seekable") and src.seekable()):
+        # e.g. a request body or pipe: the zip directory sits at the end, so buffer it
+        return io.BytesIO(src.read())
+    return src
+
+def source_name(src):
+    if isinstance(src, (str, os.PathLike)):
+        return os.fspath(src)
+    return getattr(src, "name", None) or "<bytes>"
+
+def stream_size(target):
+    """Size of a path or of a stream's contents, without moving the stream; 0 if unknowable."""
+    if isinstance(target, (str, os.PathLike)):
+        return os.path.getsize(target)
+    if not (hasattr(target, "seekable") and target.seekable()):
+        return 0
+    position = target.tell()
+    size = target.seek(0, io.SEEK_END)
+    target.seek(position)
+    return size
+
+def format_validation_report(result):
+    return "".join(_report_lines(result))
+
+def _report_lines(result):
+    yield f"VALIDATION REPORT FOR: {result.input}\n"
+    yield "="*50 + "\n\n"
+    yield f"BROKEN CITATIONS ({len(result.missing_citations)}):\n"
+    for c in sorted(list(set(result.missing_citations))):
+        yield f" [x] {c}\n"
+        if c in result.suggestions:
+            yield f"     did you mean: {', '.join(result.suggestions[c])}?\n"
+    
+    unused_references = result.unused_references
+    yield f"\nUNUSED REFERENCES ({len(unused_references)}):\n"
+    for r in sorted(list(unused_references)): yield f" [?] {r}\n"
+
+    if result.ambiguous_citations:
+        yield f"\nAMBIGUOUS CITATIONS ({len(result.ambiguous_citations)}):\n"
+        for c in sorted(result.ambiguous_citations):
+            yield f" [~] {c} -> {', '.join(result.ambiguous_citations[c])}\n"
+    if result.duplicate_references:
+        yield f"\nDUPLICATE REFERENCES ({len(result.duplicate_references)}):\n"
+        for group in result.duplicate_references: yield f" [=] {', '.join(group)}\n"
+    if result.unlinked_fields:
+        # Reference-manager fields whose citations could not be wrapped without rebuilding the paragraph
+        yield f"\nCITATION FIELDS LEFT UNLINKED ({len(result.unlinked_fields)}):\n"
+        for text in result.unlinked_fields:
+            yield f" [!] {text if len(text) <= 80 else text[:77] + '...'}\n"
+    if result.bibliography_only is not None:
+        yield f"\nCITED, ONLY IN BIBLIOGRAPHY FILE ({len(result.bibliography_only)}):\n"
+        for r in result.bibliography_only: yield f" [+] {r}\n"
+        yield f"\nNOT IN BIBLIOGRAPHY FILE ({len(result.document_only)}):\n"
+        for r in result.document_only: yield f" [-] {r}\n"
+
+def link_document(src, dst, report_path=None, metrics_path=None, engine="docx", fast_save=True,
+                  compresslevel=DEFAULT_COMPRESS_LEVEL, verbose=False, quiet=True,
+                  progress_interval_ms=100, name=None, cache=None, result_cache=None, in_place=False,
+                  link_style=False, ref_headings=(), bibliography=None, bibliography_only=False):
+    """Links citations in the .docx `src`, writes the result to `dst` and returns a LinkResult.
+
+    src                  path, bytes or binary file object
+    dst                  path or writable binary file object (e.g. io.BytesIO); nothing has to touch the disk
+    report_path          where to write the validation report (none by default)
+    metrics_path         where to write metrics.json (none by default)
+    engine               "docx" (python-docx) or "stream" (lxml iterparse, see stream_linker.py)
+    fast_save            copy untouched package parts raw
+    compresslevel        0-9, for the rewritten parts
+    verbose, quiet       print progress notes / also hide the progress bars; nothing is printed by default
+    progress_interval_ms how often the progress bars redraw
+    name                 label for in-memory input in the report and metrics
+    cache                plan-cache file path or open PlanCache: unchanged paragraphs skip Phase 2
+                         planning on the next run (see plan_cache.py)
+    result_cache         directory or ResultCache: an input already linked with the same options is
+                         copied from there without loading it (see result_cache.py)
+    in_place             link by splitting and wrapping the existing runs, so a cited paragraph keeps
+                         its formatting (see run_splicer.py)
+    link_style           format links through a "Cited Reference" character style instead of per-link
+                         color and underline (see link_style.py)
+    ref_headings         bibliography titles on top of the built-in multilingual set (see section_locator.py)
+    bibliography         .bib, .ris or CSL-JSON file, or a loaded Bibliography, that backs up the
+                         reference list; the report then lists the cited entries only the file has and
+                         the entries only the document has (see bibliography.py)
+    bibliography_only    the bibliography replaces the reference list: citations are checked against it
+                         and the document is left as it is; raises ValueError without a bibliography
+    """
+    show_progress = verbose and not quiet
+    started = time.perf_counter()
+    input_name = name or source_name(src)
+    src = open_source(src)
+    metrics = LinkMetrics(input_name, stream_size(src))
+
+    if engine not in ("docx", "stream"):
+        raise ValueError(f"Unknown engine: {engine!r} (expected 'docx' or 'stream')")
+    if bibliography_only and bibliography is None:
+        raise ValueError("bibliography_only needs a bibliography")
+    if isinstance(bibliography, (str, os.PathLike)):
+        from .bibliography import Bibliography
+        with metrics.phase("bibliography"):
+            bibliography = Bibliography.load(bibliography, bibliography_only)
+        if verbose: print(f"[*] Loaded {len(bibliography)} entries from {bibliography.name}")
+    elif bibliography_only and not bibliography.only:
+        # A loaded Bibliography follows the flag too, without changing the caller's object
+        bibliography = type(bibliography)(bibliography.records, bibliography.name, bibliography.digest, True)
+
+    store = result_cache
+    if isinstance(result_cache, (str, os.PathLike)):
+        from .result_cache import ResultCache
+        store = ResultCache(result_cache)
+    if store is not None:
+        from .result_cache import read_output, result_data, stream_start
+        with metrics.phase("result_cache"):
+            cache_key = store.key(src, engine=engine, fast_save=fast_save, compresslevel=compresslevel,
+                                  in_place=in_place, link_style=link_style,
+                                  ref_headings=sorted(ref_headings),
+                                  bibliography=[bibliography.digest, bibliography.only] if bibliography else None)
+            cached = store.get(cache_key, dst)
+        if cached is not None:
+            if verbose: print(f"[*] Unchanged input: linked copy taken from {store.directory}")
+            metrics.count("result_cache_hits")
+            metrics.count("bytes_written", stream_size(dst))
+            cached["linked_references"] = set(cached["linked_references"])
+            result = LinkResult(input_name, dst, **cached)
+        output_start = stream_start(dst)
+    else:
+        cached = None
+
+    if cached is None:
+        plan_cache = cache
+        if isinstance(cache, (str, os.PathLike)):
+            from .plan_cache import PlanCache
+            plan_cache = PlanCache(cache)
+        try:
+            if engine == "stream":
+                from .stream_linker import link_stream
+                index, linked_references, missing_citations, unlinked_fields = link_stream(
+                    src, dst, metrics, verbose, show_progress, progress_interval_ms, compresslevel, plan_cache,
+                    in_place, link_style, ref_headings, bibliography)
+            else:
+                index, linked_references, missing_citations, unlinked_fields = link_docx(
+                    src, dst, metrics, verbose, show_progress, progress_interval_ms, fast_save, compresslevel,
+                    plan_cache, in_place, link_style, ref_headings, bibliography)
+        finally:
+            if plan_cache is not cache:
+                plan_cache.close()
+        metrics.count("bytes_written", stream_size(dst))
+
+        # Ambiguous citations are reported on their own, not as broken
+        missing_citations = [c for c in missing_citations if c not in index.ambiguous]
+        with metrics.phase("suggestions"):
+            # From the reference list; from the file only when it stands in for the list
+            suggestions = suggest_for(missing_citations, index.entries if bibliography is not None and bibliography.only
+                                      else [entry for entry in index.entries if entry.bookmark])
+        # Bibliography-file entries have no bookmark: they are reported apart from the reference list
+        ref_map = {key: bookmark for key, bookmark in index.ref_map.items() if bookmark}
+        result = LinkResult(input_name, dst, ref_map, linked_references & ref_map.keys(), missing_citations,
+                            index.ambiguous, [[entry.key for entry in group] for group in index.duplicates],
+                            suggestions)
+        result.unlinked_fields = unlinked_fields
+        if unlinked_fields and verbose:
+            print(f"[!] {len(unlinked_fields)} paragraph(s) with citation fields left unlinked (see the report)")
+        if bibliography is not None and not bibliography.only:
+            result.bibliography_only = sorted(linked_references - ref_map.keys())
+            result.document_only = sorted(index.document_only)
+        if store is not None:
+            document = read_output(dst, output_start)
+            if document is not None:
+                store.put(cache_key, document, result_data(result))
+
+    if report_path:
+        if verbose: print(f"[*] Generating Report to: {report_path}")
+        with metrics.phase("report"):
+            write_validation_report(report_path, result)
+        metrics.count("bytes_written", os.path.getsize(report_path))
+    if metrics_path:
+        metrics.write(metrics_path)
+
+    result.metrics = metrics.as_dict()
+    result.seconds = time.perf_counter() - started
+    return result
+
+def link_bytes(data, **options):
+    """In-memory linking: .docx bytes (or a binary file object) in, (linked bytes, LinkResult) out."""
+    out = io.BytesIO()
+    result = link_document(data, out, **options)
+    result.output = None
+    return out.getvalue(), result
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+
+from .field_codes import FieldItem, FieldMatcher, csl_item, year_text
+
+# --------------------------------------------------------
+# BIBLIOGRAPHY FILES
+# A shared .bib, .ris or CSL-JSON library can stand in for, or back up,
+# the reference list typed into the document. Each format is read in one
+# forward scan (str.find over BibTeX braces, one pass over RIS lines, one
+# json.loads), so a lab library of 10k+ entries loads in a fraction of a
+# second. Records are FieldItems, matched to the document's entries the way
+# reference-manager fields are (DOI, then authors + year, then title).
+# Records the document's list lacks join the index without a bookmark:
+# citations of them resolve (they are not broken) but cannot be linked,
+# since the document has nothing to link to. They are only found through
+# the citation grammar, never by the surname scanner, nor do they confirm
+# a bare-year site such as "May 2020".
+# --------------------------------------------------------
+
+BIBLIOGRAPHY_EXTENSIONS = (".bib", ".ris", ".json")
+
+# BibTeX fields that are read; the others are skipped unparsed
+_BIBTEX_FIELDS = frozenset(("author", "editor", "year", "date", "title", "doi"))
+# LaTeX commands: accents ("\'a", "\"{o}") are dropped, escaped symbols ("\&") kept
+_LATEX_COMMAND = re.compile(r"\\([a-zA-Z]+\s*|[^a-zA-Z])")
+_LATEX_SYMBOLS = "&%$#_{}"
+_AND = re.compile(r"\s+and\s+")
+
+def _surname(family):
+    # First word of the family name, as reference_index.py keys entries
+    words = family.split()
+    return words[0] if words else ""
+
+# --- BibTeX ---
+def _closing(text, i):
+    """Index of the "}" that closes the "{" at `i` (len(text) when unclosed)."""
+    depth = 0
+    while True:
+        close = text.find("}", i)
+        if close == -1:
+            return len(text)
+        depth += text.count("{", i, close) - 1
+        if depth <= 0:
+            return close
+        i = close + 1
+
+def _plain(value):
+    """A BibTeX value as text: LaTeX accents, escapes and braces removed."""
+    if "\\" in value:
+        value = _LATEX_COMMAND.sub(lambda m: m.group(1) if m.group(1) in _LATEX_SYMBOLS else "", value)
+    return " ".join(value.replace("{", "").replace("}", "").split())
+
+def _bibtex_family(name):
+    # "Smith, John" / "van der Berg, J." / "John Smith" / "Ludwig van Beethoven" / "{World Health Organization}"
+    name = name.strip()
+    if name.startswith("{") and name.endswith("}"):
+        return _plain(name)
+    name = _plain(name)
+    if "," in name:
+        return name.split(",")[0]
+    words = name.split()
+    for k in range(1, len(words) - 1):
+        if words[k][:1].islower():
+            # The "von" part starts the family name
+            return " ".join(words[k:])
+    return words[-1] if words else ""
+
+def _bibtex_entry(text, i):
+    """(citation key, {field: raw value}, end) of the entry whose body starts at `i`.
+
+    `end` is the index of the entry's closing "}": the fields are read
+    left to right and the entry ends at the first "}" where a field could start.
+    """
+    n = len(text)
+    comma, close = text.find(",", i), text.find("}", i)
+    close = n if close == -1 else close
+    if comma == -1 or close < comma:
+        return text[i:close].strip(), {}, close
+    key = text[i:comma].strip()
+    fields = {}
+    i = comma + 1
+    while True:
+        eq, close = text.find("=", i), text.find("}", i)
+        close = n if close == -1 else close
+        if eq == -1 or close < eq:
+            return key, fields, close
+        name = text[i:eq].strip(" \t\r\n,").casefold()
+        j = eq + 1
+        while j < n and text[j].isspace():
+            j += 1
+        if j < n and text[j] == "{":
+            end = _closing(text, j)
+            value, i = text[j + 1:end], end + 1
+        elif j < n and text[j] == '"':
+            end = text.find('"', j + 1)
+            end = n if end == -1 else end
+            value, i = text[j + 1:end], end + 1
+        else:
+            # A bare number or @string macro, up to the next field or the end of the entry
+            end = text.find(",", j)
+            end = close if end == -1 or close < end else end
+            value, i = text[j:end], end
+        if name in _BIBTEX_FIELDS:
+            fields[name] = value
+
+def parse_bibtex(text):
+    """FieldItems of the entries of a BibTeX / BibLaTeX file, in file order."""
+    at = text.find("@")
+    while at != -1:
+        brace = text.find("{", at)
+        if brace == -1:
+            return
+        kind = text[at + 1:brace].strip().casefold()
+        if kind in ("comment", "preamble", "string"):
+            end = _closing(text, brace)
+        else:
+            key, fields, end = _bibtex_entry(text, brace + 1)
+            names = fields.get("author") or fields.get("editor") or ""
+            surnames = tuple(filter(None, (_surname(_bibtex_family(name))
+                                           for name in _AND.split(names.strip()) if name)))
+            yield FieldItem(("bib", key), surnames, year_text(fields.get("year") or fields.get("date") or ""),
+                            _plain(fields.get("doi", "")), _plain(fields.get("title", "")))
+        at = text.find("@", end)
+
+# --- RIS ---
+def parse_ris(text):
+    """FieldItems of the records of a RIS file, in file order."""
+    record = None
+    count = 0
+    for line in text.splitlines():
+        if line[2:5] != "  -":
+            continue
+        tag, value = line[:2], line[6:].strip()
+        if tag == "TY":
+            record = {"AU": [], "ID": "", "PY": "", "TI": "", "DO": ""}
+        elif record is None:
+            continue
+        elif tag in ("AU", "A1"):
+            record["AU"].append(_surname(value.split(",")[0]))
+        elif tag in ("PY", "Y1", "DA"):
+            record["PY"] = record["PY"] or year_text(value)
+        elif tag in ("TI", "T1"):
+            record["TI"] = record["TI"] or value
+        elif tag in ("DO", "ID"):
+            record[tag] = value
+        elif tag == "ER":
+            count += 1
+            yield FieldItem(("bib", record["ID"] or str(count)), tuple(filter(None, record["AU"])), record["PY"],
+                            record["DO"], record["TI"])
+            record = None
+
+# --- CSL-JSON ---
+def parse_csl_json(text):
+    """FieldItems of a CSL-JSON file (a list of items, as Zotero and Mendeley export)."""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("items", [])
+    return [csl_item(item, ("bib", str(item.get("id", k)))) for k, item in enumerate(data)
+            if isinstance(item, dict)]
+
+_PARSERS = {".bib": parse_bibtex, ".ris": parse_ris, ".json": parse_csl_json}
+
+class Bibliography:
+    """The records of one bibliography file, and how they join a ReferenceIndex.
+
+    `only` means the file replaces the document's reference list instead
+    of backing it up. `digest` identifies the file's contents (for the
+    result cache).
+    """
+
+    def __init__(self, records=(), name="", digest="", only=False):
+        self.records = list(records)
+        self.name = name
+        self.digest = digest
+        self.only = only
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def load(cls, path, only=False):
+        """Reads a .bib, .ris or .json (CSL-JSON) file; raises ValueError for any other extension."""
+        extension = os.path.splitext(os.fspath(path))[1].casefold()
+        if extension not in _PARSERS:
+            raise ValueError(f"Unknown bibliography format: {path!r} "
+                             f"(expected {', '.join(BIBLIOGRAPHY_EXTENSIONS)})")
+        with open(path, "rb") as f:
+            data = f.read()
+        records = _PARSERS[extension](data.decode("utf-8-sig", errors="replace"))
+        return cls(records, os.path.basename(os.fspath(path)), hashlib.blake2b(data, digest_size=16).hexdigest(),
+                   only)
+
+    def merge(self, index):
+        """Adds the records the index lacks; returns the keys of its entries the file lacks.
+
+        Run after Phase 1, so the index holds the document's own entries.
+        """
+        matcher = FieldMatcher(index)
+        matched = set()
+        new = []
+        for record in self.records:
+            entries = matcher.entries(record)
+            if entries:
+                matched.update(entry.key for entry in entries)
+            elif record.surnames and record.year:
+                new.append(record)
+        document_only = [entry.key for entry in index.entries if entry.key not in matched]
+        # Added after matching, so records only ever match the document's entries
+        for record in new:
+            index.add_entry(list(record.surnames), False, record.year, "", record.title, record.doi, from_file=True)
+        return document_only
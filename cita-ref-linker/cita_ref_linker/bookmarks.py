@@ -0,0 +1,97 @@
+import re
+from collections import Counter
+
+from .ooxml import W_BOOKMARK_END, W_BOOKMARK_START, W_HYPERLINK, W_R, run_text, w
+
+# --------------------------------------------------------
+# BOOKMARKS AND EXISTING LINKS
+# Every reference entry gets a REF_ bookmark and every linked citation a
+# w:hyperlink anchored on one. A document that went through the linker
+# before already has them; these helpers find, keep or drop them, on the
+# raw w:p element so both engines share them.
+# --------------------------------------------------------
+
+# Bookmarks and hyperlink anchors the linker writes all start with this
+REF_PREFIX = "REF_"
+
+def bookmark_name_for(key, bookmark_id):
+    safe_key = re.sub(r"[^A-Za-z0-9]", "", key)
+    return f"REF_{safe_key}_{bookmark_id}"
+
+def assign_bookmarks(found, used_ids=None):
+    """Bookmarks for the Phase 1 entries, reusing what an earlier run left behind.
+
+    `found` is [(entry, [(name, id)] of the REF_ bookmarks already on its
+    paragraph)]. `used_ids` counts the w:id of every w:bookmarkStart in the
+    part (see bookmark_ids), the document's own bookmarks included. An
+    existing bookmark is kept when it was made for the same key and no other
+    bookmark shares its id; every other entry gets a new one, with an id no
+    bookmark in the part uses. Sets entry.bookmark and returns
+    [(name, id, is_new)] in the same order.
+    """
+    used_ids = used_ids or {}
+    kept = {}
+    claimed = set()
+    for k, (entry, existing) in enumerate(found):
+        prefix = bookmark_name_for(entry.key, "")
+        for name, bookmark_id in existing:
+            if name not in claimed and name == prefix + bookmark_id and used_ids.get(bookmark_id, 1) == 1:
+                kept[k] = (name, bookmark_id, False)
+                claimed.add(name)
+                break
+    taken = set(used_ids) | {bookmark_id for _, bookmark_id, _ in kept.values()}
+
+    assigned = []
+    next_id = 0
+    for k, (entry, _) in enumerate(found):
+        if k not in kept:
+            while str(next_id) in taken:
+                next_id += 1
+            kept[k] = (bookmark_name_for(entry.key, next_id), next_id, True)
+            next_id += 1
+        entry.bookmark = kept[k][0]
+        assigned.append(kept[k])
+    return assigned
+
+def bookmark_ids(element, counts=None):
+    """Counter of the w:id of every w:bookmarkStart in `element`, added to `counts` when given."""
+    counts = Counter() if counts is None else counts
+    counts.update(mark.get(w("id")) for mark in element.iter(W_BOOKMARK_START))
+    return counts
+
+def ref_bookmarks(p):
+    """(name, id) of the REF_ bookmarks that start in paragraph `p`."""
+    return [(child.get(w("name")), child.get(w("id"))) for child in p
+            if child.tag == W_BOOKMARK_START and child.get(w("name"), "").startswith(REF_PREFIX)]
+
+def drop_ref_bookmarks(p, keep=None):
+    """Removes the REF_ bookmarks of `p` other than the one named `keep`; returns how many went."""
+    dropped = set()
+    for child in list(p):
+        if child.tag == W_BOOKMARK_START:
+            name = child.get(w("name"), "")
+            if name.startswith(REF_PREFIX) and name != keep:
+                dropped.add(child.get(w("id")))
+                p.remove(child)
+    if dropped:
+        for child in list(p):
+            if child.tag == W_BOOKMARK_END and child.get(w("id")) in dropped:
+                p.remove(child)
+    return len(dropped)
+
+def ref_link_spans(p):
+    """[(start, end, anchor)] of the REF_ hyperlinks in `p`, as offsets into paragraph_text(p)."""
+    if not any(child.tag == W_HYPERLINK for child in p):
+        return []
+    spans = []
+    offset = 0
+    for child in p:
+        if child.tag == W_R:
+            offset += len(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            length = sum(len(run_text(r)) for r in child if r.tag == W_R)
+            anchor = child.get(w("anchor"), "")
+            if anchor.startswith(REF_PREFIX):
+                spans.append((offset, offset + length, anchor))
+            offset += length
+    return spans
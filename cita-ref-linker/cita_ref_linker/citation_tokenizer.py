@@ -0,0 +1,236 @@
+import re
+from functools import lru_cache
+from collections import namedtuple
+
+# --------------------------------------------------------
+# CITATION TOKENIZER
+# One compiled scanner per paragraph turns the text into typed tokens. It is
+# the old Phase 2 citation_pattern,
+#   (?P<paren>\([^\)]+\)) |
+#   (?P<narrative>[A-Z][\w\-\']+(?:\s+(?:&|and)\s+[A-Z][\w\-\']+)?(?:\s+et\s+al\.?)?\s*\(\d{4}\))
+# so it finds exactly what that found, and the Python left per citation is
+# building its token. The ";"-pieces of a group go through parse_sub_citation(),
+# which replaces the (.*),\s.*?(\d{4}) regex, once per distinct group text.
+# Tokens also report the author list, year suffix ("2020a") and page locator,
+# worked out when they are read.
+# --------------------------------------------------------
+
+# The authors of a narrative citation, read again only when the planner has not
+# resolved the same citation text before
+_narrative_authors = re.compile(
+    r"([A-Z][\w\-\']+)(?:\s+(?:&|and)\s+([A-Z][\w\-\']+))?(\s+et\s+al\.?)?\s*\(\d{4}\)"
+).fullmatch
+
+class Narrative(namedtuple("Narrative", "start end text")):
+    """A narrative citation: "Nurhayati & Wijayanti (2021)", "Pratiwi et al. (2018)".
+
+    The text always ends in "(yyyy)"; the authors are worked out on access.
+    """
+    __slots__ = ()
+
+    @property
+    def author_text(self):
+        return self.text[:-6].strip()
+
+    @property
+    def surname(self):
+        """First author word, already in clean_author_name() form."""
+        return _narrative_authors(self.text).group(1)
+
+    @property
+    def authors(self):
+        first, second = _narrative_authors(self.text).group(1, 2)
+        return (first, second) if second else (first,)
+
+    @property
+    def et_al(self):
+        return _narrative_authors(self.text).group(3) is not None
+
+    @property
+    def year(self):
+        return self.text[-5:-1]
+
+    suffix = ""
+
+# A parenthetical group: "(Dikmenli, 2010; Aini & Zulyusri, 2018)". `parts` holds
+# one entry per ";"-separated piece, stripped: a SubCitation, or a plain str
+# when the piece has no "author, year" shape (e.g. "(see Table 2)").
+ParenGroup = namedtuple("ParenGroup", "start end text parts")
+
+class SubCitation(namedtuple("SubCitation", "text author_text year year_end")):
+    """One author-year piece of a parenthetical group.
+
+    Linking only needs the authors and year, so the surname, author list,
+    suffix and locator are worked out on access rather than for every citation.
+    """
+    __slots__ = ()
+
+    @property
+    def surname(self):
+        """First author word in clean_author_name() form."""
+        first_word = self.author_text.split(None, 1)[0]
+        # clean_author_name() without the re.sub when there is nothing to strip
+        return first_word if _is_word_text(first_word) else _clean_word(first_word)
+
+    @property
+    def author_names(self):
+        """(authors, et_al) in one call: ("Fajri", "Roviati", "Anugrah"), False."""
+        return _split_authors(self.author_text)
+
+    @property
+    def authors(self):
+        return self.author_names[0]
+
+    @property
+    def et_al(self):
+        return self.author_names[1]
+
+    @property
+    def suffix(self):
+        """Year suffix that tells same-year works apart: "a" in "2020a"."""
+        cite = self.text
+        i = suffix_end = self.year_end
+        if i == len(cite):
+            return ""
+        while suffix_end < len(cite) and "a" <= cite[suffix_end] <= "z":
+            suffix_end += 1
+        return cite[i:suffix_end] if suffix_end - i == 1 else ""
+
+    @property
+    def locator(self):
+        """Page or section locator after the year, e.g. "p. 45"."""
+        return self.text[self.year_end + len(self.suffix):].lstrip(" ,:").strip() or None
+
+# Tokens are built once per citation on the hot path; tuple.__new__ skips the
+# Python-level namedtuple constructor
+_make = tuple.__new__
+
+_EXTRA_WORD_CHARS = "-'"
+_DROP_WORD_PUNCT = str.maketrans("", "", "_-'")
+
+def _is_word_text(text):
+    # [\w\-\']+ -- str.translate() costs ten isalnum() calls, so plain words skip it
+    return text.isalnum() or text.translate(_DROP_WORD_PUNCT).isalnum()
+
+def is_word_char(ch):
+    # [\w\-\']
+    return ch.isalnum() or ch == "_" or ch in _EXTRA_WORD_CHARS
+
+def _clean_word(word):
+    # re.sub(r"[^\w\-\']", "", word)
+    return "".join(filter(is_word_char, word))
+
+def _split_authors(author_text):
+    """"Fajri, Roviati, & Anugrah" -> ("Fajri", "Roviati", "Anugrah"), et_al flag."""
+    if _is_word_text(author_text):
+        # A single surname, the most common case
+        return (author_text,), False
+    et_al = False
+    names = []
+    for chunk in author_text.replace("&", ",").split(","):
+        chunk = chunk.strip()
+        if chunk.startswith("and "):
+            chunk = chunk[4:].strip()
+        if chunk.endswith("et al.") or chunk.endswith("et al"):
+            chunk = chunk[:chunk.rindex("et al")].strip()
+            et_al = True
+        if chunk:
+            names.extend(part for part in chunk.split(" and ") if part)
+    return tuple(names), et_al
+
+_ASCII_DIGIT_MASK = str.maketrans("123456789", "000000000")
+
+def _digit_mask(text):
+    """Same length as `text`, with every decimal digit turned into "0" (and no other "0")."""
+    if text.isascii():
+        return text.translate(_ASCII_DIGIT_MASK)
+    return "".join("0" if ch.isdecimal() else "." for ch in text)
+
+def _sub_citation(cite, author_text, year_at):
+    """SubCitation, or False when the author part is empty."""
+    if not author_text or author_text.isspace():
+        return False
+    return _make(SubCitation, (cite, author_text, cite[year_at:year_at + 4], year_at + 4))
+
+# The common piece on one line: the year right after the last ", " that has one,
+# and no other four-digit run after it ("Aini & Zulyusri, 2018", "Fajri, Roviati,
+# & Anugrah, 2020a, p. 4"). It makes the same choice as the general search below.
+_common_piece = re.compile(r"([^\n]+),\s(\d{4})(?:(?!\d{4})[^\n])*").fullmatch
+
+def parse_sub_citation(cite):
+    r"""Splits one stripped ";"-piece into a SubCitation, or returns None.
+
+    Same choice as re.search(r"(.*),\s.*?(\d{4})", cite): the author part runs
+    from the start of the first line that has a match to the last ", " on it
+    that still has a four-digit year after it, and the year is the first
+    such run of digits (".*?" and "." stop at a newline, "\s" does not).
+    """
+    common = _common_piece(cite)
+    if common is not None:
+        return _make(SubCitation, (cite, common.group(1), common.group(2), common.end(2)))
+    n = len(cite)
+    if "\n" not in cite:
+        return _sub_citation_in_line(cite, 0, n, n, None) or None
+
+    mask = _digit_mask(cite)
+    line_start = 0
+    while line_start <= n:
+        line_end = cite.find("\n", line_start)
+        if line_end == -1:
+            line_end = n
+        sub = _sub_citation_in_line(cite, line_start, line_end, n, mask)
+        if sub is not None:
+            # False: the match has no author text, which ends the search too
+            return sub or None
+        line_start = line_end + 1
+    return None
+
+def _sub_citation_in_line(cite, line_start, line_end, n, mask):
+    """SubCitation for the first match on one line, None if there is none."""
+    k = cite.rfind(",", line_start, line_end)
+    # Going right to left, each digit search only covers new ground
+    searched_from = searched_stop = None
+    while k != -1:
+        if k + 1 < n and cite[k + 1].isspace():
+            if mask is None:
+                mask = _digit_mask(cite)
+            stop = line_end if line_end > k + 1 else cite.find("\n", k + 2)
+            if stop == -1:
+                stop = n
+            search_end = min(stop, searched_from + 3) if stop == searched_stop else stop
+            year_at = mask.find("0000", k + 2, search_end)
+            if year_at != -1:
+                return _sub_citation(cite, cite[line_start:k], year_at)
+            searched_from, searched_stop = k + 2, stop
+        k = cite.rfind(",", line_start, k)
+    return None
+
+# The old Phase 2 citation_pattern, with the bracket of a group outside its
+# capture. "(" starts a group and a capital a narrative citation, so the order
+# of the alternatives never changes what it finds.
+_scan_citations = re.compile(
+    r"\((?P<paren>[^)]+)\)"
+    r"|[A-Z][\w\-\']+(?:\s+(?:&|and)\s+[A-Z][\w\-\']+)?(?:\s+et\s+al\.?)?\s*\(\d{4}\)"
+).finditer
+
+@lru_cache(maxsize=4096)
+def _group_parts(inner):
+    """ParenGroup.parts for the text between the brackets; a manuscript repeats its groups."""
+    return tuple(parse_sub_citation(piece) or piece for piece in map(str.strip, inner.split(";")))
+
+def tokenize_citations(text):
+    """Returns the Narrative / ParenGroup tokens of a paragraph, in order.
+
+    The text between tokens is plain prose. Matches never overlap and the
+    scan resumes after each token, as with re.finditer.
+    """
+    tokens = []
+    append = tokens.append
+    for match in _scan_citations(text):
+        start, end = match.span()
+        inner = match.group("paren")
+        if inner is None:
+            append(_make(Narrative, (start, end, match.group())))
+        else:
+            append(_make(ParenGroup, (start, end, match.group(), _group_parts(inner))))
+    return tokens
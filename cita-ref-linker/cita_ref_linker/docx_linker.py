@@ -0,0 +1,291 @@
+from .bookmarks import assign_bookmarks, bookmark_ids, drop_ref_bookmarks, ref_bookmarks
+from .docx_zip import DEFAULT_COMPRESS_LEVEL, rewrite_package
+from .ooxml import W_HYPERLINK
+from .planner import REBUILD, link_paragraph, make_planner, may_cite
+from .progress import ProgressReporter
+from .reference_index import ReferenceIndex
+
+# --------------------------------------------------------
+# PYTHON-DOCX ENGINE
+# Loads the package with python-docx and links its Paragraph objects.
+# python-docx and lxml are imported where they are used, so importing this
+# module (e.g. from a long-running service) stays cheap and side-effect free.
+# --------------------------------------------------------
+
+# --- XML HELPER FUNCTIONS ---
+def add_bookmark(p, bookmark_name, bookmark_id):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    start = OxmlElement('w:bookmarkStart')
+    start.set(qn('w:id'), str(bookmark_id))
+    start.set(qn('w:name'), bookmark_name)
+    p._p.insert(0, start)
+    end = OxmlElement('w:bookmarkEnd')
+    end.set(qn('w:id'), str(bookmark_id))
+    p._p.append(end)
+
+def create_hyperlink_run(paragraph, text, bookmark_name, font_name="Calibri", font_size=None, link_format=None):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('w:anchor'), bookmark_name)
+    hyperlink.set(qn('w:history'), '1')
+
+    # Force Font Preservation (Default to Calibri)
+    actual_font = font_name if font_name else "Calibri"
+    size_val = str(int(font_size.pt * 2)) if font_size else None
+
+    r = OxmlElement('w:r')
+    if link_format is not None:
+        # Cloned from a per-font template (see link_style.py)
+        r.append(link_format.rpr(actual_font, size_val))
+    else:
+        rPr = OxmlElement('w:rPr')
+
+        color = OxmlElement('w:color')
+        color.set(qn('w:val'), '0000FF')
+        underline = OxmlElement('w:u')
+        underline.set(qn('w:val'), 'single')
+        rPr.append(color)
+        rPr.append(underline)
+
+        rFonts = OxmlElement('w:rFonts')
+        rFonts.set(qn('w:ascii'), actual_font)
+        rFonts.set(qn('w:hAnsi'), actual_font)
+        rPr.append(rFonts)
+
+        if size_val:
+            sz = OxmlElement('w:sz')
+            sz.set(qn('w:val'), size_val)
+            rPr.append(sz)
+        r.append(rPr)
+
+    t = OxmlElement('w:t')
+    t.text = text
+    r.append(t)
+    hyperlink.append(r)
+    paragraph._p.append(hyperlink)
+    return hyperlink
+
+def add_text_run(paragraph, text, font_name, font_size=None):
+    run = paragraph.add_run(text)
+    run.font.name = font_name
+    if font_size: run.font.size = font_size
+    return run
+
+def half_points(size_val):
+    """A w:sz value ("22") as a python-docx Length, or None."""
+    from docx.shared import Pt
+    try:
+        return Pt(int(size_val) / 2)
+    except (TypeError, ValueError):
+        return None
+
+def related_part(part, reltype):
+    """The part `part` links to with relationship `reltype`, or None."""
+    try:
+        return part.part_related_by(reltype)
+    except KeyError:
+        return None
+
+def count_elements(element):
+    """Size of an inserted XML subtree, for the metrics counters."""
+    return sum(1 for _ in element.iter())
+
+def build_text_index(paragraphs):
+    """Reads every paragraph's text once; python-docx rebuilds p.text from all runs on each access."""
+    return [p.text for p in paragraphs]
+
+def link_docx(input_filename, output_doc_path, metrics, verbose=True, show_progress=True,
+              progress_interval_ms=100, fast_save=True, compresslevel=DEFAULT_COMPRESS_LEVEL,
+              plan_cache=None, in_place=False, link_style=False, ref_headings=(), bibliography=None):
+    """python-docx engine. Returns (index, linked_references, missing_citations, unlinked_fields).
+
+    With `fast_save` only the document part is re-serialized; every other
+    package part is copied raw from the input (see docx_zip.py). Otherwise the
+    whole package goes through python-docx's doc.save(). `in_place` wraps the
+    cited runs in hyperlinks instead of rebuilding the paragraph (see run_splicer.py).
+    `link_style` formats the links with a "Cited Reference" character style
+    (see link_style.py). Citations are linked in tables, text boxes, notes,
+    headers and footers as well as in body paragraphs (see stories.py).
+    `ref_headings` are extra bibliography titles (see section_locator.py).
+    `bibliography` is a Bibliography whose records join the index after
+    Phase 1, or replace the document's entries when its `only` is set (see bibliography.py).
+    """
+    from docx import Document
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from docx.opc.oxml import serialize_part_xml
+    from docx.oxml.parser import parse_xml
+    from docx.text.paragraph import Paragraph
+    from lxml import etree
+    from .field_codes import FieldMatcher, plan_fields
+    from .font_resolver import FontResolver
+    from .link_style import CITED_STYLE_ID, LinkFormat, ensure_cited_style
+    from .section_locator import HeadingStyles, heading_set, locate_section
+    from .stories import STORY_RELTYPES, content_control_paragraphs, story_paragraphs
+
+    if verbose: print(f"[*] Loading {input_filename}...")
+    with metrics.phase("load"):
+        doc = Document(input_filename)
+        body = doc.element.body
+        all_paragraphs = [Paragraph(p, doc._body) for p in story_paragraphs(body)]
+        body_count = len(all_paragraphs)
+        # Notes, headers and footers: python-docx only loads some of them as XML
+        stories = []
+        for rel in sorted(doc.part.rels.values(), key=lambda rel: (STORY_RELTYPES.index(rel.reltype), rel.target_ref)
+                          if rel.reltype in STORY_RELTYPES else (-1, "")):
+            if rel.is_external or rel.reltype not in STORY_RELTYPES:
+                continue
+            part = rel.target_part
+            root = part.element if hasattr(part, "element") else parse_xml(part.blob)
+            stories.append((part, root, len(all_paragraphs)))
+            all_paragraphs.extend(Paragraph(p, doc._body) for p in story_paragraphs(root))
+    with metrics.phase("text_index"):
+        para_texts = build_text_index(all_paragraphs)
+    total_paras = len(all_paragraphs)
+
+    styles_part = related_part(doc.part, RT.STYLES)
+    theme_part = related_part(doc.part, RT.THEME)
+    fonts = FontResolver(styles_part.element if styles_part is not None else None,
+                         etree.fromstring(theme_part.blob) if theme_part is not None else None)
+
+    if link_style and styles_part is None:
+        if verbose: print("[!] No styles part: links get direct formatting instead of a style")
+        link_style = False
+    if link_style:
+        ensure_cited_style(styles_part.element)
+        link_format = LinkFormat(CITED_STYLE_ID)
+    else:
+        link_format = LinkFormat()
+
+    index = ReferenceIndex()
+    linked_references = set()
+    missing_citations = []
+    unlinked_fields = []
+    found = []
+    sites = []
+
+    # --- PHASE 1: MAPPING ---
+    # The bibliography's index range is located first (see section_locator.py);
+    # then one pass maps the entries inside it and records which paragraphs
+    # outside it may hold a citation. Phase 2 links just those, against the
+    # finished index.
+    if verbose: print("\n[*] Phase 1: Mapping References")
+
+    progress = ProgressReporter(total_paras, prefix='Scanning:', interval_ms=progress_interval_ms,
+                                quiet=not show_progress)
+    with metrics.phase("phase1_mapping"):
+        # Body paragraphs in reading order, table cells included, can be the heading or an
+        # entry; table of contents lines (in content controls) cannot
+        levels = HeadingStyles(styles_part.element if styles_part is not None else None)
+        toc = set(content_control_paragraphs(body))
+        section = locate_section([(para_texts[i], levels.level(p._p)) if p._p not in toc else None
+                                  for i, p in enumerate(all_paragraphs[:body_count])], heading_set(ref_headings))
+        heading, end = section if section is not None else (body_count, body_count)
+        if section is None and verbose: print("[!] No reference section heading found")
+
+        for i, p in enumerate(all_paragraphs):
+            progress.update(i + 1)
+            metrics.count("paragraphs_scanned")
+
+            text = para_texts[i]
+            if heading < i < end:
+                if p._p in toc or (bibliography is not None and bibliography.only):
+                    continue
+                entry = index.add(text)
+                if entry:
+                    metrics.count("regex_matches")
+                    found.append((p, entry, ref_bookmarks(p._p)))
+                else:
+                    metrics.count("bookmarks_removed", drop_ref_bookmarks(p._p))
+            elif i != heading and (may_cite(text) or p._p.find(W_HYPERLINK) is not None):
+                # Hyperlinks may be links from an earlier run that need repair
+                sites.append(i)
+
+        # Bookmarks from an earlier run stay when they still fit their entry; new ids
+        # avoid every bookmark already in the document
+        assigned = assign_bookmarks([(entry, existing) for _, entry, existing in found], bookmark_ids(body))
+        for (p, _, existing), (name, bookmark_id, is_new) in zip(found, assigned):
+            if existing:
+                metrics.count("bookmarks_removed", drop_ref_bookmarks(p._p, keep=None if is_new else name))
+            if is_new:
+                add_bookmark(p, name, bookmark_id)
+                metrics.count("xml_elements_inserted", 2)
+            else:
+                metrics.count("bookmarks_kept")
+    progress.finish()
+
+    if verbose: print(f"    > Mapped {len(index)} references.")
+    if bibliography is not None:
+        with metrics.phase("phase1_mapping"):
+            mapped = len(index)
+            index.document_only = bibliography.merge(index)
+        if verbose: print(f"    > {len(index) - mapped} more from {bibliography.name} (not linked).")
+    # Story parts are re-serialized only when they may cite
+    story_ends = [start for _, _, start in stories[1:]] + [total_paras]
+    touched = [(part, root) for (part, root, start), end in zip(stories, story_ends)
+               if any(start <= i < end for i in sites)]
+    ref_map = index.ref_map
+    plan_paragraph = make_planner(index, plan_cache, metrics)
+    matcher = FieldMatcher(index)
+
+    # A bibliography file that replaces the reference list leaves nothing to link to
+    check_only = bibliography is not None and bibliography.only
+
+    def field_plan(p, text):
+        return plan_fields(p, text, matcher, plan_paragraph)
+
+    # --- PHASE 2: LINKING ---
+    if verbose: print("\n[*] Phase 2: Linking Citations")
+
+    progress = ProgressReporter(len(sites), prefix='Linking :', interval_ms=progress_interval_ms,
+                                quiet=not show_progress)
+    with metrics.phase("phase2_linking"):
+        for done, i in enumerate(sites):
+            progress.update(done + 1)
+            p = all_paragraphs[i]
+            text = para_texts[i]
+
+            segments, action = link_paragraph(p._p, text, plan_paragraph, ref_map, linked_references,
+                                              missing_citations, unlinked_fields, metrics, field_plan,
+                                              in_place, link_format.style_id, check_only)
+            if action != REBUILD:
+                continue
+
+            # Effective font from the runs, the style chain or docDefaults (see font_resolver.py)
+            original_font_name, size_val = fonts.paragraph_font(p._p)
+            original_font_size = half_points(size_val)
+
+            p.text = "" 
+            for fragment, key, is_citation in segments:
+                if key:
+                    linked_references.add(key)
+                if key and ref_map[key]:
+                    hyperlink = create_hyperlink_run(p, fragment, ref_map[key], original_font_name, original_font_size,
+                                                     link_format)
+                    metrics.count("hyperlinks_created")
+                    metrics.count("xml_elements_inserted", count_elements(hyperlink))
+                else:
+                    if is_citation and not key:
+                        missing_citations.append(fragment)
+                    run = add_text_run(p, fragment, original_font_name, original_font_size)
+                    metrics.count("xml_elements_inserted", count_elements(run._r))
+    progress.finish()
+
+    # --- SAVE TO FOLDER ---
+    if verbose: print(f"\n[*] Saving Document to: {output_doc_path}")
+    with metrics.phase("save"):
+        if fast_save:
+            writers = {doc.part.partname.membername: lambda zin, out: out.write(doc.part.blob)}
+            if link_style:
+                writers[styles_part.partname.membername] = lambda zin, out: out.write(styles_part.blob)
+            for part, root in touched:
+                writers[part.partname.membername] = lambda zin, out, root=root: out.write(serialize_part_xml(root))
+            rewrite_package(input_filename, output_doc_path, writers, compresslevel)
+        else:
+            for part, root in touched:
+                if not hasattr(part, "element"):
+                    part._blob = serialize_part_xml(root)
+            doc.save(output_doc_path)
+
+    return index, linked_references, missing_citations, unlinked_fields
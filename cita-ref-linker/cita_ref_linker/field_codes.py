@@ -0,0 +1,250 @@
+import json
+from collections import namedtuple
+
+from lxml import etree
+
+from .ooxml import W_HYPERLINK, W_R, piece_text, w
+
+# --------------------------------------------------------
+# REFERENCE MANAGER FIELDS
+# Zotero, Mendeley and EndNote wrap each in-text citation in a complex
+# field whose instruction carries the cited items:
+#   ADDIN ZOTERO_ITEM CSL_CITATION {"citationItems": [{"id": 12, "itemData": {...}}]}
+#   ADDIN CSL_CITATION {...}                               (Mendeley)
+#   ADDIN EN.CITE <EndNote><Cite><RecNum>12</RecNum>...    (EndNote)
+# The instruction is parsed once per field and each item is matched to a
+# bibliography entry once per item ID (DOI, then authors + year, then
+# title), so these citations are linked exactly and without running the
+# citation tokenizer. Text outside the fields, and fields whose result
+# cannot be split per item, still go through plan_citations().
+# --------------------------------------------------------
+
+W_FLD_CHAR, W_INSTR_TEXT = w("fldChar"), w("instrText")
+W_FLD_CHAR_TYPE = w("fldCharType")
+
+# A cited item as the reference manager describes it
+FieldItem = namedtuple("FieldItem", "item_id surnames year doi title")
+
+# A citation field: its result text spans paragraph_text()[start:end]
+CitationField = namedtuple("CitationField", "start end items")
+
+def _runs(p):
+    # Runs in reading order, including those a hyperlink (e.g. from an earlier run) wraps
+    for child in p:
+        if child.tag == W_R:
+            yield child
+        elif child.tag == W_HYPERLINK:
+            yield from (r for r in child if r.tag == W_R)
+
+def citation_fields(p):
+    """[CitationField] of the reference-manager citations in w:p element `p`, in order."""
+    if next(p.iter(W_FLD_CHAR), None) is None:
+        return []
+    fields = []
+    offset = 0
+    depth = 0
+    instr = []
+    start = None
+    for r in _runs(p):
+        for child in r:
+            tag = child.tag
+            if tag == W_FLD_CHAR:
+                kind = child.get(W_FLD_CHAR_TYPE)
+                if kind == "begin":
+                    depth += 1
+                    if depth == 1:
+                        instr, start = [], None
+                elif kind == "separate" and depth == 1:
+                    start = offset
+                elif kind == "end" and depth:
+                    depth -= 1
+                    if depth == 0 and start is not None:
+                        items = parse_instruction("".join(instr))
+                        if items:
+                            fields.append(CitationField(start, offset, items))
+            elif tag == W_INSTR_TEXT:
+                if depth == 1 and start is None:
+                    instr.append(child.text or "")
+            else:
+                offset += len(piece_text(child))
+    return fields
+
+def parse_instruction(instr):
+    """Tuple of FieldItems cited by a field instruction, or None if it is not a citation."""
+    if "CSL_CITATION" in instr:
+        brace = instr.find("{")
+        if brace == -1:
+            return None
+        try:
+            data = json.loads(instr[brace:instr.rindex("}") + 1], strict=False)
+        except ValueError:
+            return None
+        return tuple(_csl_item(cited) for cited in data.get("citationItems", ())) or None
+    if "EN.CITE" in instr:
+        start, end = instr.find("<EndNote"), instr.rfind("</EndNote>")
+        if start == -1 or end == -1:
+            # EN.CITE.DATA keeps the record in base64 w:fldData instead
+            return None
+        try:
+            root = etree.fromstring(instr[start:end + len("</EndNote>")].encode("utf-8"))
+        except etree.XMLSyntaxError:
+            return None
+        return tuple(_endnote_item(cite) for cite in root.iter("Cite")) or None
+    return None
+
+def year_text(value):
+    # 2020, "2020", "2020-05-01", "2020/05/01/" -> "2020"
+    value = str(value or "").strip()
+    return value[:4] if value[:4].isdigit() and value[:1] in "12" else ""
+
+def _csl_item(cited):
+    data = cited.get("itemData") or {}
+    uris = cited.get("uris") or cited.get("uri") or [""]
+    item_id = cited.get("id") or data.get("id") or (uris[0] if isinstance(uris, list) else uris)
+    return csl_item(data, ("csl", str(item_id)))
+
+def csl_item(data, item_id):
+    """FieldItem of one CSL-JSON item (as Zotero, Mendeley and CSL-JSON files describe works)."""
+    surnames = []
+    for author in data.get("author") or data.get("editor") or ():
+        name = author.get("family") or author.get("literal") or ""
+        if name.strip():
+            surnames.append(name.split()[0])
+    issued = data.get("issued") or {}
+    parts = issued.get("date-parts") or [[]]
+    year = year_text(parts[0][0] if parts and parts[0] else issued.get("raw") or issued.get("literal"))
+    return FieldItem(item_id, tuple(surnames), year, data.get("DOI") or "", data.get("title") or "")
+
+def _endnote_text(element):
+    return "".join(element.itertext()).strip() if element is not None else ""
+
+def _endnote_item(cite):
+    record = cite.find("record")
+    surnames = []
+    if record is not None:
+        for author in record.iterfind("contributors/authors/author"):
+            name = _endnote_text(author).split(",")[0]
+            if name:
+                surnames.append(name.split()[0])
+    if not surnames and _endnote_text(cite.find("Author")):
+        surnames.append(_endnote_text(cite.find("Author")).split()[0])
+    year = year_text(_endnote_text(cite.find("Year")) or (
+        _endnote_text(record.find("dates/year")) if record is not None else ""))
+    title = doi = ""
+    if record is not None:
+        title = _endnote_text(record.find("titles/title"))
+        doi = _endnote_text(record.find("electronic-resource-num"))
+    return FieldItem(("endnote", _endnote_text(cite.find("RecNum"))), tuple(surnames), year, doi, title)
+
+def _title_key(title):
+    return "".join(ch for ch in title.casefold() if ch.isalnum())
+
+def _doi_key(doi):
+    doi = doi.strip().casefold()
+    at = doi.find("10.")
+    return doi[at:] if at != -1 else doi
+
+class FieldMatcher:
+    """Bibliography entries of field items, worked out once per item ID."""
+
+    def __init__(self, index):
+        self.index = index
+        self._entries = {}
+        self._by_doi = None
+        self._by_title = None
+
+    def entries(self, item):
+        """Entries the item could be: one when it matches, several when ambiguous, none when missing."""
+        # Items without an ID are only cached under their full description
+        key = item.item_id if item.item_id[1] else item
+        entries = self._entries.get(key)
+        if entries is None:
+            entries = self._entries[key] = self._match(item)
+        return entries
+
+    def _match(self, item):
+        if self._by_doi is None:
+            self._by_doi, self._by_title = {}, {}
+            for entry in self.index.entries:
+                if entry.doi:
+                    self._by_doi.setdefault(_doi_key(entry.doi), []).append(entry)
+                if entry.title:
+                    self._by_title.setdefault(_title_key(entry.title), []).append(entry)
+        if item.doi and _doi_key(item.doi) in self._by_doi:
+            return self._by_doi[_doi_key(item.doi)]
+        title = _title_key(item.title)
+        candidates = []
+        if item.surnames and item.year:
+            candidates = self.index.lookup(list(item.surnames[:2]), item.year, et_al=len(item.surnames) > 2)
+        if len(candidates) > 1 and title:
+            # "Smith 2020a" vs "Smith 2020b": the title tells them apart
+            candidates = [entry for entry in candidates if _title_key(entry.title) == title] or candidates
+        if not candidates and title:
+            candidates = [entry for entry in self._by_title.get(title, ()) if entry.year == item.year]
+        return candidates
+
+def _field_segments(result, items, matcher):
+    """Segments for one field's result text, or None when it cannot be split per item."""
+    body_start = 1 if result.startswith("(") else 0
+    body_end = len(result) - 1 if body_start and result.endswith(")") else len(result)
+    if body_start:
+        pieces = result[body_start:body_end].split(";")
+    else:
+        # Narrative ("Smith (2020)"): the whole result is the one citation
+        pieces = [result]
+    if len(pieces) != len(items):
+        return None
+    segments = [("(", None, False)] if body_start else []
+    for k, (piece, item) in enumerate(zip(pieces, items)):
+        if k:
+            segments.append((";", None, False))
+        lead = piece[:len(piece) - len(piece.lstrip())]
+        trail = piece[len(piece.rstrip()):]
+        fragment = piece.strip()
+        if lead:
+            segments.append((lead, None, False))
+        entries = matcher.entries(item)
+        if len(entries) > 1:
+            matcher.index.ambiguous[fragment] = [entry.key for entry in entries]
+        segments.append((fragment, entries[0].key if len(entries) == 1 else None, True))
+        if trail:
+            segments.append((trail, None, False))
+    if body_end < len(result):
+        segments.append((result[body_end:], None, False))
+    return segments
+
+def plan_fields(p, text, matcher, plan_text):
+    """plan_citations()-style (segments, regex_matches) for a paragraph with citation fields, else None.
+
+    `plan_text(text)` plans the text around the fields (and any field whose
+    result does not split into one piece per item) the regex way.
+    """
+    fields = citation_fields(p)
+    if not fields:
+        return None
+    segments = []
+    regex_matches = 0
+
+    def plain(fragment):
+        nonlocal regex_matches
+        if not fragment:
+            return
+        plan = plan_text(fragment)
+        if plan is None:
+            segments.append((fragment, None, False))
+        else:
+            segments.extend(plan[0])
+            regex_matches += plan[1]
+
+    position = 0
+    for field in fields:
+        plain(text[position:field.start])
+        result = text[field.start:field.end]
+        field_segments = _field_segments(result, field.items, matcher)
+        if field_segments is None:
+            plain(result)
+        else:
+            segments.extend(field_segments)
+        position = field.end
+    plain(text[position:])
+    return segments, regex_matches
@@ -0,0 +1,122 @@
+from .ooxml import (W_BASED_ON, W_PPR, W_PSTYLE, W_R, W_RFONTS, W_RPR, W_RSTYLE, W_STYLE,
+                    W_STYLE_ID, W_SZ, w)
+
+# --------------------------------------------------------
+# EFFECTIVE FONT
+# A rebuilt paragraph has to restate its font on every new run. Most runs
+# do not set one themselves: it comes from the paragraph style, the styles
+# it is based on, or the document defaults, and is often a theme font
+# ("minorHAnsi" -> the theme's Calibri). This resolves each style's
+# font once, so a paragraph costs a look at its first runs plus a dict hit.
+# --------------------------------------------------------
+
+DEFAULT_FONT = "Calibri"
+THEME_PART = "word/theme/theme1.xml"
+
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
+def theme_fonts(theme):
+    """{"major": typeface, "minor": typeface} from a theme part's root element."""
+    fonts = {}
+    for kind in ("major", "minor"):
+        latin = theme.find(f".//{{{A_NS}}}{kind}Font/{{{A_NS}}}latin")
+        if latin is not None and latin.get("typeface"):
+            fonts[kind] = latin.get("typeface")
+    return fonts
+
+class FontResolver:
+    """Effective (font name, size in half-points) of paragraphs in one document.
+
+    `styles` and `theme` are the root elements of word/styles.xml and the
+    theme part; either may be None. Style chains are resolved once per style id.
+    """
+
+    def __init__(self, styles=None, theme=None):
+        self.theme = theme_fonts(theme) if theme is not None else {}
+        self._styles = {}
+        self._resolved = {}
+        self.default_paragraph_style = None
+        self.defaults = (None, None)
+        if styles is None:
+            return
+        for style in styles.iter(W_STYLE):
+            self._styles[style.get(W_STYLE_ID)] = style
+            if style.get(w("type")) == "paragraph" and style.get(w("default")) in ("1", "true"):
+                self.default_paragraph_style = style.get(W_STYLE_ID)
+        defaults = styles.find(f"{w('docDefaults')}/{w('rPrDefault')}/{W_RPR}")
+        if defaults is not None:
+            self.defaults = self._properties(defaults)
+
+    def _properties(self, rPr):
+        """(font, size) a w:rPr sets directly; None for what it leaves to inheritance."""
+        font = None
+        rFonts = rPr.find(W_RFONTS)
+        if rFonts is not None:
+            font = rFonts.get(w("ascii"))
+            if font is None:
+                theme_font = rFonts.get(w("asciiTheme")) or ""
+                font = self.theme.get(theme_font[:5])
+        sz = rPr.find(W_SZ)
+        return font, sz.get(w("val")) if sz is not None else None
+
+    def style(self, style_id):
+        """(font, size) of a paragraph style after its basedOn chain and the document defaults."""
+        font, size = self._chain(style_id)
+        return font or self.defaults[0], size or self.defaults[1]
+
+    def _chain(self, style_id):
+        # What a style and the styles it is based on set; None where they all inherit
+        resolved = self._resolved.get(style_id)
+        if resolved is not None:
+            return resolved
+        font, size = None, None
+        seen = set()
+        current = style_id
+        # basedOn chains are short, but a broken document may loop
+        while current is not None and current not in seen and (font is None or size is None):
+            seen.add(current)
+            style = self._styles.get(current)
+            if style is None:
+                break
+            rPr = style.find(W_RPR)
+            if rPr is not None:
+                own_font, own_size = self._properties(rPr)
+                font = font or own_font
+                size = size or own_size
+            based_on = style.find(W_BASED_ON)
+            current = based_on.get(w("val")) if based_on is not None else None
+        resolved = self._resolved[style_id] = (font, size)
+        return resolved
+
+    def paragraph_font(self, p):
+        """(font name, size) for the runs rebuilt in paragraph `p`.
+
+        The first run that names a font (directly or through its character
+        style) wins; otherwise the paragraph style chain names it. The size
+        is the first run's own, or None: rebuilt runs inherit the style's
+        size without restating it. Falls back to Calibri.
+        """
+        font, size = None, None
+        first = True
+        for r in p:
+            if r.tag != W_R:
+                continue
+            rPr = r.find(W_RPR)
+            if rPr is not None:
+                own_font, own_size = self._properties(rPr)
+                rStyle = rPr.find(W_RSTYLE)
+                if rStyle is not None:
+                    style_font, style_size = self._chain(rStyle.get(w("val")))
+                    own_font = own_font or style_font
+                    own_size = own_size or style_size
+                font = font or own_font
+                if first:
+                    size = own_size
+            first = False
+            if font is not None:
+                break
+        if font is None:
+            pStyle = p.find(f"{W_PPR}/{W_PSTYLE}")
+            style_id = pStyle.get(w("val")) if pStyle is not None else self.default_paragraph_style
+            font = self.style(style_id)[0]
+        return font or DEFAULT_FONT, size
@@ -0,0 +1,66 @@
+from copy import deepcopy
+from lxml import etree
+
+from .ooxml import W_NAME, W_NS, W_RFONTS, W_RPR, W_RSTYLE, W_STYLE, W_STYLE_ID, W_SZ, w
+
+# --------------------------------------------------------
+# LINK FORMATTING
+# Every hyperlink run needs the same few run properties. They are built
+# once per (font, size) as a template and cloned per citation instead of
+# allocating color/u/rFonts/sz elements for each link. With a "Cited
+# Reference" character style registered in styles.xml, the blue underline
+# comes from the style and each link only carries a w:rStyle reference.
+# --------------------------------------------------------
+
+CITED_STYLE_ID = "CitedReference"
+CITED_STYLE_NAME = "Cited Reference"
+STYLES_PART = "word/styles.xml"
+
+def ensure_cited_style(styles):
+    """Adds the "Cited Reference" character style to a w:styles element; False if it was there."""
+    for style in styles.iter(W_STYLE):
+        if style.get(W_STYLE_ID) == CITED_STYLE_ID:
+            return False
+    style = styles.makeelement(W_STYLE, {w("type"): "character", w("customStyle"): "1",
+                                         W_STYLE_ID: CITED_STYLE_ID})
+    for tag, value in (("name", CITED_STYLE_NAME), ("uiPriority", "99")):
+        style.append(style.makeelement(w(tag), {w("val"): value}))
+    style.append(style.makeelement(w("unhideWhenUsed"), {}))
+    rPr = style.makeelement(W_RPR, {})
+    rPr.append(rPr.makeelement(w("color"), {w("val"): "0000FF"}))
+    rPr.append(rPr.makeelement(w("u"), {w("val"): "single"}))
+    style.append(rPr)
+    styles.append(style)
+    return True
+
+class LinkFormat:
+    """Hyperlink run properties for one document, cloned from per-font templates.
+
+    With `style_id` the template is w:rStyle + w:rFonts (+ w:sz); without it,
+    the direct w:color/w:u formatting the linker has always written.
+    """
+
+    def __init__(self, style_id=None):
+        self.style_id = style_id
+        self._templates = {}
+
+    def rpr(self, font_name, size_val=None):
+        """A fresh w:rPr for a hyperlink run; `size_val` is in half-points, as a string."""
+        template = self._templates.get((font_name, size_val))
+        if template is None:
+            template = self._templates[(font_name, size_val)] = self._build(font_name, size_val)
+        return deepcopy(template)
+
+    def _build(self, font_name, size_val):
+        rPr = etree.Element(W_RPR, nsmap={"w": W_NS})
+        if self.style_id:
+            etree.SubElement(rPr, W_RSTYLE).set(w("val"), self.style_id)
+        else:
+            etree.SubElement(rPr, w("color")).set(w("val"), "0000FF")
+            etree.SubElement(rPr, w("u")).set(w("val"), "single")
+        rFonts = etree.SubElement(rPr, W_RFONTS)
+        rFonts.set(w("ascii"), font_name)
+        rFonts.set(w("hAnsi"), font_name)
+        if size_val:
+            etree.SubElement(rPr, W_SZ).set(w("val"), size_val)
+        return rPr
@@ -0,0 +1,53 @@
+import json
+import time
+from contextlib import contextmanager
+
+# --------------------------------------------------------
+# METRICS
+# --------------------------------------------------------
+
+class LinkMetrics:
+    """Per-phase wall/CPU timings and work counters, saved as metrics.json."""
+
+    COUNTERS = ("paragraphs_scanned", "regex_matches", "hyperlinks_created",
+                "xml_elements_inserted", "bytes_written", "plan_cache_hits", "plan_cache_misses",
+                "result_cache_hits", "bookmarks_kept", "bookmarks_removed", "links_kept",
+                "paragraphs_relinked", "field_paragraphs", "field_paragraphs_skipped")
+
+    def __init__(self, input_name, input_bytes=None):
+        self.input_name = input_name
+        self.input_bytes = input_bytes
+        self.phases = {}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    @contextmanager
+    def phase(self, name):
+        """Times a block; repeated blocks with the same name add up."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0})
+            totals["wall_s"] = round(totals["wall_s"] + time.perf_counter() - wall_start, 6)
+            totals["cpu_s"] = round(totals["cpu_s"] + time.process_time() - cpu_start, 6)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def as_dict(self):
+        return {
+            "input": self.input_name,
+            "input_bytes": self.input_bytes,
+            "phases": self.phases,
+            "total": {
+                "wall_s": round(sum(ph["wall_s"] for ph in self.phases.values()), 6),
+                "cpu_s": round(sum(ph["cpu_s"] for ph in self.phases.values()), 6),
+            },
+            "counters": self.counters,
+        }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+            f.write("\n")
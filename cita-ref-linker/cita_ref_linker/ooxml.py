@@ -0,0 +1,49 @@
+# --------------------------------------------------------
+# WORDPROCESSINGML
+# Namespaces, tag names and text extraction shared by every module that
+# works on the raw XML (both engines, the splicer, fonts, styles, fields).
+# Imports nothing from the linker, so any module may import it.
+# --------------------------------------------------------
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+def w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+W_BODY, W_P, W_R, W_T, W_HYPERLINK, W_PPR = w("body"), w("p"), w("r"), w("t"), w("hyperlink"), w("pPr")
+W_RPR, W_RFONTS, W_SZ, W_SDT = w("rPr"), w("rFonts"), w("sz"), w("sdt")
+W_BOOKMARK_START, W_BOOKMARK_END = w("bookmarkStart"), w("bookmarkEnd")
+W_STYLE, W_STYLE_ID, W_BASED_ON, W_NAME = w("style"), w("styleId"), w("basedOn"), w("name")
+W_PSTYLE, W_RSTYLE = w("pStyle"), w("rStyle")
+W_TAB, W_PTAB, W_BR, W_CR, W_NO_BREAK_HYPHEN = w("tab"), w("ptab"), w("br"), w("cr"), w("noBreakHyphen")
+
+# --- TEXT EXTRACTION (mirrors python-docx Paragraph.text) ---
+def piece_text(child):
+    """Text one child element of a w:r contributes."""
+    tag = child.tag
+    if tag == W_T:
+        return child.text or ""
+    if tag == W_TAB or tag == W_PTAB:
+        return "\t"
+    if tag == W_BR:
+        return "\n" if child.get(w("type"), "textWrapping") == "textWrapping" else ""
+    if tag == W_CR:
+        return "\n"
+    if tag == W_NO_BREAK_HYPHEN:
+        return "-"
+    return ""
+
+def run_text(r):
+    return "".join([piece_text(child) for child in r])
+
+def paragraph_text(p):
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(run_text(r) for r in child if r.tag == W_R)
+    return "".join(parts)
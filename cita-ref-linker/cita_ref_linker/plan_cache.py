@@ -0,0 +1,132 @@
+import time
+import pickle
+import sqlite3
+import hashlib
+
+from .citation_tokenizer import tokenize_citations
+from .result_cache import linker_version
+
+# --------------------------------------------------------
+# PLAN CACHE
+# Revisions of a manuscript change a few paragraphs at a time. This keeps
+# every paragraph's Phase 2 result in a SQLite file, keyed on a hash of the
+# paragraph text:
+#   tokens  text hash                       -> tokenize_citations() output
+#   plans   text hash + reference index     -> plan_citations() output
+# An unchanged paragraph reuses its plan; after an edit to the reference
+# list it still reuses its tokens and only the link decisions are redone.
+# --------------------------------------------------------
+
+MAX_AGE_DAYS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    text_hash BLOB PRIMARY KEY,
+    tokens    BLOB NOT NULL,
+    used      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS plans (
+    fingerprint TEXT NOT NULL,
+    text_hash   BLOB NOT NULL,
+    plan        BLOB NOT NULL,
+    used        REAL NOT NULL,
+    PRIMARY KEY (fingerprint, text_hash)
+);
+"""
+
+def text_hash(text, version):
+    # Exact text: the plan's fragments are cut from it, so no normalization may change it
+    return hashlib.blake2b(f"{version}:{text}".encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class PlanCache:
+    """Persistent per-paragraph cache for plan_citations(); use as a context manager.
+
+    Lookups go straight to SQLite; new rows and last-used times are written
+    in one transaction on close(), which also drops rows unused for
+    MAX_AGE_DAYS. Several batch workers may share one file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Any change to the package source (the token or plan format, or the rules
+        # that produce them) starts a fresh set of rows. Hashed here, not on import.
+        self.version = linker_version()[:16]
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self._new_tokens = []
+        self._new_plans = []
+        self._used_tokens = []
+        self._used_plans = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def planner(self, index, plan_citations, metrics=None):
+        """Returns plan(text) -> same result as plan_citations(text, index), cached.
+
+        Call it once Phase 1 has filled `index`; the index fingerprint is
+        part of every plan key.
+        """
+        fingerprint = f"{self.version}:{index.fingerprint}"
+        version = self.version
+        execute = self.db.execute
+
+        def plan(text):
+            key = text_hash(text, version)
+            row = execute("SELECT plan FROM plans WHERE fingerprint = ? AND text_hash = ?",
+                          (fingerprint, key)).fetchone()
+            if row is not None:
+                self.hits += 1
+                if metrics is not None: metrics.count("plan_cache_hits")
+                self._used_plans.append((fingerprint, key))
+                result, ambiguous = pickle.loads(row[0])
+                # Replay what resolve() recorded when the plan was made
+                index.ambiguous.update(ambiguous)
+                return result
+
+            self.misses += 1
+            if metrics is not None: metrics.count("plan_cache_misses")
+            tokens = []
+            if "(" in text:
+                row = execute("SELECT tokens FROM tokens WHERE text_hash = ?", (key,)).fetchone()
+                if row is not None:
+                    tokens = pickle.loads(row[0])
+                    self._used_tokens.append(key)
+                else:
+                    tokens = tokenize_citations(text)
+                    self._new_tokens.append((key, pickle.dumps(tokens, pickle.HIGHEST_PROTOCOL)))
+
+            result = plan_citations(text, index, tokens)
+            ambiguous = {}
+            if result is not None:
+                for fragment, ref_key, is_citation in result[0]:
+                    if is_citation and ref_key is None and fragment in index.ambiguous:
+                        ambiguous[fragment] = index.ambiguous[fragment]
+            self._new_plans.append((fingerprint, key, pickle.dumps((result, ambiguous), pickle.HIGHEST_PROTOCOL)))
+            return result
+
+        return plan
+
+    def close(self):
+        if self.db is None:
+            return
+        now = time.time()
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)",
+                                [(key, blob, now) for key, blob in self._new_tokens])
+            self.db.executemany("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?)",
+                                [(fp, key, blob, now) for fp, key, blob in self._new_plans])
+            self.db.executemany("UPDATE tokens SET used = ? WHERE text_hash = ?",
+                                [(now, key) for key in self._used_tokens])
+            self.db.executemany("UPDATE plans SET used = ? WHERE fingerprint = ? AND text_hash = ?",
+                                [(now, fp, key) for fp, key in self._used_plans])
+            cutoff = now - MAX_AGE_DAYS * 86400
+            self.db.execute("DELETE FROM plans WHERE used < ?", (cutoff,))
+            self.db.execute("DELETE FROM tokens WHERE used < ?", (cutoff,))
+        self.db.close()
+        self.db = None
@@ -0,0 +1,268 @@
+import re
+
+from .bookmarks import ref_link_spans
+from .citation_tokenizer import Narrative, SubCitation, tokenize_citations
+from .surname_scanner import Site
+
+# --------------------------------------------------------
+# CITATION PLANNING
+# --------------------------------------------------------
+
+# Every citation form carries a four-digit year; paragraphs without one are never planned
+may_cite = re.compile(r"\d{4}").search
+# The surname scanner only takes ASCII years
+_has_year = re.compile(r"[0-9]{4}").search
+
+_UNSEEN = object()
+
+def planned_links(segments, ref_map):
+    """[(start, end, bookmark)] of the hyperlinks a plan makes; compare with ref_link_spans()."""
+    links = []
+    offset = 0
+    for fragment, key, _ in segments:
+        if key and ref_map[key]:
+            # Entries from a bibliography file resolve citations but have nothing to link to
+            links.append((offset, offset + len(fragment), ref_map[key]))
+        offset += len(fragment)
+    return links
+
+def plan_citations(text, index, tokens=None):
+    """Phase 2: splits a paragraph into the fragments it is rebuilt from.
+
+    Returns None when the paragraph has no citation, otherwise
+    (segments, regex_matches). Each segment is (fragment, ref_key, is_citation):
+    ref_key (a key of index.ref_map) is set when the fragment becomes a
+    hyperlink, and is_citation without ref_key marks a broken or ambiguous
+    citation. The fragments add up to `text`, so planned_links() offsets are
+    offsets into the paragraph. Both engines render this plan. `tokens` may
+    be passed in when the text was already tokenized (see plan_cache.py).
+    """
+    if tokens is None:
+        tokens = tokenize_citations(text) if "(" in text else []
+    sites, absorbed = find_known_citations(text, tokens, index)
+    if not tokens and not sites:
+        return None
+    regex_matches = len(tokens) - len(absorbed) + len(sites)
+    if absorbed:
+        tokens = [token for k, token in enumerate(tokens) if k not in absorbed]
+    if sites:
+        tokens = sorted(tokens + sites, key=lambda item: item.start)
+
+    segments = []
+    append = segments.append
+    cursor = 0
+    # The same citation text always resolves the same way, and manuscripts repeat citations
+    cited = index.cited
+
+    for token in tokens:
+        if token.start > cursor:
+            append((text[cursor:token.start], None, False))
+        
+        # LINKING LOGIC
+        if type(token) is Narrative:
+            key = cited.get(token.text, _UNSEEN)
+            if key is _UNSEEN:
+                key = cited[token.text] = index.resolve(token.text, token.authors, token.year, token.suffix,
+                                                        token.et_al)
+            append((token.text, key, True))
+
+        elif type(token) is Site:
+            citation = text[token.start:token.end]
+            key = index.resolve(citation, token.authors, token.year, token.suffix, token.et_al)
+            append((citation, key, True))
+
+        else:
+            # Brackets, ";" and spacing are cut from the text itself, so the
+            # fragments add up to it exactly, however the group is spaced
+            at = token.start
+            piece_start = token.start + 1
+            for piece, part in zip(token.text[1:-1].split(";"), token.parts):
+                part_start = piece_start + len(piece) - len(piece.lstrip())
+                if part_start > at:
+                    append((text[at:part_start], None, False))
+
+                if type(part) is SubCitation:
+                    regex_matches += 1
+                    append((part.text, _resolve_part(part, index, cited), True))
+                    at = part_start + len(part.text)
+                else:
+                    regex_matches += _append_known_citations(segments, part, index)
+                    at = part_start + len(part)
+                piece_start += len(piece) + 1
+
+            append((text[at:token.end], None, False))
+
+        cursor = token.end
+
+    if cursor < len(text):
+        segments.append((text[cursor:], None, False))
+    return segments, regex_matches
+
+def _resolve_part(part, index, cited):
+    key = cited.get(part.text, _UNSEEN)
+    if key is _UNSEEN:
+        authors, et_al = part.author_names
+        key = cited[part.text] = index.resolve(part.text, authors, part.year, part.suffix, et_al)
+    return key
+
+def find_known_citations(text, tokens, index):
+    """Citations of known first authors that the tokenizer's grammar missed.
+
+    Scans the text between the tokenizer's citations that holds a year once
+    with the reference list's surname automaton (surname_scanner.py). A site such as
+    "Pratiwi et al. (2018: 3)" takes over the plain paren group "(2018: 3)"
+    the tokenizer saw on its own; a site that runs into a real citation is
+    dropped. A year in parentheses makes a citation even when it matches no
+    reference (it is then reported as broken); a bare "Pratiwi 2021" only
+    counts when it names an entry of the document's list.
+    Returns (sites, indexes of the absorbed tokens).
+    """
+    gaps = []
+    gap_start = 0
+    for token in tokens:
+        if not _is_plain_group(token):
+            gaps.append((gap_start, token.start))
+            gap_start = token.end
+    gaps.append((gap_start, len(text)))
+
+    scanner = index.scanner
+    sites = []
+    absorbed = set()
+    k = 0
+    for gap_start, gap_end in gaps:
+        # A site that counts has its (ASCII) year in the same gap: a year inside
+        # the next citation would put the site over that citation
+        if _has_year(text, gap_start, gap_end) is None:
+            continue
+        for site in scanner.scan(text, gap_start, gap_end):
+            if not _counts(site, index):
+                continue
+            while k < len(tokens) and tokens[k].end <= site.start:
+                k += 1
+            overlapping = []
+            j = k
+            while j < len(tokens) and tokens[j].start < site.end:
+                overlapping.append(j)
+                j += 1
+            if overlapping:
+                # Inside a token (handled with its parts), or over a citation the tokenizer found
+                if tokens[k].start <= site.start or not all(_is_plain_group(tokens[j]) for j in overlapping):
+                    continue
+                absorbed.update(overlapping)
+            sites.append(site)
+    return sites, absorbed
+
+def _counts(site, index):
+    # A year in parentheses makes a citation; a bare year only one of an entry in the document's list
+    return site.in_parens or any(not entry.from_file
+                                 for entry in index.lookup(site.authors, site.year, site.suffix, site.et_al))
+
+def _is_plain_group(token):
+    return type(token) is not Narrative and SubCitation not in map(type, token.parts)
+
+def _append_known_citations(segments, part, index):
+    """Appends a plain paren-group part such as "Machova 2021", split around known citations."""
+    if _has_year(part) is None:
+        # "see Table 2": no site without a year
+        segments.append((part, None, False))
+        return 0
+    cursor = 0
+    found = 0
+    for site in index.scanner.scan(part):
+        if not _counts(site, index):
+            continue
+        citation = part[site.start:site.end]
+        if site.start > cursor:
+            segments.append((part[cursor:site.start], None, False))
+        key = index.resolve(citation, site.authors, site.year, site.suffix, site.et_al)
+        segments.append((citation, key, True))
+        found += 1
+        cursor = site.end
+    if cursor < len(part) or not part:
+        segments.append((part[cursor:], None, False))
+    return found
+
+def record_links(segments, linked_references, missing_citations):
+    """Notes the references a plan links and the citations it leaves broken, without rendering it."""
+    for fragment, key, is_citation in segments:
+        if key:
+            linked_references.add(key)
+        elif is_citation:
+            missing_citations.append(fragment)
+
+def make_planner(index, plan_cache=None, metrics=None):
+    """plan(text) for Phase 2: plan_citations(), through the PlanCache when one is given."""
+    if plan_cache is None:
+        return lambda text: plan_citations(text, index)
+    return plan_cache.planner(index, plan_citations, metrics)
+
+# --------------------------------------------------------
+# PER-PARAGRAPH DECISION
+# Both engines hand every Phase 2 paragraph to link_paragraph(). It plans
+# the paragraph and does everything short of rebuilding it; only REBUILD
+# leaves work to the engine, which clears the paragraph and adds a run (or
+# a hyperlink) per segment in its own way.
+# --------------------------------------------------------
+
+NO_CITATION = "no_citation"         # nothing to link and no link to repair
+KEPT = "kept"                       # already linked exactly as planned, or only checked
+SPLICED = "spliced"                 # linked in place (see run_splicer.py)
+FIELDS_SKIPPED = "fields_skipped"   # holds citation fields and could not be linked in place: reported
+REBUILD = "rebuild"                 # the engine rebuilds it from the segments
+
+def link_paragraph(p, text, plan_paragraph, ref_map, linked_references, missing_citations, unlinked_fields,
+                   metrics, plan_fields=None, in_place=False, style_id=None, check_only=False):
+    """Phase 2 for one w:p element: returns (segments, action).
+
+    `plan_fields(p, text)` plans a paragraph with reference-manager fields
+    (see field_codes.py). With `check_only` the citations are only recorded
+    and the paragraph is kept as it is, links from an earlier run included.
+    For every action but REBUILD the links and broken citations are recorded
+    here; for REBUILD the engine records them as it renders `segments`.
+    """
+    existing_links = ref_link_spans(p)
+    # Reference-manager fields first; they are only ever linked in place,
+    # since rebuilding the paragraph would drop them
+    plan = plan_fields(p, text) if plan_fields is not None else None
+    from_fields = plan is not None
+    if from_fields:
+        metrics.count("field_paragraphs")
+    else:
+        plan = plan_paragraph(text)
+    if plan is None:
+        if not existing_links:
+            return None, NO_CITATION
+        # Linked by an earlier run, but nothing here is a citation any more
+        segments, links = [(text, None, False)], []
+    else:
+        segments, regex_matches = plan
+        metrics.count("regex_matches", regex_matches)
+        links = planned_links(segments, ref_map)
+    if check_only or existing_links == links:
+        # Already linked exactly as it would be now (or nothing to link): leave it as it is
+        record_links(segments, linked_references, missing_citations)
+        metrics.count("links_kept", len(existing_links))
+        return segments, KEPT
+
+    if in_place or from_fields:
+        # Links from an earlier run are retargeted or unwrapped by the splice too
+        from .run_splicer import splice_links
+        inserted = splice_links(p, links, style_id)
+        if inserted is not None:
+            kept = len(set(links) & set(existing_links))
+            record_links(segments, linked_references, missing_citations)
+            metrics.count("xml_elements_inserted", inserted)
+            metrics.count("hyperlinks_created", len(links) - kept)
+            metrics.count("links_kept", kept)
+            if existing_links:
+                metrics.count("paragraphs_relinked")
+            return segments, SPLICED
+    if from_fields:
+        # Rebuilding would drop the reference manager's fields: left as it is, and reported
+        record_links(segments, linked_references, missing_citations)
+        unlinked_fields.append(text)
+        metrics.count("field_paragraphs_skipped")
+        return segments, FIELDS_SKIPPED
+    if existing_links:
+        metrics.count("paragraphs_relinked")
+    return segments, REBUILD
@@ -0,0 +1,45 @@
+import sys
+import time
+
+# --- PROGRESS UTILS ---
+class ProgressReporter:
+    """Progress bar that redraws at most every `interval_ms` and stays silent off a TTY."""
+
+    def __init__(self, total, prefix='', suffix='Done', length=30, fill='█',
+                 interval_ms=100, quiet=False, stream=None):
+        self.total = total
+        self.prefix = prefix
+        self.suffix = suffix
+        self.length = length
+        self.fill = fill
+        self.interval = interval_ms / 1000.0
+        self.stream = stream or sys.stdout
+        # Batch/CI logs get no carriage-return spam: only draw on an interactive terminal
+        self.enabled = not quiet and total > 0 and self.stream.isatty()
+        self._last_draw = None
+        self._last_iteration = 0
+
+    def update(self, iteration):
+        if not self.enabled:
+            return
+        self._last_iteration = iteration
+        now = time.monotonic()
+        if self._last_draw is not None and now - self._last_draw < self.interval and iteration < self.total:
+            return
+        self._last_draw = now
+        self._draw(iteration)
+
+    def finish(self):
+        """Draws the final state (phases may stop early) and ends the line."""
+        if not self.enabled or self._last_draw is None:
+            return
+        self._draw(self._last_iteration)
+        self.stream.write('\n')
+        self.stream.flush()
+
+    def _draw(self, iteration):
+        percent = 100 * (iteration / float(self.total))
+        filled_length = int(self.length * iteration // self.total)
+        bar = self.fill * filled_length + '-' * (self.length - filled_length)
+        self.stream.write(f'\r{self.prefix} |{bar}| {percent:.1f}% {self.suffix}')
+        self.stream.flush()
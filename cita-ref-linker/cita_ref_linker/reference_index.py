@@ -0,0 +1,185 @@
+import re
+import hashlib
+import unicodedata
+from functools import lru_cache
+
+from .reference_parser import parse_reference
+
+# --------------------------------------------------------
+# REFERENCE INDEX
+# Phase 1 registers every reference-list entry here; Phase 2 resolves
+# citations against it. Authors are compared in folded form (no accents,
+# no case), so "Machova (2021)" finds "Machová, M. & Ehler, E., 2021".
+# Each entry is filed under (first author, year) and under
+# (first author, second author, year), so every lookup is a dict hit.
+# Entries are parsed by reference_parser.py.
+# --------------------------------------------------------
+
+_APOSTROPHES = str.maketrans("’‘ʼ`", "''''")
+
+@lru_cache(maxsize=None)
+def fold(name):
+    """Comparison form of an author name: "Machová" -> "machova", "O’Brien" -> "o'brien"."""
+    name = re.sub(r"[^\w\-\']", "", name.translate(_APOSTROPHES))
+    if name.endswith("'s"):
+        # Possessive in running text: "Oztas's (2009)"
+        name = name[:-2]
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+class ReferenceEntry:
+    """One reference-list entry: its report key, bookmark, author/year data, title and DOI.
+
+    `from_file` marks an entry that only a bibliography file has (see bibliography.py).
+    """
+    __slots__ = ("key", "bookmark", "surnames", "et_al", "year", "suffix", "title", "doi", "from_file")
+
+    def __init__(self, key, surnames, et_al, year, suffix, title="", doi="", from_file=False):
+        self.key = key
+        self.bookmark = None
+        self.surnames = surnames
+        self.et_al = et_al
+        self.year = year
+        self.suffix = suffix
+        self.title = title
+        self.doi = doi
+        self.from_file = from_file
+
+    @property
+    def author_count(self):
+        return 3 if self.et_al else len(self.surnames)
+
+    def __repr__(self):
+        return f"ReferenceEntry({self.key!r})"
+
+class ReferenceIndex:
+    """Reference-list entries, looked up by folded author names and year.
+
+    Entries that share a first author and a year (e.g. "Smith 2020a" and
+    "Smith 2020b") are all kept. A citation that still fits more than one
+    of them is not linked but recorded in `ambiguous`.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.ambiguous = {}         # citation text -> keys of the entries it could mean
+        self.document_only = None   # keys of the entries a bibliography file lacks (see bibliography.py)
+        self._keys = set()
+        self._by_first = {}         # (first, year) -> [entries]
+        self._by_pair = {}          # (first, second, year) -> [entries]
+        self._resolved = {}         # lookup() arguments -> its result; citations repeat a lot
+        self.cited = {}             # citation text -> resolve() result, for the planner to read first
+        self._scanner = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def ref_map(self):
+        """Report key ("Surname_Year", "Smith_2020a") -> bookmark name (None for a bibliography-file entry)."""
+        return {entry.key: entry.bookmark for entry in self.entries}
+
+    @property
+    def fingerprint(self):
+        """Hash of everything link decisions depend on (not the bookmark names)."""
+        digest = hashlib.blake2b(digest_size=16)
+        for entry in self.entries:
+            digest.update(repr((entry.key, entry.surnames, entry.et_al, entry.year, entry.suffix,
+                                entry.from_file)).encode())
+        return digest.hexdigest()
+
+    @property
+    def scanner(self):
+        """SurnameScanner over the document's first authors, built on first use after Phase 1.
+
+        Bibliography-file entries stay out: a large library holds surnames
+        such as "May" or "Young" that running text uses next to a year.
+        """
+        if self._scanner is None:
+            from .surname_scanner import SurnameScanner
+            self._scanner = SurnameScanner(entry.surnames[0] for entry in self.entries if not entry.from_file)
+        return self._scanner
+
+    @property
+    def duplicates(self):
+        """Groups of entries that no citation can tell apart (same authors, year and suffix)."""
+        groups = {}
+        for entry in self.entries:
+            if entry.from_file:
+                # From a bibliography file: its own duplicates are not the document's
+                continue
+            signature = (tuple(fold(s) for s in entry.surnames), entry.et_al, entry.year, entry.suffix)
+            groups.setdefault(signature, []).append(entry)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def add(self, text):
+        """Registers a reference-list entry; returns its ReferenceEntry, or None if it has no year."""
+        record = parse_reference(text)
+        if record is None:
+            return None
+        return self.add_entry(record.surnames, record.et_al, record.year, record.suffix,
+                              text.strip()[record.title_start:record.title_end], record.doi)
+
+    def add_entry(self, surnames, et_al, year, suffix="", title="", doi="", from_file=False):
+        """Registers an already parsed entry (e.g. from a .bib file, see bibliography.py)."""
+        surname = re.sub(r"[^\w\-\']", "", surnames[0])
+        key = base_key = f"{surname}_{year}{suffix}"
+        copy = 2
+        while key in self._keys:
+            # Same surname, year and suffix twice: keep both, under distinct keys
+            key = f"{base_key} ({copy})"
+            copy += 1
+        self._keys.add(key)
+        self._resolved.clear()
+        self.cited.clear()
+        self._scanner = None
+
+        entry = ReferenceEntry(key, surnames, et_al, year, suffix, title, doi, from_file)
+        self.entries.append(entry)
+        first = fold(surnames[0])
+        self._by_first.setdefault((first, year), []).append(entry)
+        if len(surnames) > 1:
+            self._by_pair.setdefault((first, fold(surnames[1]), year), []).append(entry)
+        return entry
+
+    def lookup(self, authors, year, suffix="", et_al=False):
+        """Entries a citation could mean.
+
+        One entry when the citation is resolved, several when it is
+        ambiguous, none when it is broken. Only the first word of each
+        author counts, as in the keys.
+        """
+        if not authors:
+            return []
+        first = fold(authors[0].split()[0])
+        candidates = None
+        if len(authors) > 1:
+            candidates = self._by_pair.get((first, fold(authors[1].split()[0]), year))
+        if not candidates:
+            candidates = self._by_first.get((first, year), [])
+        if suffix:
+            # "2020a" never means "2020b"; an entry without a suffix still fits
+            candidates = [entry for entry in candidates if entry.suffix in (suffix, "")]
+        if len(candidates) > 1:
+            # Prefer the entries whose author count fits the citation form
+            if len(authors) > 1 and not et_al:
+                wanted = len(authors)
+                fitting = [entry for entry in candidates if entry.author_count == wanted]
+            elif et_al:
+                fitting = [entry for entry in candidates if entry.author_count >= 3]
+            else:
+                fitting = [entry for entry in candidates if entry.author_count == 1]
+            candidates = fitting or candidates
+        return candidates
+
+    def resolve(self, citation_text, authors, year, suffix="", et_al=False):
+        """Report key of the one entry a citation means, or None (broken or ambiguous)."""
+        args = (authors, year, suffix, et_al)
+        candidates = self._resolved.get(args)
+        if candidates is None:
+            candidates = self._resolved[args] = self.lookup(authors, year, suffix, et_al)
+        if len(candidates) == 1:
+            return candidates[0].key
+        if candidates:
+            self.ambiguous[citation_text] = [entry.key for entry in candidates]
+        return None
@@ -0,0 +1,188 @@
+from collections import namedtuple
+
+from .citation_tokenizer import is_word_char
+
+# --------------------------------------------------------
+# REFERENCE ENTRY PARSER
+# One left-to-right scan per bibliography paragraph, no regex. It replaces
+#   ref_list_pattern   ^([\w\-\']+).*?\(?(\d{4})\)?
+# which kept only the first word and the first four digits it met, so a
+# DOI ("10.1016/...") or a number in a long title could become the year.
+# After any typed list number or bullet, the scan reads the author block up
+# to the first standalone year, the title up to its closing full stop, and
+# then looks for a DOI; every character is looked at a bounded number of times.
+# --------------------------------------------------------
+
+# A parsed entry. `title_start`/`title_end` index into the stripped entry
+# text (equal when there is no title); `doi` is "" when the entry has none.
+ReferenceRecord = namedtuple("ReferenceRecord", "surnames et_al year suffix title_start title_end doi")
+
+# Tokens that never hold the year: links and DOIs
+_LINK_PREFIXES = ("http://", "https://", "www.", "doi:", "doi.org/", "10.")
+_TOKEN_OPENERS = "([<"
+# Bullets typed in front of an entry (Word's own list numbering is not in the text)
+_BULLETS = ("•", "·", "▪", "‣", "◦", "*", "-", "–", "—")
+
+def _is_digit(ch):
+    return "0" <= ch <= "9"
+
+def _is_initials(chunk):
+    # "N.", "A. N.", "Z", "E.-W." -- given names in an author list
+    return all(len(word.replace(".", "").replace("-", "")) <= 1 for word in chunk.split())
+
+def _token_end(text, i):
+    while i < len(text) and not text[i].isspace():
+        i += 1
+    return i
+
+def _list_marker_end(text):
+    """Where the entry starts after a typed list marker ("1.", "12)", "[3]", "•"), else 0."""
+    i = 0
+    if text[:1] == "[":
+        close = text.find("]")
+        if close > 1 and text[1:close].isdigit():
+            i = close + 1
+    elif text[:1] in _BULLETS:
+        i = 1
+    else:
+        while i < len(text) and _is_digit(text[i]):
+            i += 1
+        # At most three digits: "2020. Title" is a year, not a list number
+        i = i + 1 if 0 < i <= 3 and text[i:i + 1] in (".", ")") else 0
+    if not i or not text[i:i + 1].isspace():
+        return 0
+    while text[i].isspace():
+        i += 1
+    return i
+
+def _find_year(text, i):
+    """Start of the first standalone four-digit year at or after `i`, or None.
+
+    Goes token by token (most tokens are plain words or initials and cost
+    one check). A year is exactly four digits starting with 1 or 2,
+    not glued to a letter or digit before it, or to a "." or "/" (as inside
+    a DOI or a date). Link and DOI tokens are skipped whole; "n.d." before
+    any year means the entry has none.
+    """
+    at = i
+    for token in text[i:].split(" "):
+        start = at
+        at += len(token) + 1
+        if len(token) < 4 or token.isalpha():
+            continue
+        bare = token.lstrip(_TOKEN_OPENERS)
+        if bare.startswith(_LINK_PREFIXES):
+            continue
+        if bare.startswith("n.d."):
+            return None
+        k = _year_in(token)
+        if k is not None:
+            return start + k
+    return None
+
+def _year_in(token):
+    n = len(token)
+    k = 0
+    while k < n:
+        if not _is_digit(token[k]):
+            k += 1
+            continue
+        j = k
+        while j < n and _is_digit(token[j]):
+            j += 1
+        if j - k == 4 and token[k] in "12" and (k == 0 or not (token[k - 1].isalnum() or token[k - 1] in "./")) \
+                and (j == n or not token[j].isalpha() or _suffix_at(token, j)):
+            return k
+        k = j
+    return None
+
+def _suffix_at(text, i):
+    # "2020a": one lowercase letter right after the year, not the start of a word
+    return "a" <= text[i] <= "z" and not text[i + 1:i + 2].isalpha()
+
+def _split_author_block(author_text):
+    """(surnames, et_al) of the text before the year."""
+    surnames = []
+    et_al = False
+    for chunk in author_text.replace("&", ",").split(","):
+        chunk = chunk.strip()
+        if chunk.startswith("and "):
+            chunk = chunk[4:].strip()
+        if "et al" in chunk:
+            chunk = chunk[:chunk.index("et al")].strip()
+            et_al = True
+        if chunk and not _is_initials(chunk):
+            surnames.append(chunk.split()[0])
+    return surnames, et_al
+
+def _title_span(text, i):
+    """(start, end) of the title that follows the year at `i`.
+
+    The title ends at the first ". ", "? " or "! " outside brackets; the
+    stops are found with str.find and the brackets counted between them.
+    """
+    n = len(text)
+    while i < n and (text[i].isspace() or text[i] in ").,:;"):
+        i += 1
+    start = counted = i
+    depth = 0
+    stops = {stop: text.find(stop, i) for stop in (". ", "? ", "! ")}
+    while True:
+        at = min((at for at in stops.values() if at != -1), default=-1)
+        if at == -1:
+            # No stop left: the title runs to the end of the entry
+            return start, max(n - 1 if text.endswith(".") else n, start)
+        segment = text[counted:at]
+        depth = max(depth + segment.count("(") + segment.count("[") - segment.count(")") - segment.count("]"), 0)
+        counted = at
+        if not depth:
+            # "?" and "!" belong to the title; the closing "." does not
+            return start, at if text[at] == "." else at + 1
+        stop = text[at:at + 2]
+        stops[stop] = text.find(stop, at + 1)
+
+def _find_doi(text, i):
+    """The first DOI ("10.xxxx/...") at or after `i`, or ""."""
+    while True:
+        i = text.find("10.", i)
+        if i == -1:
+            return ""
+        j = i + 3
+        while j < len(text) and _is_digit(text[j]):
+            j += 1
+        if j - i >= 7 and j < len(text) and text[j] == "/" and (i == 0 or not text[i - 1].isalnum()):
+            return text[i:_token_end(text, j)].rstrip(".,;)]>")
+        i = j
+
+def parse_reference(text):
+    """ReferenceRecord of a reference-list entry, or None when it has no year.
+
+    "Aini, N. & Zulyusri, Z, 2021. Meta ..." -> surnames ["Aini", "Zulyusri"], year "2021"
+    "Smith, J. et al. (2020b). Title ..."    -> surnames ["Smith"], et_al, year "2020", suffix "b"
+    """
+    text = text.strip()
+    start = i = _list_marker_end(text)
+    while i < len(text) and is_word_char(text[i]):
+        i += 1
+    if i == start:
+        return None
+    first_word = text[start:i]
+
+    year_start = _find_year(text, i)
+    if year_start is None:
+        return None
+    year_end = year_start + 4
+    year = text[year_start:year_end]
+    suffix = text[year_end] if year_end < len(text) and _suffix_at(text, year_end) else ""
+
+    surnames, et_al = _split_author_block(text[start:year_start].rstrip(" (,"))
+    if not surnames:
+        surnames = [first_word]
+    after = year_end + len(suffix)
+    if year_start and text[year_start - 1] == "(":
+        # "(2021, March 3)": the title starts after the whole date
+        close = text.find(")", after)
+        if close != -1:
+            after = close + 1
+    title_start, title_end = _title_span(text, after)
+    return ReferenceRecord(surnames, et_al, year, suffix, title_start, title_end, _find_doi(text, title_end))
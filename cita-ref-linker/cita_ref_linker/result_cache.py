@@ -0,0 +1,168 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+# --------------------------------------------------------
+# RESULT CACHE
+# Batch reprocessing often sees the very same .docx again. This stores each
+# linked output under the SHA-256 of (linker version, options, input bytes)
+# in a local directory, so a repeat submission is answered by copying the
+# cached file: python-docx is never imported. The directory is kept under
+# a size limit by evicting the least recently used entries.
+# --------------------------------------------------------
+
+DEFAULT_MAX_MB = 1024
+
+_code_version = None
+
+def linker_version():
+    """Digest of the source of every module in the package.
+
+    Any change to the linker's code, including a module added later, is a
+    new linker version as far as the caches are concerned.
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(here)):
+            if name.endswith(".py"):
+                digest.update(name.encode() + b"\0")
+                with open(os.path.join(here, name), "rb") as f:
+                    digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+def _hash_source(digest, src):
+    """Feeds a path or seekable binary stream into `digest`, leaving the stream where it was."""
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return
+    position = src.tell()
+    src.seek(0)
+    for block in iter(lambda: src.read(1 << 20), b""):
+        digest.update(block)
+    src.seek(position)
+
+class ResultCache:
+    """Linked outputs on disk, keyed by content; see link_document(result_cache=...).
+
+    Each entry is <key>.docx (the linked document) plus <key>.json (the
+    LinkResult data the validation report is rebuilt from). A hit touches
+    both files, which is what the LRU eviction goes by.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, src, **options):
+        digest = hashlib.sha256()
+        digest.update(linker_version().encode())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        _hash_source(digest, src)
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.docx", f"{base}.json"
+
+    def get(self, key, dst):
+        """Writes the cached document to `dst` and returns its result data, or None on a miss."""
+        docx_path, json_path = self._paths(key)
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(dst, (str, os.PathLike)):
+                shutil.copyfile(docx_path, dst)
+            else:
+                with open(docx_path, "rb") as f:
+                    shutil.copyfileobj(f, dst)
+        except (OSError, ValueError):
+            # Missing, evicted by another process midway, or half-written: a miss
+            return None
+        for path in (docx_path, json_path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return data
+
+    def put(self, key, document, data):
+        """Stores the linked document bytes and its result data, then evicts down to max_bytes."""
+        docx_path, json_path = self._paths(key)
+        os.makedirs(os.path.dirname(docx_path), exist_ok=True)
+        # Write to temp files and rename, so concurrent batch workers never read half an entry
+        for path, payload in ((docx_path, document),
+                              (json_path, json.dumps(data, ensure_ascii=False).encode("utf-8"))):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the directory fits in max_bytes."""
+        entries = {}
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    # Another worker's put() in progress; never an entry to evict
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                key = os.path.splitext(name)[0]
+                size, used = entries.get(key, (0, 0.0))
+                entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+                total += stat.st_size
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+def result_data(result):
+    """JSON-ready LinkResult fields for the cache (everything but input, output and timings)."""
+    return {
+        "ref_map": result.ref_map,
+        "linked_references": sorted(result.linked_references),
+        "missing_citations": result.missing_citations,
+        "ambiguous_citations": result.ambiguous_citations,
+        "duplicate_references": result.duplicate_references,
+        "suggestions": result.suggestions,
+        "bibliography_only": result.bibliography_only,
+        "document_only": result.document_only,
+        "unlinked_fields": result.unlinked_fields,
+    }
+
+def read_output(dst, start):
+    """Bytes just written to `dst` (a path, or a readable stream that was at `start`), or None."""
+    if isinstance(dst, (str, os.PathLike)):
+        with open(dst, "rb") as f:
+            return f.read()
+    if start is None or not (hasattr(dst, "readable") and dst.readable()):
+        return None
+    end = dst.tell()
+    dst.seek(start)
+    document = dst.read(end - start)
+    dst.seek(end)
+    return document
+
+def stream_start(dst):
+    """Where output will begin in a seekable stream `dst` (None for paths and pipes)."""
+    if isinstance(dst, (str, os.PathLike)) or not (hasattr(dst, "seekable") and dst.seekable()):
+        return None
+    return dst.tell()
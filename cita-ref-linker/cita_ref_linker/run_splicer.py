@@ -0,0 +1,229 @@
+from copy import deepcopy
+
+from .bookmarks import REF_PREFIX
+from .link_style import CITED_STYLE_ID
+from .ooxml import W_HYPERLINK, W_R, W_RPR, W_RSTYLE, W_T, XML_SPACE, piece_text, run_text, w
+
+# --------------------------------------------------------
+# IN-PLACE LINKING
+# Instead of clearing a cited paragraph and rebuilding it from plain runs,
+# this splits the existing runs only where a citation starts or ends and
+# wraps the runs in between in a w:hyperlink. Italics, superscripts, fonts
+# and every run outside a citation stay exactly as they were, and the XML
+# added per paragraph grows with its citations, not with its length.
+# Links from an earlier run are retargeted or unwrapped the same way, so
+# re-linking a paragraph never rebuilds it either.
+# Works on the raw w:p element, so both engines use it.
+# --------------------------------------------------------
+
+W_FLD_CHAR, W_FLD_SIMPLE = w("fldChar"), w("fldSimple")
+W_COLOR, W_U = w("color"), w("u")
+
+# Schema order of w:rPr children (CT_RPr); Word rejects them out of order
+RPR_ORDER = {w(tag): k for k, tag in enumerate((
+    "rStyle", "rFonts", "b", "bCs", "i", "iCs", "caps", "smallCaps", "strike", "dstrike",
+    "outline", "shadow", "emboss", "imprint", "noProof", "snapToGrid", "vanish", "webHidden",
+    "color", "spacing", "w", "kern", "position", "sz", "szCs", "highlight", "u", "effect",
+    "bdr", "shd", "fitText", "vertAlign", "rtl", "cs", "em", "lang", "eastAsianLayout",
+    "specVanish", "oMath"))}
+
+def _layout(p):
+    """[(child, start, end)] for every child of `p`, as offsets into paragraph_text(p)."""
+    layout = []
+    offset = 0
+    for child in p:
+        if child.tag == W_R:
+            length = len(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            length = sum(len(run_text(r)) for r in child if r.tag == W_R)
+        else:
+            length = 0
+        layout.append((child, offset, offset + length))
+        offset += length
+    return layout
+
+def _is_ref_link(child):
+    return child.tag == W_HYPERLINK and child.get(w("anchor"), "").startswith(REF_PREFIX)
+
+def _unwrapped(layout, keep):
+    """`layout` as it is once the REF_ hyperlinks not in `keep` are unwrapped."""
+    flat = []
+    for child, start, end in layout:
+        if not _is_ref_link(child) or child in keep:
+            flat.append((child, start, end))
+            continue
+        for inner in child:
+            length = len(run_text(inner)) if inner.tag == W_R else 0
+            flat.append((inner, start, start + length))
+            start += length
+    return flat
+
+def _unwrap(hyperlink):
+    """Moves a REF_ hyperlink's children back into the paragraph, without the link formatting."""
+    for child in list(hyperlink):
+        hyperlink.addprevious(child)
+        rPr = child.find(W_RPR) if child.tag == W_R else None
+        if rPr is None:
+            continue
+        style = rPr.find(W_RSTYLE)
+        if style is not None and style.get(w("val")) == CITED_STYLE_ID:
+            rPr.remove(style)
+        color, underline = rPr.find(W_COLOR), rPr.find(W_U)
+        if color is not None and underline is not None and color.get(w("val")) == "0000FF" \
+                and underline.get(w("val")) == "single":
+            rPr.remove(color)
+            rPr.remove(underline)
+    hyperlink.getparent().remove(hyperlink)
+
+def _field_runs(layout):
+    """Children that hold a field's code (instruction, w:fldChar marks), not its displayed result."""
+    inside = set()
+    # "code" or "result" for each open field, innermost last
+    fields = []
+    for child, _, _ in layout:
+        if child.tag != W_R:
+            continue
+        marks = [mark.get(w("fldCharType")) for mark in child.iter(W_FLD_CHAR)]
+        if marks or (fields and fields[-1] == "code"):
+            inside.add(child)
+        for mark in marks:
+            if mark == "begin":
+                fields.append("code")
+            elif mark == "separate" and fields:
+                fields[-1] = "result"
+            elif mark == "end" and fields:
+                fields.pop()
+    return inside
+
+def _can_splice(layout, links):
+    # A span may not start or end inside an existing hyperlink, cover one, or
+    # touch a field's code (a field code must not be split across a hyperlink).
+    # A span within a field's result, as a reference manager's citation, is fine.
+    fields = _field_runs(layout)
+    for start, end, _ in links:
+        for child, child_start, child_end in layout:
+            if _covers(start, end, child_start, child_end) or (child_start < start < child_end) \
+                    or (child_start < end < child_end):
+                if child.tag == W_HYPERLINK or child.tag == W_FLD_SIMPLE or child in fields:
+                    return False
+    return True
+
+def _covers(start, end, child_start, child_end):
+    # Zero-length children (bookmarks, proofErr) right at a span edge stay outside it
+    if child_start == child_end:
+        return start < child_start < end
+    return start <= child_start and child_end <= end
+
+def split_run(r, k):
+    """Splits run `r` after `k` characters of its text; returns the new right-hand run."""
+    right = r.makeelement(r.tag, r.attrib)
+    rPr = r.find(W_RPR)
+    if rPr is not None:
+        right.append(deepcopy(rPr))
+    seen = 0
+    for child in list(r):
+        if child.tag == W_RPR:
+            continue
+        if seen >= k:
+            right.append(child)
+            continue
+        text = piece_text(child)
+        if seen + len(text) > k and child.tag == W_T:
+            cut = k - seen
+            tail = child.makeelement(W_T, {})
+            tail.text = text[cut:]
+            child.text = text[:cut]
+            for t in (child, tail):
+                if t.text != t.text.strip():
+                    t.set(XML_SPACE, "preserve")
+            right.append(tail)
+        seen += len(text)
+    r.addnext(right)
+    return right
+
+def _set_rpr(r, tag, value):
+    """Sets a w:val property on run `r`, keeping w:rPr in schema order."""
+    rPr = r.find(W_RPR)
+    if rPr is None:
+        rPr = r.makeelement(W_RPR, {})
+        r.insert(0, rPr)
+    existing = rPr.find(tag)
+    if existing is not None:
+        existing.attrib.clear()
+        existing.set(w("val"), value)
+        return 0
+    element = rPr.makeelement(tag, {w("val"): value})
+    rank = RPR_ORDER[tag]
+    for k, child in enumerate(rPr):
+        if RPR_ORDER.get(child.tag, len(RPR_ORDER)) > rank:
+            rPr.insert(k, element)
+            break
+    else:
+        rPr.append(element)
+    return 1
+
+def _cut(layout, at):
+    """Makes `at` a boundary between children, splitting the run that straddles it."""
+    for k, (child, start, end) in enumerate(layout):
+        if start < at < end:
+            # Only a w:t can hold the cut (other pieces are one character), so
+            # the new run, its copied w:rPr and one w:t are added
+            rPr = child.find(W_RPR)
+            right = split_run(child, at - start)
+            layout[k:k + 1] = [(child, start, at), (right, at, end)]
+            return 2 + (sum(1 for _ in rPr.iter()) if rPr is not None else 0)
+    return 0
+
+def splice_links(p, links, style_id=None):
+    """Wraps each (start, end, bookmark) span of `p` in a w:hyperlink, in place.
+
+    The wrapped runs get the character style `style_id` when given (unless
+    they already have a style of their own), otherwise blue underlining.
+    REF_ hyperlinks from an earlier run that cover one of the spans exactly
+    are kept (and pointed at its bookmark); the others are unwrapped.
+
+    Returns the number of XML elements added, or None (with `p` untouched)
+    when some span cannot be cut out of the paragraph's own runs.
+    """
+    layout = _layout(p)
+    existing = {(start, end): child for child, start, end in layout if _is_ref_link(child)}
+    keep = {}
+    new_links = []
+    for start, end, bookmark in links:
+        hyperlink = existing.get((start, end))
+        if hyperlink is not None:
+            keep[hyperlink] = bookmark
+        else:
+            new_links.append((start, end, bookmark))
+    if len(keep) < len(existing):
+        layout = _unwrapped(layout, keep)
+    if not _can_splice(layout, new_links):
+        return None
+    for hyperlink, bookmark in keep.items():
+        hyperlink.set(w("anchor"), bookmark)
+    for hyperlink in existing.values():
+        if hyperlink not in keep:
+            _unwrap(hyperlink)
+    links = new_links
+    inserted = 0
+    # Right to left: cutting a later span never moves an earlier one
+    for start, end, bookmark in sorted(links, reverse=True):
+        inserted += _cut(layout, end) + _cut(layout, start)
+        covered = [k for k, (_, child_start, child_end) in enumerate(layout)
+                   if _covers(start, end, child_start, child_end)]
+        if not covered:
+            continue
+        hyperlink = p.makeelement(W_HYPERLINK, {w("anchor"): bookmark, w("history"): "1"})
+        layout[covered[0]][0].addprevious(hyperlink)
+        for k in covered:
+            child = layout[k][0]
+            hyperlink.append(child)
+            if child.tag != W_R:
+                continue
+            if style_id and child.find(f"{W_RPR}/{W_RSTYLE}") is None:
+                inserted += _set_rpr(child, W_RSTYLE, style_id)
+            else:
+                inserted += _set_rpr(child, W_COLOR, "0000FF") + _set_rpr(child, W_U, "single")
+        layout[covered[0]:covered[-1] + 1] = [(hyperlink, start, end)]
+        inserted += 1
+    return inserted
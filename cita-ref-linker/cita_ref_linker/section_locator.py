@@ -0,0 +1,140 @@
+import re
+
+from .ooxml import W_BASED_ON, W_NAME, W_PPR, W_PSTYLE, W_STYLE, W_STYLE_ID, w
+
+# --------------------------------------------------------
+# REFERENCE SECTION
+# The bibliography is found once, before either phase runs: a reverse scan
+# from the end of the document for a paragraph whose whole text is a
+# bibliography title ("References", "Daftar Pustaka", "7. Bibliography"...),
+# then a forward scan to where the list stops (an appendix, or the next
+# heading at the same outline level or above). Phase 1 maps the entries in
+# that index range and looks for citations everywhere else. A table of
+# contents line or a sentence that mentions "References" no longer counts.
+# --------------------------------------------------------
+
+REFERENCE_HEADINGS = frozenset((
+    "references", "reference list", "list of references", "bibliography", "works cited",
+    "literature cited", "cited literature", "literature",
+    "daftar pustaka", "daftar referensi", "daftar rujukan", "referensi", "rujukan", "pustaka",
+    "kepustakaan", "bibliografi", "senarai rujukan",
+    "literaturverzeichnis", "literatur", "quellenverzeichnis", "bibliographie", "références",
+    "références bibliographiques", "referencias", "referencias bibliográficas", "bibliografía",
+    "referências", "referências bibliográficas", "bibliografia", "riferimenti bibliografici",
+    "literatuur", "literatuurlijst", "kaynakça", "kaynaklar", "tài liệu tham khảo",
+))
+
+# Sections that may follow the bibliography; matched at the start of a short paragraph
+END_HEADINGS = ("appendix", "appendices", "lampiran", "anhang", "annexe", "annex", "apéndice", "anexo",
+                "apêndice", "supplementary material", "supporting information")
+
+MAX_HEADING_LENGTH = 60
+
+# "7.", "VII.", "7.1", "A)" in front of a numbered heading
+_NUMBERING = re.compile(r"^(?:[IVXLC]+|\d+(?:\.\d+)*|[A-Z])[.)]?\s+")
+
+W_OUTLINE_LVL = w("outlineLvl")
+
+def heading_key(text):
+    """A paragraph's text as a heading: numbering, trailing punctuation and case dropped."""
+    text = _NUMBERING.sub("", text.strip())
+    return " ".join(text.rstrip(" :.").split()).casefold()
+
+def heading_set(extra=()):
+    """REFERENCE_HEADINGS plus user-given titles."""
+    return REFERENCE_HEADINGS | {heading_key(title) for title in extra} if extra else REFERENCE_HEADINGS
+
+def is_end_heading(text):
+    key = heading_key(text)
+    return len(text) <= MAX_HEADING_LENGTH and any(
+        key == end or key.startswith(end + " ") for end in END_HEADINGS)
+
+class HeadingStyles:
+    """Outline level (0 = Heading 1 / Title) of the paragraphs of one document.
+
+    Levels come from a direct w:outlineLvl, or from the paragraph style: a
+    built-in "heading N" / "Title" style, or an outline level set somewhere
+    on its basedOn chain. `styles` is the root of word/styles.xml, or None.
+    """
+
+    def __init__(self, styles=None):
+        self._levels = {}
+        self.default_style = None
+        if styles is None:
+            return
+        own = {}
+        based_on = {}
+        for style in styles.iter(W_STYLE):
+            if style.get(w("type")) != "paragraph":
+                continue
+            style_id = style.get(W_STYLE_ID)
+            if style.get(w("default")) in ("1", "true"):
+                self.default_style = style_id
+            name = style.find(W_NAME)
+            name = name.get(w("val"), "").casefold() if name is not None else ""
+            match = re.fullmatch(r"heading (\d)", name)
+            if match:
+                own[style_id] = int(match.group(1)) - 1
+            elif name == "title":
+                own[style_id] = 0
+            else:
+                own[style_id] = _outline_level(style)
+            parent = style.find(W_BASED_ON)
+            if parent is not None:
+                based_on[style_id] = parent.get(w("val"))
+        for style_id in own:
+            level, current, seen = None, style_id, set()
+            # basedOn chains are short, but a broken document may loop
+            while current is not None and level is None and current not in seen:
+                seen.add(current)
+                level = own.get(current)
+                current = based_on.get(current)
+            self._levels[style_id] = level
+
+    def level(self, p):
+        """Outline level of w:p element `p`, or None for body text."""
+        pPr = p.find(W_PPR)
+        if pPr is not None:
+            level = _outline_level(p)
+            if level is not None:
+                return level
+            pStyle = pPr.find(W_PSTYLE)
+            if pStyle is not None:
+                return self._levels.get(pStyle.get(w("val")))
+        return self._levels.get(self.default_style)
+
+def _outline_level(element):
+    # w:outlineLvl under the element's w:pPr; 9 means body text
+    outline = element.find(f"{W_PPR}/{W_OUTLINE_LVL}")
+    if outline is None:
+        return None
+    try:
+        level = int(outline.get(w("val")))
+    except (TypeError, ValueError):
+        return None
+    return level if level < 9 else None
+
+def locate_section(paragraphs, headings=REFERENCE_HEADINGS):
+    """(heading index, end index) of the bibliography, or None when there is no heading.
+
+    `paragraphs` holds (text, outline level) per paragraph in document order,
+    or None for one that cannot be a heading (e.g. a table of contents line). The
+    entries are the paragraphs strictly between the two indexes.
+    """
+    start = None
+    for i in range(len(paragraphs) - 1, -1, -1):
+        item = paragraphs[i]
+        if item is not None and len(item[0]) <= MAX_HEADING_LENGTH and heading_key(item[0]) in headings:
+            start = i
+            break
+    if start is None:
+        return None
+    level = paragraphs[start][1]
+    for end in range(start + 1, len(paragraphs)):
+        item = paragraphs[end]
+        if item is None:
+            continue
+        text, item_level = item
+        if is_end_heading(text) or (level is not None and item_level is not None and item_level <= level):
+            return start, end
+    return start, len(paragraphs)
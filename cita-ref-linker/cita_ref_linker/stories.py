@@ -0,0 +1,41 @@
+import posixpath
+from lxml import etree
+
+from .ooxml import MC_NS, RELS_NS, W_NS
+
+# --------------------------------------------------------
+# STORIES
+# Citations are not only in body paragraphs: table cells, text boxes,
+# content controls, footnotes, endnotes, headers and footers all hold
+# w:p elements too. One compiled XPath collects every paragraph of a part
+# (or of one body element) in reading order, so wider coverage costs no
+# per-container Python loops. Text boxes appear twice in a package (the
+# DrawingML original and its VML fallback); only the original counts.
+# --------------------------------------------------------
+
+_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+
+# Parts besides document.xml that are linked, in the order the report lists them
+STORY_RELTYPES = (_RT + "footnotes", _RT + "endnotes", _RT + "header", _RT + "footer")
+
+story_paragraphs = etree.XPath("descendant-or-self::w:p[not(ancestor::mc:Fallback)]",
+                               namespaces={"w": W_NS, "mc": MC_NS})
+
+# Paragraphs inside content controls, where Word keeps a table of contents:
+# they are linked like any other, but never read as a heading or an entry
+content_control_paragraphs = etree.XPath("descendant-or-self::w:sdt//w:p", namespaces={"w": W_NS})
+
+def story_part_names(zin, document_part="word/document.xml"):
+    """Zip member names of the note, header and footer parts of a package, in story order."""
+    folder, name = posixpath.split(document_part)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_name not in zin.NameToInfo:
+        return []
+    targets = {reltype: [] for reltype in STORY_RELTYPES}
+    for rel in etree.fromstring(zin.read(rels_name)).iter(f"{{{RELS_NS}}}Relationship"):
+        if rel.get("Type") in targets and rel.get("TargetMode") != "External":
+            target = rel.get("Target")
+            part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+            if part in zin.NameToInfo:
+                targets[rel.get("Type")].append(part)
+    return [part for reltype in STORY_RELTYPES for part in sorted(targets[reltype])]
@@ -0,0 +1,380 @@
+import re
+import zipfile
+from collections import Counter
+from lxml import etree
+
+from .bookmarks import assign_bookmarks, bookmark_ids, drop_ref_bookmarks, ref_bookmarks
+from .docx_zip import DEFAULT_COMPRESS_LEVEL, rewrite_package
+from .ooxml import (W_BODY, W_HYPERLINK, W_PPR, W_R, W_RFONTS, W_RPR, W_SDT, W_SZ, W_T, XML_SPACE,
+                    paragraph_text, w)
+from .planner import REBUILD, link_paragraph, make_planner, may_cite
+from .progress import ProgressReporter
+from .reference_index import ReferenceIndex
+from .stories import content_control_paragraphs, story_paragraphs, story_part_names
+
+# --------------------------------------------------------
+# STREAMING ENGINE
+# Links word/document.xml with lxml.iterparse, one body paragraph at a time,
+# without building python-docx objects. Same Phase 1 / Phase 2 rules as the
+# python-docx engine (ReferenceIndex / plan_citations).
+# --------------------------------------------------------
+
+DOCUMENT_PART = "word/document.xml"
+
+# --- XML BUILDERS (same markup as add_bookmark / create_hyperlink_run / add_text_run) ---
+def add_bookmark(p, bookmark_name, bookmark_id):
+    start = etree.Element(w("bookmarkStart"))
+    start.set(w("id"), str(bookmark_id))
+    start.set(w("name"), bookmark_name)
+    p.insert(0, start)
+    end = etree.SubElement(p, w("bookmarkEnd"))
+    end.set(w("id"), str(bookmark_id))
+
+def _run_properties(r, font_name, font_size, link=False):
+    rPr = etree.SubElement(r, W_RPR)
+    if link:
+        etree.SubElement(rPr, w("color")).set(w("val"), "0000FF")
+        etree.SubElement(rPr, w("u")).set(w("val"), "single")
+    rFonts = etree.SubElement(rPr, W_RFONTS)
+    rFonts.set(w("ascii"), font_name)
+    rFonts.set(w("hAnsi"), font_name)
+    if font_size:
+        etree.SubElement(rPr, W_SZ).set(w("val"), font_size)
+
+def add_hyperlink_run(p, text, bookmark_name, font_name, font_size, link_format=None):
+    hyperlink = etree.SubElement(p, W_HYPERLINK)
+    hyperlink.set(w("anchor"), bookmark_name)
+    hyperlink.set(w("history"), "1")
+    r = etree.SubElement(hyperlink, W_R)
+    if link_format is not None:
+        r.append(link_format.rpr(font_name, font_size))
+    else:
+        _run_properties(r, font_name, font_size, link=True)
+    etree.SubElement(r, W_T).text = text
+    return hyperlink
+
+def add_text_run(p, text, font_name, font_size):
+    r = etree.SubElement(p, W_R)
+    _run_properties(r, font_name, font_size)
+    # Same translation as python-docx Run.text: tabs and line breaks become elements
+    for piece in re.split(r"([\t\r\n])", text):
+        if piece == "\t":
+            etree.SubElement(r, w("tab"))
+        elif piece in ("\r", "\n"):
+            etree.SubElement(r, w("br"))
+        elif piece:
+            t = etree.SubElement(r, W_T)
+            t.text = piece
+            if len(piece.strip()) < len(piece):
+                t.set(XML_SPACE, "preserve")
+    return r
+
+def clear_paragraph(p):
+    for child in list(p):
+        if child.tag != W_PPR:
+            p.remove(child)
+
+# --- SERIALIZATION ---
+def _strip_inherited_ns(fragment, root_decls):
+    """Drops xmlns declarations that the streamed document root already makes.
+
+    lxml re-declares every namespace a detached subtree uses; without this each
+    body element would carry its own copy of the root's declarations.
+    """
+    end = fragment.index(b">")
+    start_tag = fragment[:end]
+    for decl in root_decls:
+        start_tag = start_tag.replace(decl, b"", 1)
+    return start_tag + fragment[end:]
+
+def _document_shell(root, body, preamble):
+    """Opening bytes up to <w:body> and the closing bytes after it."""
+    shell = etree.Element(root.tag, dict(root.attrib), nsmap=root.nsmap)
+    for element in preamble:
+        shell.append(element)
+    shell_body = etree.SubElement(shell, body.tag, dict(body.attrib))
+    shell_body.text = "@@BODY@@"
+    serialized = etree.tostring(shell, xml_declaration=True, encoding="UTF-8", standalone=True)
+    head, tail = serialized.split(b"@@BODY@@")
+    root_decls = [f' xmlns:{prefix}="{uri}"'.encode() if prefix else f' xmlns="{uri}"'.encode()
+                  for prefix, uri in root.nsmap.items()]
+    return head, tail, root_decls
+
+def _document_events(stream):
+    """Yields the iterparse events the engine acts on.
+
+    ("start", w:document), ("start", w:body), and ("end", element) for every
+    direct child of w:document or w:body. Nested elements are not reported.
+    """
+    root = None
+    body = None
+    for event, element in etree.iterparse(stream, events=("start", "end"), huge_tree=True):
+        if event == "start":
+            if root is None:
+                root = element
+                yield event, element
+            elif body is None and element.tag == W_BODY and element.getparent() is root:
+                body = element
+                yield event, element
+        else:
+            parent = element.getparent()
+            if parent is not None and (parent is body or parent is root):
+                yield event, element
+
+def _release(element):
+    """Frees an already-processed element and its processed siblings."""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+# --------------------------------------------------------
+# ENGINE
+# --------------------------------------------------------
+
+def map_references(zin, metrics, levels, headings, entries=True):
+    """Pass 1: finds the reference section, the entries to bookmark and the citation sites.
+
+    Paragraphs are numbered in reading order across the whole body, table
+    cells and text boxes included (see stories.py). The section is located
+    once the pass is done, from the text and outline level (`levels`, a
+    HeadingStyles) of each paragraph outside a content control; see
+    section_locator.py. A reference list laid out in a table is mapped too.
+    `bookmarks` maps a paragraph number to (name, id, is_new) for an entry,
+    or to None for a reference paragraph whose old REF_ bookmarks must go.
+    `sites` holds the numbers of the body paragraphs that may cite; pass 2
+    links only those. Without `entries` the section is still located (and
+    left alone) but nothing in it is indexed.
+    """
+    from .section_locator import locate_section
+    index = ReferenceIndex()
+    bookmarks = {}
+    found = []
+    candidates = []
+    outline = []
+    existing = {}
+    used_ids = Counter()
+
+    with zin.open(DOCUMENT_PART) as stream:
+        for event, element in _document_events(stream):
+            if event == "start" or element.tag == W_BODY or element.getparent().tag != W_BODY:
+                continue
+            has_sdt = element.tag == W_SDT or element.find(f".//{W_SDT}") is not None
+            toc = set(content_control_paragraphs(element)) if has_sdt else ()
+            for p in story_paragraphs(element):
+                metrics.count("paragraphs_scanned")
+                text = paragraph_text(p)
+                if p in toc:
+                    # A table of contents line is never the heading or an entry
+                    outline.append(None)
+                else:
+                    outline.append((text, levels.level(p)))
+                    marks = ref_bookmarks(p)
+                    if marks:
+                        existing[len(outline) - 1] = marks
+                if may_cite(text) or p.find(W_HYPERLINK) is not None:
+                    candidates.append(len(outline) - 1)
+            bookmark_ids(element, used_ids)
+            _release(element)
+
+    section = locate_section(outline, headings)
+    heading, end = section if section is not None else (len(outline), len(outline))
+    for at in range(heading + 1, end):
+        if outline[at] is None or not entries:
+            continue
+        entry = index.add(outline[at][0])
+        if entry:
+            metrics.count("regex_matches")
+            found.append((at, entry, existing.get(at, [])))
+        elif at in existing:
+            bookmarks[at] = None
+    sites = {at for at in candidates if not heading <= at < end}
+
+    # New ids avoid every bookmark already in the document
+    assigned = assign_bookmarks([(entry, marks) for _, entry, marks in found], used_ids)
+    for (at, _, _), bookmark in zip(found, assigned):
+        bookmarks[at] = bookmark
+    return index, bookmarks, sites, len(outline), section is not None
+
+def map_story(root, metrics):
+    """The paragraphs of a note, header or footer part that may cite."""
+    sites = []
+    for p in story_paragraphs(root):
+        metrics.count("paragraphs_scanned")
+        if may_cite(paragraph_text(p)) or p.find(W_HYPERLINK) is not None:
+            sites.append(p)
+    return sites
+
+def rewrite_document(zin, out, bookmarks, sites, metrics, progress, link_paragraph):
+    """Pass 2: streams the rewritten document.xml into `out`.
+
+    `link_paragraph(p)` links one citation site in place.
+    """
+    para_index = 0
+    root = None
+    in_body = False
+    preamble = []
+    root_decls = []
+    tail = b""
+
+    with zin.open(DOCUMENT_PART) as stream:
+        for event, element in _document_events(stream):
+            if event == "start":
+                if root is None:
+                    root = element
+                else:
+                    head, tail, root_decls = _document_shell(root, element, preamble)
+                    out.write(head)
+                    in_body = True
+                continue
+
+            if element.tag == W_BODY:
+                in_body = False
+                continue
+            if not in_body:
+                # Children of w:document ahead of w:body (e.g. w:background)
+                preamble.append(etree.fromstring(etree.tostring(element)))
+                continue
+
+            for p in story_paragraphs(element):
+                progress.update(para_index + 1)
+                if para_index in bookmarks:
+                    _bookmark_paragraph(p, bookmarks[para_index], metrics)
+                elif para_index in sites:
+                    link_paragraph(p)
+                para_index += 1
+
+            out.write(_strip_inherited_ns(etree.tostring(element, encoding="UTF-8"), root_decls))
+            _release(element)
+
+    out.write(tail)
+
+def _bookmark_paragraph(p, bookmark, metrics):
+    if bookmark is None:
+        metrics.count("bookmarks_removed", drop_ref_bookmarks(p))
+        return
+    name, bookmark_id, is_new = bookmark
+    metrics.count("bookmarks_removed", drop_ref_bookmarks(p, keep=None if is_new else name))
+    if is_new:
+        add_bookmark(p, name, bookmark_id)
+        metrics.count("xml_elements_inserted", 2)
+    else:
+        metrics.count("bookmarks_kept")
+
+def _link_paragraph(p, plan_paragraph, ref_map, linked_references, missing_citations, metrics, in_place=False,
+                    link_format=None, fonts=None, plan_fields=None, unlinked_fields=None, check_only=False):
+    segments, action = link_paragraph(p, paragraph_text(p), plan_paragraph, ref_map, linked_references,
+                                      missing_citations, unlinked_fields, metrics, plan_fields, in_place,
+                                      link_format.style_id if link_format is not None else None, check_only)
+    if action != REBUILD:
+        return
+
+    font_name, font_size = fonts.paragraph_font(p)
+    clear_paragraph(p)
+    for fragment, key, is_citation in segments:
+        if key:
+            linked_references.add(key)
+        if key and ref_map[key]:
+            hyperlink = add_hyperlink_run(p, fragment, ref_map[key], font_name, font_size, link_format)
+            metrics.count("hyperlinks_created")
+            metrics.count("xml_elements_inserted", sum(1 for _ in hyperlink.iter()))
+        else:
+            if is_citation and not key:
+                missing_citations.append(fragment)
+            r = add_text_run(p, fragment, font_name, font_size)
+            metrics.count("xml_elements_inserted", sum(1 for _ in r.iter()))
+
+def link_stream(input_filename, output_doc_path, metrics, verbose=True, show_progress=True,
+                progress_interval_ms=100, compresslevel=DEFAULT_COMPRESS_LEVEL, plan_cache=None, in_place=False,
+                link_style=False, ref_headings=(), bibliography=None):
+    """Streaming engine. Returns (index, linked_references, missing_citations, unlinked_fields)."""
+    from .font_resolver import THEME_PART, FontResolver
+    from .field_codes import FieldMatcher, plan_fields
+    from .link_style import CITED_STYLE_ID, STYLES_PART, LinkFormat, ensure_cited_style
+    from .section_locator import HeadingStyles, heading_set
+
+    if verbose: print(f"[*] Opening {input_filename} (streaming)...")
+    with metrics.phase("load"):
+        with zipfile.ZipFile(input_filename) as zin:
+            zin.getinfo(DOCUMENT_PART)
+            has_styles = STYLES_PART in zin.NameToInfo
+            # styles.xml and the theme are small: parsed whole, for the effective fonts and heading levels
+            styles = etree.fromstring(zin.read(STYLES_PART)) if has_styles else None
+            fonts = FontResolver(styles,
+                                 etree.fromstring(zin.read(THEME_PART)) if THEME_PART in zin.NameToInfo else None)
+            levels = HeadingStyles(styles)
+    if link_style and not has_styles and verbose:
+        print("[!] No styles part: links get direct formatting instead of a style")
+    link_format = LinkFormat(CITED_STYLE_ID if link_style and has_styles else None)
+
+    if verbose: print("\n[*] Phase 1: Mapping References")
+    with metrics.phase("phase1_mapping"):
+        with zipfile.ZipFile(input_filename) as zin:
+            index, bookmarks, sites, total_paras, has_section = map_references(
+                zin, metrics, levels, heading_set(ref_headings), bibliography is None or not bibliography.only)
+            # Notes, headers and footers are small parts: parsed whole
+            stories = {}
+            for name in story_part_names(zin, DOCUMENT_PART):
+                root = etree.fromstring(zin.read(name))
+                story_sites = map_story(root, metrics)
+                if story_sites:
+                    stories[name] = (root, story_sites)
+    if not has_section and verbose: print("[!] No reference section heading found")
+    if verbose: print(f"    > Mapped {len(index)} references.")
+    if bibliography is not None:
+        with metrics.phase("phase1_mapping"):
+            mapped = len(index)
+            index.document_only = bibliography.merge(index)
+        if verbose: print(f"    > {len(index) - mapped} more from {bibliography.name} (not linked).")
+
+    if verbose: print("\n[*] Phase 2: Linking Citations")
+    progress = ProgressReporter(total_paras, prefix='Linking :', interval_ms=progress_interval_ms,
+                                quiet=not show_progress)
+    ref_map = index.ref_map
+    plan_paragraph = make_planner(index, plan_cache, metrics)
+    matcher = FieldMatcher(index)
+    # A bibliography file that replaces the reference list leaves nothing to link to
+    check_only = bibliography is not None and bibliography.only
+    linked_references = set()
+    # Broken citations (and field paragraphs left unlinked) per part, reported in
+    # story order whatever the zip order is
+    missing = {name: [] for name in [DOCUMENT_PART, *stories]}
+    unlinked = {name: [] for name in missing}
+
+    def linker(part_name):
+        return lambda p: _link_paragraph(p, plan_paragraph, ref_map, linked_references, missing[part_name],
+                                         metrics, in_place, link_format, fonts,
+                                         lambda p, text: plan_fields(p, text, matcher, plan_paragraph),
+                                         unlinked[part_name], check_only)
+
+    def write_document(zin, out):
+        with metrics.phase("phase2_linking"):
+            rewrite_document(zin, out, bookmarks, sites, metrics, progress, linker(DOCUMENT_PART))
+        progress.finish()
+
+    def story_writer(name, root, story_sites):
+        def write_story(zin, out):
+            with metrics.phase("phase2_linking"):
+                link_paragraph = linker(name)
+                for p in story_sites:
+                    link_paragraph(p)
+                out.write(etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True))
+        return write_story
+
+    def write_styles(zin, out):
+        styles = etree.fromstring(zin.read(STYLES_PART))
+        ensure_cited_style(styles)
+        out.write(etree.tostring(styles, xml_declaration=True, encoding="UTF-8", standalone=True))
+
+    if verbose: print(f"[*] Writing Document to: {output_doc_path}")
+    # document.xml is streamed into its slot; every other part is copied raw
+    writers = {DOCUMENT_PART: write_document}
+    for name, (root, story_sites) in stories.items():
+        writers[name] = story_writer(name, root, story_sites)
+    if link_format.style_id:
+        writers[STYLES_PART] = write_styles
+    rewrite_package(input_filename, output_doc_path, writers, compresslevel, metrics)
+
+    missing_citations = [citation for part_missing in missing.values() for citation in part_missing]
+    unlinked_fields = [text for part_unlinked in unlinked.values() for text in part_unlinked]
+    return index, linked_references, missing_citations, unlinked_fields
@@ -0,0 +1,119 @@
+import re
+
+from .citation_tokenizer import Narrative, parse_sub_citation, tokenize_citations
+from .reference_index import fold
+
+# --------------------------------------------------------
+# SUGGESTIONS FOR BROKEN CITATIONS
+# A BK-tree over the folded first-author surnames of the reference list.
+# For a broken citation it returns the closest reference keys by edit
+# distance, then by year. The metric tree prunes every subtree outside the
+# distance radius, so a query visits a small part of a long reference list.
+# --------------------------------------------------------
+
+MAX_SUGGESTIONS = 3
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; stops early (returning limit + 1) once it exceeds `limit`."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class BKTree:
+    """Burkhard-Keller tree of words; each word carries the entries filed under it."""
+
+    def __init__(self):
+        self.root = None        # [word, items, {distance: child}]
+
+    def add(self, word, items):
+        if self.root is None:
+            self.root = [word, list(items), {}]
+            return
+        node = self.root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                node[1].extend(items)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [word, list(items), {}]
+                return
+            node = child
+
+    def search(self, word, radius):
+        """[(distance, item)] for every word within `radius` edits of `word`."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = edit_distance(word, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            # Triangle inequality: only children at distance d +- radius can hold matches
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+def citation_parts(text):
+    """(first author, year) of a citation fragment as it appears in the report, or None."""
+    tokens = tokenize_citations(text)
+    if tokens and isinstance(tokens[0], Narrative):
+        return tokens[0].surname, tokens[0].year
+    sub = parse_sub_citation(text)
+    if sub is not None:
+        return sub.surname, sub.year
+    # Forms only the surname scanner finds: "Pratiwi et al. (2018: 3)"
+    match = re.match(r"([\w\-\'’]+)\D*?(\d{4})", text)
+    if match:
+        return match.group(1), match.group(2)
+    return None
+
+class Suggester:
+    """Closest reference keys for citations that matched nothing."""
+
+    def __init__(self, entries):
+        self.tree = BKTree()
+        # One walk down the tree per surname, however many entries share it
+        by_name = {}
+        for entry in entries:
+            by_name.setdefault(fold(entry.surnames[0]), []).append(entry)
+        for name, named in by_name.items():
+            self.tree.add(name, named)
+        self._searched = {}     # folded surname -> tree hits; the year only changes the ranking
+
+    def suggest(self, citation_text, limit=MAX_SUGGESTIONS):
+        parts = citation_parts(citation_text)
+        if parts is None:
+            return []
+        surname, year = parts
+        name = fold(surname)
+        # Short names tolerate one typo, longer ones about one per three letters
+        hits = self._searched.get(name)
+        if hits is None:
+            hits = self._searched[name] = self.tree.search(name, max(1, len(name) // 3))
+        ranked = sorted((distance, abs(int(entry.year) - int(year)), entry.key) for distance, entry in hits)
+        return [key for _, _, key in ranked[:limit]]
+
+def suggest_for(citations, entries, limit=MAX_SUGGESTIONS):
+    """{citation text: [reference keys]} for the citations that have a close match."""
+    if not citations or not entries:
+        return {}
+    suggester = Suggester(entries)
+    suggestions = {}
+    for citation in dict.fromkeys(citations):
+        keys = suggester.suggest(citation, limit)
+        if keys:
+            suggestions[citation] = keys
+    return suggestions
@@ -0,0 +1,171 @@
+import re
+import unicodedata
+from collections import deque, namedtuple
+
+# --------------------------------------------------------
+# SURNAME SCANNER
+# After Phase 1 the surnames of the reference list are known, so Phase 2
+# can also look for them directly: an Aho-Corasick automaton over every
+# first-author surname finds all of them in one pass over the text,
+# however long the reference list. It only runs over the text just before
+# a four-digit year. Each hit is then checked for a year right after it,
+# which is what makes it a citation:
+#   Pratiwi (2021, p. 4)    Pratiwi et al. (2021a)    Oztas's (2009)
+#   Pratiwi 2021            Machova, 2021             (inside plain text)
+# --------------------------------------------------------
+
+# A verified citation site in a text fragment
+Site = namedtuple("Site", "start end authors year suffix et_al in_parens")
+
+class AhoCorasick:
+    """Multi-pattern exact matcher: one pass over the text for any number of words."""
+
+    def __init__(self, words):
+        self.goto = [{}]        # state -> {char: next state}
+        self.fail = [0]
+        self.output = [()]      # state -> words that end in this state
+        for word in words:
+            self._insert(word)
+        self._link()
+        # At the root only a pattern's first letter can start a match: jump to it in C
+        first_chars = "".join(sorted(self.goto[0]))
+        self._next_start = re.compile(f"[{re.escape(first_chars)}]").search if first_chars else None
+
+    def _insert(self, word):
+        state = 0
+        for ch in word:
+            following = self.goto[state].get(ch)
+            if following is None:
+                following = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.goto[state][ch] = following
+            state = following
+        if word not in self.output[state]:
+            self.output[state] += (word,)
+
+    def _link(self):
+        # Breadth-first, so a state's failure link is resolved before its children's
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] += self.output[self.fail[child]]
+
+    def finditer(self, text, start=0, end=None):
+        """Yields (start, end, word) for every occurrence of every word in text[start:end], overlaps included."""
+        if self._next_start is None:
+            return
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        i = start
+        n = len(text) if end is None else end
+        while i < n:
+            if state == 0:
+                match = self._next_start(text, i, n)
+                if match is None:
+                    return
+                i = match.start()
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for word in output[state]:
+                yield i + 1 - len(word), i + 1, word
+            i += 1
+
+def strip_accents(word):
+    """"Machová" -> "Machova", same case: the form an author without the keyboard types."""
+    decomposed = unicodedata.normalize("NFKD", word)
+    return unicodedata.normalize("NFC", "".join(ch for ch in decomposed if not unicodedata.combining(ch)))
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch in "_-'’"
+
+# What may follow a surname before its year, an ASCII one. The hit is
+# verified on a short window, so these never run over the whole paragraph.
+_VERIFY_WINDOW = 80
+_narrative_tail = re.compile(
+    r"(?P<second>\s+(?:&|and)\s+(?P<second_name>[A-Z][\w\-\'’]+))?"
+    r"(?P<et_al>\s+et\s+al\.?)?"
+    r"(?:['’]s)?,?\s*"
+    r"\((?P<year>[0-9]{4})(?P<suffix>[a-z](?![a-z]))?(?:\)|[,:;][^()]*\))"
+)
+_bare_tail = re.compile(
+    r"(?P<et_al>\s+et\s+al\.?)?,?\s+(?P<year>[0-9]{4})(?P<suffix>[a-z](?![a-z]))?(?![\w])"
+)
+# Both tails put a year within _VERIFY_WINDOW of the name, so only the text
+# just before a year is worth running the automaton over
+_year = re.compile(r"[0-9]{4}")
+
+class SurnameScanner:
+    """Finds citations of known first authors in text that the tokenizer left as prose."""
+
+    def __init__(self, surnames):
+        words = set()
+        for surname in surnames:
+            words.add(surname)
+            words.add(strip_accents(surname))
+        self.automaton = AhoCorasick(sorted(words))
+        # How far before a year a name may start and still be verified
+        self._reach = _VERIFY_WINDOW + max(map(len, words), default=0)
+
+    def scan(self, text, start=0, end=None):
+        """Non-overlapping verified Sites whose name lies in text[start:end], left to right.
+
+        The year after a name may lie past `end`. At the same start the
+        longest name wins.
+        """
+        if end is None:
+            end = len(text)
+        sites = []
+        taken_until = start
+        for region_start, region_end in self._regions(text, start, end):
+            hits = sorted(self.automaton.finditer(text, region_start, region_end),
+                          key=lambda hit: (hit[0], -hit[1]))
+            for hit_start, hit_end, word in hits:
+                if hit_start < taken_until:
+                    continue
+                # Whole words only: "Lee" must not fire inside "Leeds" or "Ashlee"
+                if (hit_start > 0 and _is_word_char(text[hit_start - 1])) or \
+                   (hit_end < len(text) and _is_word_char(text[hit_end]) and text[hit_end] not in "'’"):
+                    continue
+                site = self._verify(text, hit_start, hit_end, word)
+                if site is not None:
+                    sites.append(site)
+                    taken_until = site.end
+        return sites
+
+    def _regions(self, text, start, end):
+        """Merged [start, end) stretches of text[start:end] that end at a year or lie just before one."""
+        regions = []
+        for year in _year.finditer(text, start, min(len(text), end + _VERIFY_WINDOW)):
+            region_start, region_end = max(start, year.start() - self._reach), min(end, year.start())
+            if region_start < region_end:
+                if regions and region_start <= regions[-1][1]:
+                    regions[-1][1] = region_end
+                else:
+                    regions.append([region_start, region_end])
+            if year.start() >= end:
+                # Later years only give regions inside this one
+                break
+        return regions
+
+    def _verify(self, text, start, end, word):
+        window = text[end:end + _VERIFY_WINDOW]
+        match = _narrative_tail.match(window)
+        in_parens = True
+        if match is None:
+            match = _bare_tail.match(window)
+            in_parens = False
+            if match is None:
+                return None
+        authors = (word, match.group("second_name")) if in_parens and match.group("second") else (word,)
+        return Site(start, end + match.end(), authors, match.group("year"), match.group("suffix") or "",
+                    bool(match.group("et_al")), in_parens)
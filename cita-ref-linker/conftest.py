@@ -0,0 +1,69 @@
+import zipfile
+
+import pytest
+from lxml import etree
+
+# --------------------------------------------------------
+# TEST FIXTURES
+# Small manuscripts are built with python-docx for each test and linked
+# with both engines. pytest puts this folder on sys.path, so the tests
+# import the cita_ref_linker package as the CLI does.
+# --------------------------------------------------------
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+REFERENCES = (
+    "Jones, A. (2019). Reading in a second language. Applied Linguistics, 40(2), 1-20.",
+    "Smith, J. (2020). Vocabulary and motivation. Language Learning, 70(1), 5-30.",
+)
+
+@pytest.fixture(params=["docx", "stream"])
+def engine(request):
+    return request.param
+
+@pytest.fixture
+def make_docx(tmp_path):
+    """make_docx(body, references, setup=None) -> path of a new .docx.
+
+    `body` and `references` are paragraph texts; the references follow a
+    "References" heading. `setup(doc)` may edit the python-docx Document
+    before it is saved.
+    """
+    from docx import Document
+    counter = iter(range(1000))
+
+    def make(body, references=REFERENCES, setup=None):
+        doc = Document()
+        for text in body:
+            doc.add_paragraph(text)
+        doc.add_heading("References", level=1)
+        for text in references:
+            doc.add_paragraph(text)
+        if setup is not None:
+            setup(doc)
+        path = tmp_path / f"manuscript_{next(counter)}.docx"
+        doc.save(path)
+        return path
+
+    return make
+
+@pytest.fixture
+def link(tmp_path):
+    """link(path, engine, **options) -> (output path, LinkResult)."""
+    from cita_ref_linker import link_document
+    counter = iter(range(1000))
+
+    def run(path, engine="docx", **options):
+        out = tmp_path / f"linked_{next(counter)}.docx"
+        return out, link_document(path, out, engine=engine, **options)
+
+    return run
+
+def document_root(path):
+    """The parsed word/document.xml of a .docx."""
+    with zipfile.ZipFile(path) as z:
+        return etree.fromstring(z.read("word/document.xml"))
+
+@pytest.fixture
+def read_document():
+    return document_root
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from lxml import etree
+
+from cita_ref_linker.bibliography import parse_bibtex, parse_csl_json, parse_ris
+from cita_ref_linker.field_codes import FieldItem
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+BIBTEX = r"""Exported library
+@string{ll = "Language Learning"}
+@article{smith2020,
+  author = {Smith, John and van der Berg, J. and M{\"u}ller, Anna},
+  title = {Vocabulary {and} Motivation: R\&D in {L2}},
+  journal = ll,
+  year = 2020,
+  doi = "10.1000/ll.2020"
+}
+@comment{An old entry: @article{gone, author = {Gone, G.}, year = {1999}}}
+@book{who2019, editor = {{World Health Organization}}, date = {2019-05-01}, title = {Guidelines}}
+"""
+
+RIS = """TY  - JOUR
+AU  - Smith, John
+AU  - Jones, A.
+PY  - 2020///
+TI  - Vocabulary and motivation
+DO  - 10.1000/ll.2020
+ER  - 
+TY  - BOOK
+ID  - young2019
+A1  - Young, B.
+Y1  - 2019/05/01/
+T1  - Reading
+ER  - 
+"""
+
+def test_bibtex_braces_and_escapes():
+    assert list(parse_bibtex(BIBTEX)) == [
+        FieldItem(("bib", "smith2020"), ("Smith", "van", "Muller"), "2020", "10.1000/ll.2020",
+                  "Vocabulary and Motivation: R&D in L2"),
+        FieldItem(("bib", "who2019"), ("World",), "2019", "", "Guidelines"),
+    ]
+
+def test_ris_records():
+    assert list(parse_ris(RIS)) == [
+        FieldItem(("bib", "1"), ("Smith", "Jones"), "2020", "10.1000/ll.2020", "Vocabulary and motivation"),
+        FieldItem(("bib", "young2019"), ("Young",), "2019", "", "Reading"),
+    ]
+
+def test_csl_json_items():
+    items = [{"id": "a", "author": [{"family": "Smith", "given": "J."}, {"literal": "World Health Organization"}],
+              "issued": {"date-parts": [[2020, 5]]}, "title": "T", "DOI": "10.1/x"},
+             {"issued": {"raw": "2019"}, "editor": [{"family": "van der Berg"}]},
+             "not an item"]
+    expected = [FieldItem(("bib", "a"), ("Smith", "World"), "2020", "10.1/x", "T"),
+                FieldItem(("bib", "1"), ("van",), "2019", "", "")]
+    assert parse_csl_json(json.dumps(items)) == expected
+    assert parse_csl_json(json.dumps({"items": items})) == expected
+
+def test_library_surnames_do_not_make_citations_of_running_text(make_docx, link, read_document, engine, tmp_path):
+    library = tmp_path / "library.bib"
+    library.write_text(BIBTEX + "@article{may2020, author = {May, Anne}, year = {2020}, title = {Surveys}}\n",
+                       encoding="utf-8")
+    body = ["The survey closed in May 2020, as Jones 2019 and Smith (2020) report."]
+    out, result = link(make_docx(body), engine, bibliography=library)
+    # "May 2020" is a date here: only the document's own authors are looked for in running text
+    assert result.bibliography_only == []
+    assert result.missing_citations == []
+    anchors = [link.get(W + "anchor") for link in read_document(out).iter(W + "hyperlink")]
+    assert anchors == [result.ref_map["Jones_2019"], result.ref_map["Smith_2020"]]
+
+def test_bibliography_only_leaves_earlier_links(make_docx, link, read_document, engine, tmp_path):
+    library = tmp_path / "library.bib"
+    library.write_text("@article{smith2020, author = {Smith, John}, year = {2020}, title = {Vocabulary}}\n",
+                       encoding="utf-8")
+    linked, _ = link(make_docx(["As Smith (2020) and Jones (2019) found."]), engine)
+    before = etree.tostring(read_document(linked))
+    out, result = link(linked, engine, bibliography=library, bibliography_only=True)
+    # Nothing is linked against the file, and the links of the first run stay as they were
+    assert etree.tostring(read_document(out)) == before
+    assert result.missing_citations == ["Jones (2019)"]
+
+def test_bibliography_only_needs_a_bibliography(make_docx, link, engine):
+    with pytest.raises(ValueError):
+        link(make_docx(["Smith (2020)."]), engine, bibliography_only=True)
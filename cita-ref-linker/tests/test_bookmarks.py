@@ -0,0 +1,54 @@
+from collections import Counter
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+BODY = ["Introduction", "Motivation matters (Smith, 2020).", "Jones (2019) disagrees."]
+
+def add_bookmark(paragraph, name, bookmark_id):
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    start = OxmlElement("w:bookmarkStart")
+    start.set(qn("w:id"), str(bookmark_id))
+    start.set(qn("w:name"), name)
+    end = OxmlElement("w:bookmarkEnd")
+    end.set(qn("w:id"), str(bookmark_id))
+    paragraph._p.insert(0, start)
+    paragraph._p.append(end)
+
+def bookmarks(root):
+    return [(mark.get(W + "name"), mark.get(W + "id")) for mark in root.iter(W + "bookmarkStart")]
+
+def test_new_ids_avoid_the_documents_own_bookmarks(make_docx, link, read_document, engine):
+    def setup(doc):
+        # Word numbers its own bookmarks from 0, e.g. the heading's cross-reference target
+        add_bookmark(doc.paragraphs[3], "References", 0)
+        add_bookmark(doc.paragraphs[0], "_Toc1", 1)
+
+    out, result = link(make_docx(BODY, setup=setup), engine)
+    marks = bookmarks(read_document(out))
+    ids = Counter(bookmark_id for _, bookmark_id in marks)
+    assert all(count == 1 for count in ids.values()), marks
+    assert sorted(result.ref_map) == ["Jones_2019", "Smith_2020"]
+    assert ("References", "0") in marks and ("_Toc1", "1") in marks
+
+def test_relinking_keeps_bookmarks_with_unique_ids(make_docx, link, read_document, engine):
+    def setup(doc):
+        add_bookmark(doc.paragraphs[3], "References", 0)
+
+    first, _ = link(make_docx(BODY, setup=setup), engine)
+    second, result = link(first, engine)
+    assert result.metrics["counters"]["bookmarks_kept"] == 2
+    assert result.metrics["counters"]["links_kept"] == 2
+    assert bookmarks(read_document(second)) == bookmarks(read_document(first))
+
+def test_colliding_bookmark_from_an_earlier_run_is_replaced(make_docx, link, read_document, engine):
+    def setup(doc):
+        # What an earlier version left behind: REF_Jones2019_0 shares id 0 with "References"
+        add_bookmark(doc.paragraphs[3], "References", 0)
+        add_bookmark(doc.paragraphs[4], "REF_Jones2019_0", 0)
+
+    out, result = link(make_docx(BODY, setup=setup), engine)
+    marks = bookmarks(read_document(out))
+    assert all(count == 1 for count in Counter(bookmark_id for _, bookmark_id in marks).values()), marks
+    assert "REF_Jones2019_0" not in dict(marks)
+    assert result.ref_map["Jones_2019"] in dict(marks)
@@ -0,0 +1,65 @@
+import io
+import zipfile
+
+import pytest
+
+from cita_ref_linker.docx_zip import rewrite_package
+
+MEMBERS = {
+    "[Content_Types].xml": b"<Types/>" * 50,
+    "word/document.xml": b"<w:document/>" * 200,
+    "word/media/image1.png": bytes(range(256)) * 40,
+    "word/styles.xml": b"<w:styles/>" * 100,
+}
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream that cannot seek, so zipfile ends every member with a data descriptor."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+def write_source(path, data_descriptors):
+    target = Unseekable() if data_descriptors else path
+    with zipfile.ZipFile(target, "w") as z:
+        for n, (name, data) in enumerate(MEMBERS.items()):
+            # Stored and deflated members alternate
+            info = zipfile.ZipInfo(name, (2024, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED if n % 2 else zipfile.ZIP_STORED
+            with z.open(info, "w") as out:
+                out.write(data)
+    if data_descriptors:
+        path.write_bytes(target.buffer.getvalue())
+
+@pytest.mark.parametrize("data_descriptors", [False, True])
+@pytest.mark.parametrize("compresslevel", [0, 6])
+def test_raw_copies_round_trip(tmp_path, data_descriptors, compresslevel):
+    source = tmp_path / "source.docx"
+    write_source(source, data_descriptors)
+    with zipfile.ZipFile(source) as z:
+        assert all(bool(info.flag_bits & 0x08) == data_descriptors for info in z.infolist())
+        compress_types = {info.filename: info.compress_type for info in z.infolist()}
+
+    output = tmp_path / "output.docx"
+    new_document = b"<w:document>linked</w:document>"
+    rewrite_package(source, output, {"word/document.xml": lambda zin, out: out.write(new_document)},
+                    compresslevel)
+
+    with zipfile.ZipFile(output) as z:
+        assert z.testzip() is None
+        assert z.namelist() == list(MEMBERS)
+        for info in z.infolist():
+            if info.filename == "word/document.xml":
+                assert z.read(info) == new_document
+                expected = zipfile.ZIP_STORED if compresslevel == 0 else zipfile.ZIP_DEFLATED
+                assert info.compress_type == expected
+            else:
+                # Copied as they were: same bytes, same compression, no data descriptor
+                assert z.read(info) == MEMBERS[info.filename]
+                assert info.compress_type == compress_types[info.filename]
+                assert not info.flag_bits & 0x08
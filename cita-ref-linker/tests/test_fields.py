@@ -0,0 +1,83 @@
+import json
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{W_NS}}}"
+
+JONES = "Jones, A. (2019). Reading in a second language. Applied Linguistics, 40(2), 1-20."
+SMITH = "Smith, J. (2020). Vocabulary and motivation. Language Learning, 70(1), 5-30."
+SMITH_ITEM = {"title": "Vocabulary and motivation", "author": [{"family": "Smith", "given": "J."}],
+              "issued": {"date-parts": [[2020]]}}
+JONES_ITEM = {"title": "Reading in a second language", "author": [{"family": "Jones", "given": "A."}],
+              "issued": {"date-parts": [[2019]]}}
+
+def add_field(p, items, result):
+    """Appends a Zotero citation field, its result split over italic runs, to a python-docx paragraph."""
+    from docx.oxml.parser import parse_xml
+    data = {"citationItems": [{"id": k, "itemData": item} for k, item in enumerate(items, 1)]}
+    instruction = " ADDIN ZOTERO_ITEM CSL_CITATION " + json.dumps(data)
+    runs = ['<w:fldChar w:fldCharType="begin"/>',
+            f'<w:instrText xml:space="preserve">{escape(instruction[:30])}</w:instrText>',
+            f'<w:instrText xml:space="preserve">{escape(instruction[30:])}</w:instrText>',
+            '<w:fldChar w:fldCharType="separate"/>']
+    runs += [f'<w:rPr><w:i/></w:rPr><w:t xml:space="preserve">{escape(result[k:k + 6])}</w:t>'
+             for k in range(0, len(result), 6)]
+    runs.append('<w:fldChar w:fldCharType="end"/>')
+    for run in runs:
+        p._p.append(parse_xml(f'<w:r xmlns:w="{W_NS}">{run}</w:r>'))
+
+def field_markup(root):
+    p = next(root.iter(W + "p"))
+    return ([mark.get(W + "fldCharType") for mark in p.iter(W + "fldChar")],
+            "".join(instr.text for instr in p.iter(W + "instrText")))
+
+def anchors(root):
+    return [link.get(W + "anchor") for link in next(root.iter(W + "p")).iter(W + "hyperlink")]
+
+def with_reference(path, text):
+    from docx import Document
+    doc = Document(path)
+    doc.add_paragraph(text)
+    revised = path.with_name("revised_" + path.name)
+    doc.save(revised)
+    return revised
+
+def test_relinking_a_field_paragraph_keeps_its_fields(make_docx, link, read_document, engine):
+    def setup(doc):
+        add_field(doc.paragraphs[0], [SMITH_ITEM, JONES_ITEM], "(Smith, 2020; Jones, 2019)")
+        doc.paragraphs[0].add_run(", as Jones (2019) says.")
+
+    source = make_docx(["Cited with Zotero "], [SMITH], setup)
+    first, result = link(source, engine)
+    assert result.missing_citations == ["Jones, 2019", "Jones (2019)"]
+    fields = field_markup(read_document(source))
+    assert field_markup(read_document(first)) == fields
+
+    # The reference list gains the Jones entry: both Jones citations get a link on the next run
+    second, result = link(with_reference(first, JONES), engine)
+    assert result.missing_citations == []
+    assert result.unlinked_fields == []
+    root = read_document(second)
+    assert field_markup(root) == fields
+    assert anchors(root) == [result.ref_map["Smith_2020"], result.ref_map["Jones_2019"],
+                             result.ref_map["Jones_2019"]]
+
+def test_field_paragraph_that_cannot_be_spliced_is_left_alone(make_docx, link, read_document, engine):
+    from docx.oxml.parser import parse_xml
+
+    def setup(doc):
+        p = doc.paragraphs[0]
+        add_field(p, [SMITH_ITEM], "(Smith, 2020)")
+        # A citation inside a link of the author's own cannot be wrapped in a REF_ link
+        p._p.append(parse_xml(f'<w:hyperlink xmlns:w="{W_NS}" w:anchor="_Toc1"><w:r><w:t>see Jones (2019)</w:t>'
+                              f'</w:r></w:hyperlink>'))
+
+    source = make_docx(["Cited with Zotero "], [SMITH, JONES], setup)
+    out, result = link(source, engine, report_path=source.with_name("report.txt"))
+    before, after = next(read_document(source).iter(W + "p")), next(read_document(out).iter(W + "p"))
+    assert etree.tostring(after) == etree.tostring(before)
+    assert result.unlinked_fields == ["Cited with Zotero (Smith, 2020)see Jones (2019)"]
+    assert result.metrics["counters"]["field_paragraphs_skipped"] == 1
+    assert "CITATION FIELDS LEFT UNLINKED (1)" in source.with_name("report.txt").read_text(encoding="utf-8")
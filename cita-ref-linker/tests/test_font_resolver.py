@@ -0,0 +1,60 @@
+from lxml import etree
+
+from cita_ref_linker.font_resolver import FontResolver
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
+STYLES = f"""<w:styles xmlns:w="{W_NS}">
+  <w:docDefaults><w:rPrDefault><w:rPr>
+    <w:rFonts w:asciiTheme="minorHAnsi"/><w:sz w:val="22"/>
+  </w:rPr></w:rPrDefault></w:docDefaults>
+  <w:style w:type="paragraph" w:default="1" w:styleId="Normal"/>
+  <w:style w:type="paragraph" w:styleId="Base"><w:rPr><w:rFonts w:ascii="Georgia"/></w:rPr></w:style>
+  <w:style w:type="paragraph" w:styleId="Child"><w:basedOn w:val="Base"/><w:rPr><w:sz w:val="28"/></w:rPr></w:style>
+  <w:style w:type="paragraph" w:styleId="Grandchild"><w:basedOn w:val="Child"/></w:style>
+  <w:style w:type="paragraph" w:styleId="Heading"><w:basedOn w:val="Child"/>
+    <w:rPr><w:rFonts w:asciiTheme="majorHAnsi"/></w:rPr></w:style>
+  <w:style w:type="paragraph" w:styleId="LoopA"><w:basedOn w:val="LoopB"/></w:style>
+  <w:style w:type="paragraph" w:styleId="LoopB"><w:basedOn w:val="LoopA"/></w:style>
+  <w:style w:type="character" w:styleId="Quote"><w:rPr><w:rFonts w:ascii="Courier New"/></w:rPr></w:style>
+</w:styles>"""
+
+THEME = f"""<a:theme xmlns:a="{A_NS}"><a:themeElements><a:fontScheme>
+  <a:majorFont><a:latin typeface="Cambria"/></a:majorFont>
+  <a:minorFont><a:latin typeface="Calibri Light"/></a:minorFont>
+</a:fontScheme></a:themeElements></a:theme>"""
+
+def resolver():
+    return FontResolver(etree.fromstring(STYLES), etree.fromstring(THEME))
+
+def paragraph(xml):
+    return etree.fromstring(f'<w:p xmlns:w="{W_NS}">{xml}</w:p>')
+
+def test_based_on_chain():
+    fonts = resolver()
+    assert fonts.style("Base") == ("Georgia", "22")
+    assert fonts.style("Child") == ("Georgia", "28")
+    # Nothing of its own: all from the chain
+    assert fonts.style("Grandchild") == ("Georgia", "28")
+    assert fonts.style("Heading") == ("Cambria", "28")
+
+def test_theme_fonts_and_defaults():
+    fonts = resolver()
+    assert fonts.style("Normal") == ("Calibri Light", "22")
+    assert fonts.style("Missing") == ("Calibri Light", "22")
+    # A basedOn loop ends at the defaults instead of hanging
+    assert fonts.style("LoopA") == ("Calibri Light", "22")
+    assert FontResolver().style("Normal") == (None, None)
+
+def test_paragraph_font():
+    fonts = resolver()
+    assert fonts.paragraph_font(paragraph('<w:pPr><w:pStyle w:val="Grandchild"/></w:pPr><w:r><w:t>x</w:t></w:r>')) \
+        == ("Georgia", None)
+    # The default paragraph style when there is no pStyle
+    assert fonts.paragraph_font(paragraph("<w:r><w:t>x</w:t></w:r>")) == ("Calibri Light", None)
+    # A run's character style names the font; the first run's own size is kept
+    assert fonts.paragraph_font(paragraph(
+        '<w:pPr><w:pStyle w:val="Child"/></w:pPr>'
+        '<w:r><w:rPr><w:rStyle w:val="Quote"/><w:sz w:val="20"/></w:rPr><w:t>x</w:t></w:r>')) == ("Courier New", "20")
+    assert FontResolver().paragraph_font(paragraph("<w:r><w:t>x</w:t></w:r>")) == ("Calibri", None)
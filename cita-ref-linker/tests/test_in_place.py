@@ -0,0 +1,81 @@
+import pytest
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+JONES = "Jones, A. (2019). Reading in a second language. Applied Linguistics, 40(2), 1-20."
+SMITH = "Smith, J. (2020). Vocabulary and motivation. Language Learning, 70(1), 5-30."
+
+def text_of(element):
+    return "".join(t.text or "" for t in element.iter(W + "t"))
+
+def first_paragraph(root):
+    return next(root.iter(W + "p"))
+
+def links(root):
+    """(link text, anchor) of every hyperlink in the first paragraph."""
+    return [(text_of(link), link.get(W + "anchor")) for link in first_paragraph(root).iter(W + "hyperlink")]
+
+@pytest.mark.parametrize("in_place", [True, False])
+@pytest.mark.parametrize("body", [
+    "Both agree (Smith, 2020;Jones, 2019) on this.",
+    "Both agree (  Smith, 2020 ;   Jones, 2019  ) on this.",
+    "Both agree (Smith, 2020;  Jones, 2019) on this.",
+])
+def test_links_cover_exactly_the_citations(make_docx, link, read_document, engine, in_place, body):
+    out, result = link(make_docx([body], [JONES, SMITH]), engine, in_place=in_place)
+    root = read_document(out)
+    assert links(root) == [("Smith, 2020", result.ref_map["Smith_2020"]),
+                           ("Jones, 2019", result.ref_map["Jones_2019"])]
+    # Neither path respaces the group
+    assert text_of(first_paragraph(root)) == body
+
+@pytest.mark.parametrize("body", [
+    "Both agree (Smith, 2020;Jones, 2019) on this.",
+    "Both agree (  Smith, 2020 ;   Jones, 2019  ) on this.",
+])
+def test_rerun_keeps_every_link(make_docx, link, read_document, engine, body):
+    first, _ = link(make_docx([body], [JONES, SMITH]), engine, in_place=True)
+    second, result = link(first, engine, in_place=True)
+    counters = result.metrics["counters"]
+    assert counters["links_kept"] == 2
+    assert counters["hyperlinks_created"] == 0
+    assert links(read_document(second)) == links(read_document(first))
+
+def test_rerun_after_the_reference_list_changed_splices_in_place(make_docx, link, read_document, engine):
+    from docx import Document
+
+    def setup(doc):
+        doc.paragraphs[0].add_run(" See").italic = True
+
+    first, result = link(make_docx(["Both agree (Smith, 2020; Jones, 2019) on this."], [SMITH], setup), engine,
+                         in_place=True)
+    assert result.missing_citations == ["Jones, 2019"]
+
+    revised = first.with_name("revised.docx")
+    doc = Document(first)
+    doc.add_paragraph(JONES)
+    doc.save(revised)
+
+    second, result = link(revised, engine, in_place=True)
+    counters = result.metrics["counters"]
+    assert (counters["links_kept"], counters["hyperlinks_created"]) == (1, 1)
+    root = read_document(second)
+    assert [text for text, _ in links(root)] == ["Smith, 2020", "Jones, 2019"]
+    # Spliced, not rebuilt: the italic run is still there
+    assert first_paragraph(root).find(f"{W}r/{W}rPr/{W}i") is not None
+
+def test_links_of_a_paragraph_that_no_longer_cites_are_unwrapped(make_docx, link, read_document, engine):
+    from docx import Document
+
+    first, _ = link(make_docx(["As Smith (2020) shows."], [SMITH]), engine, in_place=True)
+    revised = first.with_name("revised.docx")
+    doc = Document(first)
+    # The entry goes: the old link has nothing left to point to
+    doc.paragraphs[-1]._p.getparent().remove(doc.paragraphs[-1]._p)
+    doc.save(revised)
+
+    second, result = link(revised, engine, in_place=True)
+    root = read_document(second)
+    assert links(root) == []
+    assert text_of(first_paragraph(root)) == "As Smith (2020) shows."
+    assert first_paragraph(root).find(f"{W}r/{W}rPr/{W}color") is None
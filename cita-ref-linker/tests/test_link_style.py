@@ -0,0 +1,53 @@
+import zipfile
+
+import pytest
+from lxml import etree
+
+from cita_ref_linker.link_style import CITED_STYLE_ID, LinkFormat
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+BODY = ["As Smith (2020) found, reading helps (Jones, 2019; Brown, 2001)."]
+
+def cited_styles(path):
+    with zipfile.ZipFile(path) as z:
+        styles = etree.fromstring(z.read("word/styles.xml"))
+    return [style for style in styles.iter(W + "style") if style.get(W + "styleId") == CITED_STYLE_ID]
+
+def link_run_properties(root):
+    """The w:rPr of every run inside a hyperlink."""
+    return [r.find(W + "rPr") for link in root.iter(W + "hyperlink") for r in link.iter(W + "r")]
+
+@pytest.mark.parametrize("in_place", [False, True])
+def test_style_is_registered_once_across_runs(make_docx, link, engine, in_place):
+    first, _ = link(make_docx(BODY), engine, link_style=True, in_place=in_place)
+    second, _ = link(first, engine, link_style=True, in_place=in_place)
+    assert len(cited_styles(first)) == 1
+    assert len(cited_styles(second)) == 1
+
+@pytest.mark.parametrize("in_place", [False, True])
+def test_link_runs_carry_the_style(make_docx, link, read_document, engine, in_place):
+    out, _ = link(make_docx(BODY), engine, link_style=True, in_place=in_place)
+    properties = link_run_properties(read_document(out))
+    assert len(properties) >= 2
+    for rPr in properties:
+        assert rPr.find(W + "rStyle").get(W + "val") == CITED_STYLE_ID
+        # The style carries the blue underline, not each run
+        assert rPr.find(W + "color") is None and rPr.find(W + "u") is None
+
+def test_without_style_runs_get_direct_formatting(make_docx, link, read_document, engine):
+    out, _ = link(make_docx(BODY), engine)
+    assert cited_styles(out) == []
+    for rPr in link_run_properties(read_document(out)):
+        assert rPr.find(W + "rStyle") is None
+        assert rPr.find(W + "color").get(W + "val") == "0000FF"
+        assert rPr.find(W + "u").get(W + "val") == "single"
+
+def test_templates_are_cloned():
+    link_format = LinkFormat(CITED_STYLE_ID)
+    first, second = link_format.rpr("Georgia", "24"), link_format.rpr("Georgia", "24")
+    assert first is not second
+    assert etree.tostring(first) == etree.tostring(second)
+    assert [child.tag for child in first] == [W + "rStyle", W + "rFonts", W + "sz"]
+    assert first.find(W + "rFonts").get(W + "ascii") == "Georgia"
+    assert [child.tag for child in LinkFormat().rpr("Georgia")] == [W + "color", W + "u", W + "rFonts"]
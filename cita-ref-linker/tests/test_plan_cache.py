@@ -0,0 +1,49 @@
+from cita_ref_linker.plan_cache import PlanCache
+from cita_ref_linker.planner import plan_citations
+from cita_ref_linker.reference_index import ReferenceIndex
+
+REFERENCES = ["Smith, J. (2020). Vocabulary. Language Learning.",
+              "Smith, K. (2020). Motivation. System.",
+              "Jones, A. (2019). Reading. Applied Linguistics."]
+TEXT = "As Jones (2019) and Smith (2020) found (Brown, 2001)."
+
+def make_index(references=REFERENCES):
+    index = ReferenceIndex()
+    for text in references:
+        index.add(text).bookmark = f"REF_{len(index)}"
+    return index
+
+def test_unchanged_paragraph_is_a_hit(tmp_path):
+    path = tmp_path / "plans.sqlite"
+    with PlanCache(path) as cache:
+        first = cache.planner(make_index(), plan_citations)(TEXT)
+        assert (cache.hits, cache.misses) == (0, 1)
+    with PlanCache(path) as cache:
+        assert cache.planner(make_index(), plan_citations)(TEXT) == first
+        assert (cache.hits, cache.misses) == (1, 0)
+    assert first == plan_citations(TEXT, make_index())
+
+def test_new_reference_list_is_a_miss(tmp_path):
+    path = tmp_path / "plans.sqlite"
+    with PlanCache(path) as cache:
+        cache.planner(make_index(), plan_citations)(TEXT)
+    index = make_index(REFERENCES + ["Brown, B. (2001). Grammar. TESOL Quarterly."])
+    with PlanCache(path) as cache:
+        segments, _ = cache.planner(index, plan_citations)(TEXT)
+        assert (cache.hits, cache.misses) == (0, 1)
+    # The new entry links the citation that was broken
+    assert ("Brown, 2001", "Brown_2001", True) in segments
+
+def test_hit_replays_ambiguous_and_broken_citations(tmp_path):
+    path = tmp_path / "plans.sqlite"
+    with PlanCache(path) as cache:
+        cache.planner(make_index(), plan_citations)(TEXT)
+    index = make_index()
+    with PlanCache(path) as cache:
+        segments, _ = cache.planner(index, plan_citations)(TEXT)
+        assert cache.hits == 1
+    # Never resolved on this index: what resolve() recorded comes from the cache
+    assert set(index.ambiguous) == {"Smith (2020)"}
+    assert len(index.ambiguous["Smith (2020)"]) == 2
+    assert [fragment for fragment, key, is_citation in segments if is_citation and key is None] == \
+        ["Smith (2020)", "Brown, 2001"]
@@ -0,0 +1,45 @@
+from cita_ref_linker.reference_index import ReferenceIndex, fold
+
+def make_index(*references):
+    index = ReferenceIndex()
+    for text in references:
+        index.add(text)
+    return index
+
+def test_fold():
+    assert fold("Müller") == fold("Muller") == fold("MULLER") == "muller"
+    assert fold("Machová") == "machova"
+    assert fold("O’Brien") == fold("O'Brien") == "o'brien"
+    # Possessive in running text
+    assert fold("Oztas's") == "oztas"
+
+def test_lookup_folds_authors():
+    index = make_index("Müller, A. (2019). Reading.")
+    assert [entry.key for entry in index.lookup(["Muller"], "2019")] == ["Müller_2019"]
+    assert index.lookup(["Muller"], "2020") == []
+
+def test_year_suffixes_and_duplicates():
+    index = make_index("Smith, J. (2020a). First.", "Smith, J. (2020b). Second.", "Smith, J. (2020b). Second again.")
+    assert [entry.key for entry in index.lookup(["Smith"], "2020", "a")] == ["Smith_2020a"]
+    assert [entry.key for entry in index.lookup(["Smith"], "2020", "b")] == ["Smith_2020b", "Smith_2020b (2)"]
+    # 2020a and 2020b are different works; the two 2020b entries are one work twice
+    assert [[entry.key for entry in group] for group in index.duplicates] == [["Smith_2020b", "Smith_2020b (2)"]]
+
+def test_et_al_resolves_to_the_entry_with_three_or_more_authors():
+    index = make_index("Pratiwi, A. (2018). Alone.",
+                       "Pratiwi, A., Lee, B., & Oztas, F. (2018). Together.")
+    assert index.resolve("Pratiwi et al. (2018)", ("Pratiwi",), "2018", "", True) == "Pratiwi_2018 (2)"
+    assert index.resolve("Pratiwi (2018)", ("Pratiwi",), "2018") == "Pratiwi_2018"
+    assert index.ambiguous == {}
+
+def test_second_author_tells_entries_apart():
+    index = make_index("Lee, A., & Kim, B. (2021). One.", "Lee, A., & Park, C. (2021). Two.")
+    assert index.resolve("Lee & Park (2021)", ("Lee", "Park"), "2021") == "Lee_2021 (2)"
+
+def test_ambiguous_citation_is_reported():
+    index = make_index("Lee, A., & Kim, B. (2021). One.", "Lee, A., & Park, C. (2021). Two.")
+    assert index.resolve("Lee (2021)", ("Lee",), "2021") is None
+    assert index.ambiguous == {"Lee (2021)": ["Lee_2021", "Lee_2021 (2)"]}
+    # Broken is not ambiguous
+    assert index.resolve("Lee (1999)", ("Lee",), "1999") is None
+    assert list(index.ambiguous) == ["Lee (2021)"]
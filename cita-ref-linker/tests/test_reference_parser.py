@@ -0,0 +1,42 @@
+import pytest
+
+from cita_ref_linker.reference_parser import parse_reference
+
+def parsed(text):
+    """(surnames, et_al, year, suffix, title, doi) of an entry."""
+    record = parse_reference(text)
+    title = text.strip()[record.title_start:record.title_end]
+    return record.surnames, record.et_al, record.year, record.suffix, title, record.doi
+
+def test_doi_digits_are_not_the_year():
+    assert parsed("Smith, J. (2020). Vocabulary. System, 5(2), 1-20. https://doi.org/10.1016/j.sys.1999.102345") == \
+        (["Smith"], False, "2020", "", "Vocabulary", "10.1016/j.sys.1999.102345")
+    assert parsed("Smith, J. doi:10.1000/1987 (2019). Reading.")[2] == "2019"
+
+def test_year_in_the_title():
+    assert parsed("Aini, N. & Zulyusri, Z. (2021). Reforms of 2013 in 1,200 schools. Jurnal, 3(1).") == \
+        (["Aini", "Zulyusri"], False, "2021", "", "Reforms of 2013 in 1,200 schools", "")
+
+def test_no_date():
+    assert parse_reference("Smith, J. (n.d.). Guidelines for 2030. WHO.") is None
+
+def test_year_suffix():
+    assert parsed("Smith, J. et al. (2020a). Title. Journal.") == (["Smith"], True, "2020", "a", "Title", "")
+    assert parsed("Smith, J., 2020b. Title.")[2:4] == ("2020", "b")
+    # A word glued to the year is not a suffix
+    assert parse_reference("Smith, J. (2020abc). Title.") is None
+
+@pytest.mark.parametrize("marker", ["1. ", "12) ", "[3] ", "• ", "- ", "– "])
+def test_numbered_and_bulleted_entries(marker):
+    assert parsed(marker + "Oztas, F. & Dikmenli, M. (2010). Biology. Science, 7(2).") == \
+        (["Oztas", "Dikmenli"], False, "2010", "", "Biology", "")
+
+def test_year_first_is_not_a_list_number():
+    assert parse_reference("2020. Title only.") is None
+
+def test_corporate_authors():
+    # The first word of the name is its key, as for a surname
+    assert parsed("World Health Organization. (2019). Guidelines. WHO.") == \
+        (["World"], False, "2019", "", "Guidelines", "")
+    assert parsed("Badan Pusat Statistik, 2021. Statistik Indonesia 2020.") == \
+        (["Badan"], False, "2021", "", "Statistik Indonesia 2020", "")
@@ -0,0 +1,47 @@
+import io
+import os
+
+from cita_ref_linker import link_document
+from cita_ref_linker.result_cache import ResultCache
+
+BODY = ["As Smith (2020) and Jones (2019) found (Brown, 2001)."]
+
+def test_same_input_is_a_hit(make_docx, link, engine, tmp_path):
+    source = make_docx(BODY)
+    first_out, first = link(source, engine, result_cache=tmp_path / "results")
+    out, result = link(source, engine, result_cache=tmp_path / "results")
+    assert result.metrics["counters"]["result_cache_hits"] == 1
+    assert out.read_bytes() == first_out.read_bytes()
+    assert (result.ref_map, result.linked_references, result.missing_citations) == \
+        (first.ref_map, first.linked_references, first.missing_citations)
+    # Other options are another entry
+    _, other = link(source, engine, result_cache=tmp_path / "results", in_place=True)
+    assert other.metrics["counters"]["result_cache_hits"] == 0
+
+def test_stream_destination(make_docx, tmp_path):
+    source = make_docx(BODY)
+    outputs = []
+    for _ in range(2):
+        # Output after a prefix: only the bytes of this run go into the cache
+        out = io.BytesIO(b"prefix")
+        out.seek(0, io.SEEK_END)
+        result = link_document(source, out, result_cache=tmp_path / "results")
+        outputs.append(out.getvalue())
+    assert result.metrics["counters"]["result_cache_hits"] == 1
+    assert outputs[0] == outputs[1]
+    assert outputs[0].startswith(b"prefix") and len(outputs[0]) > len(b"prefix")
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2500)
+    for n, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, b"x" * 1000, {"n": n})
+        for path in cache._paths(key):
+            os.utime(path, (n, n))
+    # A put() in progress elsewhere: neither counted nor removed
+    tmp_file = tmp_path / "aa" / "leftover.tmp"
+    tmp_file.write_bytes(b"x" * 5000)
+    cache.evict()
+    assert cache.get("aa1", io.BytesIO()) is None
+    assert cache.get("bb2", io.BytesIO()) == {"n": 1}
+    assert cache.get("cc3", io.BytesIO()) == {"n": 2}
+    assert tmp_file.exists()
@@ -0,0 +1,31 @@
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+BODY = ["Motivation matters (Smith, 2020).", "Jones (2019) disagrees."]
+REFERENCES = ["Jones, A. (2019). Reading in a second language. Applied Linguistics, 40(2), 1-20.",
+              "Smith, J. (2020). Vocabulary and motivation. Language Learning, 70(1), 5-30."]
+
+def anchors(root):
+    return sorted(link.get(W + "anchor") for link in root.iter(W + "hyperlink"))
+
+def test_reference_list_in_a_table_is_mapped(make_docx, link, read_document, engine):
+    def setup(doc):
+        table = doc.add_table(rows=len(REFERENCES), cols=1)
+        for row, text in zip(table.rows, REFERENCES):
+            row.cells[0].text = text
+
+    out, result = link(make_docx(BODY, references=(), setup=setup), engine)
+    assert sorted(result.ref_map) == ["Jones_2019", "Smith_2020"]
+    assert result.missing_citations == []
+    assert anchors(read_document(out)) == sorted(result.ref_map.values())
+
+def test_table_of_contents_line_is_not_the_heading(make_docx, link, engine):
+    def setup(doc):
+        from docx.oxml.parser import parse_xml
+        # A content control after the list whose line reads "References", as a TOC field might
+        sdt = parse_xml(f'<w:sdt xmlns:w="{W[1:-1]}"><w:sdtContent><w:p><w:r><w:t>References</w:t></w:r></w:p>'
+                        f'<w:p><w:r><w:t>Brown, C. (2018). Not an entry. Journal, 1, 1-2.</w:t></w:r></w:p>'
+                        f'</w:sdtContent></w:sdt>')
+        doc.element.body.insert(len(doc.element.body) - 1, sdt)
+
+    _, result = link(make_docx(BODY, setup=setup), engine)
+    assert sorted(result.ref_map) == ["Jones_2019", "Smith_2020"]
@@ -0,0 +1,33 @@
+from cita_ref_linker.reference_index import ReferenceIndex
+from cita_ref_linker.suggestions import BKTree, edit_distance, suggest_for
+
+WORDS = ["pratiwi", "prawiti", "oztas", "ozturk", "lee", "leeds", "dikmenli"]
+
+def test_bk_tree_finds_exactly_the_words_within_the_radius():
+    tree = BKTree()
+    for word in WORDS:
+        tree.add(word, [word])
+    for query in ["pratiwi", "pratwi", "oztaz", "le", "xyz"]:
+        for radius in range(4):
+            expected = sorted((edit_distance(query, word), word) for word in WORDS
+                              if edit_distance(query, word) <= radius)
+            assert sorted(tree.search(query, radius)) == expected
+
+def make_entries():
+    index = ReferenceIndex()
+    for text in ["Pratiwi, A. (2018). One.", "Pratiwi, A. (2021). Two.", "Oztas, F. (2010). Three.",
+                 "Lee, B. (2019). Four."]:
+        index.add(text)
+    return index.entries
+
+def test_suggestions_within_the_threshold():
+    suggestions = suggest_for(["Pratiwy (2020)", "Öztaş, 2011", "Le (2019)"], make_entries())
+    # Closest name first, then closest year
+    assert suggestions == {"Pratiwy (2020)": ["Pratiwi_2021", "Pratiwi_2018"],
+                           "Öztaş, 2011": ["Oztas_2010"],
+                           "Le (2019)": ["Lee_2019"]}
+
+def test_no_suggestion_beyond_the_threshold():
+    # "Prtwy" is three edits from "pratiwi": more than a five-letter name allows
+    assert suggest_for(["Prtwy (2018)", "Smith (2019)", "Lees (2019)"], make_entries()) == \
+        {"Lees (2019)": ["Lee_2019"]}
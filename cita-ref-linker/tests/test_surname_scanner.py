@@ -0,0 +1,33 @@
+import random
+
+from cita_ref_linker.surname_scanner import SurnameScanner, _is_word_char
+
+SURNAMES = ["Pratiwi", "Oztas", "Machová", "Van Dijk", "Dijk", "Lee"]
+
+def every_site(scanner, text):
+    """scan() without the year regions: each automaton hit over the whole text is verified."""
+    sites = []
+    taken_until = 0
+    for start, end, word in sorted(scanner.automaton.finditer(text), key=lambda hit: (hit[0], -hit[1])):
+        if start < taken_until or (start and _is_word_char(text[start - 1])) or \
+           (end < len(text) and _is_word_char(text[end]) and text[end] not in "'’"):
+            continue
+        site = scanner._verify(text, start, end, word)
+        if site is not None:
+            sites.append(site)
+            taken_until = site.end
+    return sites
+
+def test_sites_in_running_text():
+    scanner = SurnameScanner(SURNAMES)
+    text = "As Pratiwi et al. (2018: 3) and Oztas's (2009) note, Machova 2021 agrees; Leeds (2020) does not."
+    assert [(site.authors, site.year, site.in_parens) for site in scanner.scan(text)] == [
+        (("Pratiwi",), "2018", True), (("Oztas",), "2009", True), (("Machova",), "2021", False)]
+
+def test_scanning_near_years_only_finds_every_site():
+    scanner = SurnameScanner(SURNAMES)
+    rng = random.Random(7)
+    words = SURNAMES + ["Machova", "et al.", "and", "&", "(2019)", "2020", "(2021, p. 4)", ","] + ["the"] * 20
+    for _ in range(2000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 60)))
+        assert scanner.scan(text) == every_site(scanner, text)
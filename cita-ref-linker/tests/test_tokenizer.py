@@ -0,0 +1,109 @@
+import re
+import random
+
+from cita_ref_linker.planner import plan_citations
+from cita_ref_linker.reference_index import ReferenceIndex
+
+# --- THE REGEX PATH (apa_linker5 before citation_tokenizer.py), the reference for plan_citations() ---
+citation_pattern = re.compile(
+    r"(?P<paren>\([^\)]+\))|"
+    r"(?P<narrative>[A-Z][\w\-\']+(?:\s+(?:&|and)\s+[A-Z][\w\-\']+)?(?:\s+et\s+al\.?)?\s*\(\d{4}\))"
+)
+
+sub_citation_pattern = re.compile(r"(.*),\s.*?(\d{4})")
+
+def clean_author_name(raw_text):
+    first_word = raw_text.split()[0]
+    return re.sub(r"[^\w\-\']", "", first_word)
+
+def regex_plan_citations(text, ref_map):
+    if "(" not in text:
+        return None
+    matches = list(citation_pattern.finditer(text))
+    if not matches:
+        return None
+    regex_matches = len(matches)
+    segments = []
+    cursor = 0
+    for match in matches:
+        full_text = match.group(0)
+        if match.start() > cursor:
+            segments.append((text[cursor:match.start()], None, False))
+        if match.group('narrative'):
+            parts = full_text.split('(')
+            key = f"{clean_author_name(parts[0].strip())}_{parts[1].replace(')', '').strip()}"
+            segments.append((full_text, key if key in ref_map else None, True))
+        else:
+            # Separators and spacing come from the text, as in plan_citations()
+            at = match.start()
+            piece_start = at + 1
+            for raw in full_text[1:-1].split(";"):
+                cite = raw.strip()
+                cite_start = piece_start + len(raw) - len(raw.lstrip())
+                if cite_start > at:
+                    segments.append((text[at:cite_start], None, False))
+                sub_match = sub_citation_pattern.search(cite)
+                if sub_match and sub_match.group(1).split():
+                    regex_matches += 1
+                    key = f"{clean_author_name(sub_match.group(1))}_{sub_match.group(2)}"
+                    segments.append((cite, key if key in ref_map else None, True))
+                else:
+                    segments.append((cite, None, False))
+                at = cite_start + len(cite)
+                piece_start += len(raw) + 1
+            segments.append((text[at:match.end()], None, False))
+        cursor = match.end()
+    if cursor < len(text):
+        segments.append((text[cursor:], None, False))
+    return segments, regex_matches
+
+# --- SYNTHETIC TEXT ---
+SURNAMES = ["Dikmenli", "Aini", "Zulyusri", "Nurhayati", "Wijayanti", "Pratiwi", "Machová",
+            "Oztas", "Safitri", "O'Brien", "Smith-Jones", "Fajri", "Roviati", "Anugrah"]
+PROSE = ("students showed a significant improvement in conceptual understanding "
+         "after the intervention, which is consistent with earlier findings").split()
+
+def random_citation(rng):
+    year = str(rng.randint(1990, 2025))
+    a, b, c = rng.sample(SURNAMES, 3)
+    return rng.choice([
+        f"{a} ({year})",
+        f"{a} & {b} ({year})",
+        f"{a} et al. ({year})",
+        f"({a}, {year})",
+        f"({a} & {b}, {year}; {c}, {year}a)",
+        f"({a}, {b}, & {c}, {year}, p. {rng.randint(1, 300)})",
+        f"({a} et al., {year}; {b}, {year}; {c}, {year})",
+        "(see Table 2)",
+    ])
+
+def dense_paragraph(rng, citations, prose_words):
+    words = []
+    for _ in range(citations):
+        words.extend(word.capitalize() if rng.random() < 0.1 else word
+                     for word in (rng.choice(PROSE) for _ in range(prose_words)))
+        words.append(random_citation(rng))
+    return " ".join(words) + " as reported."
+
+def fuzz_paragraph(rng, length=60):
+    """Random mix of the characters the two paths are sensitive to."""
+    alphabet = "(); ,.&\n\tAaZz19-'" + "".join(SURNAMES[:3])
+    pieces = [rng.choice(["and", "et al.", "2010", "(2021)", " ", ", "]) if rng.random() < 0.3
+              else rng.choice(alphabet) for _ in range(length)]
+    return "".join(pieces)
+
+def reference_index():
+    """Index of every SURNAMES entry from 1990 to 2025, in steps of three years."""
+    index = ReferenceIndex()
+    for name in SURNAMES:
+        for year in range(1990, 2026, 3):
+            index.add(f"{name}, A. ({year}). Title.").bookmark = f"REF_{len(index)}"
+    return index
+
+def test_plans_match_the_regex_path():
+    rng = random.Random(2025)
+    index = reference_index()
+    texts = ([dense_paragraph(rng, 8, prose) for prose in (0, 3, 20) for _ in range(200)]
+             + [fuzz_paragraph(rng) for _ in range(20000)])
+    for text in texts:
+        assert plan_citations(text, index) == regex_plan_citations(text, index.ref_map), text